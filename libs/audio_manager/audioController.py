@@ -1,85 +1,357 @@
+import queue
+import threading
+from concurrent.futures import Future
 from ctypes import POINTER, cast
 
 import comtypes
+import psutil
 import pythoncom
 from comtypes import CLSCTX_ALL
+from pycaw.api.audiopolicy import IAudioSessionControl2
 from pycaw.constants import CLSID_MMDeviceEnumerator
 from pycaw.pycaw import (AudioUtilities, EDataFlow, IAudioEndpointVolume,
                          IMMDeviceEnumerator)
+from pycaw.utils import AudioSession
 
 # Инициализируем COM-библиотеку один раз при импорте модуля
 pythoncom.CoInitialize()
 
+# Как часто сверять индекс аудиосессий с системой (на случай пропущенных уведомлений)
+SESSION_RECONCILE_S = 5.0
+# Сколько ждать выполнения операции в потоке индекса
+SESSION_CALL_TIMEOUT_S = 5.0
+# AudioSessionState.AudioSessionStateExpired
+_SESSION_STATE_EXPIRED = 2
+
+
+def _normalize_process_name(name):
+    """Имя процесса для индекса: нижний регистр, с расширением .exe."""
+    name = name.strip().lower()
+    return name if "." in name else name + ".exe"
+
+
+def _instance_id(session):
+    """Идентификатор экземпляра сессии: у новой сессии того же процесса он другой."""
+    try:
+        return session.InstanceIdentifier
+    except comtypes.COMError:
+        return None
+
+
+class AudioSessionIndex:
+    """
+    Индекс аудиосессий по имени процесса: поиск сессии - O(1) вместо перебора
+    GetAllSessions() с вызовом Process.name() для каждой сессии при каждом действии.
+    Индекс поддерживается уведомлениями о создании (IAudioSessionNotification)
+    и завершении (IAudioSessionEvents) сессий, а раз в SESSION_RECONCILE_S секунд
+    сверяется с системой; имя процесса запрашивается один раз на PID.
+    Все обращения к COM выполняются в собственном потоке индекса (MTA), поэтому
+    закэшированные сессии можно безопасно использовать из любого потока приложения.
+    """
+    def __init__(self, reconcile_s=SESSION_RECONCILE_S):
+        self.reconcile_s = reconcile_s
+        self._sessions = {}      # имя процесса -> {pid: AudioSession}
+        self._pid_names = {}     # pid -> имя процесса
+        self._pid_instances = {} # pid -> идентификатор экземпляра проиндексированной сессии
+        self._tasks = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Используются только потоком индекса
+        self._manager = None
+        self._manager_device_id = None
+        self._notification = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audio-sessions", daemon=True)
+                self._thread.start()
+
+    def stop(self, wait_s=1.0):
+        self._tasks.put(None)
+        if self._thread is not None:
+            self._thread.join(wait_s)
+
+    def call(self, func, *args, timeout=SESSION_CALL_TIMEOUT_S):
+        """Выполняет func(*args) в потоке индекса и возвращает результат."""
+        self.start()
+        future = Future()
+        self._tasks.put((func, args, future))
+        return future.result(timeout)
+
+    # --- Операции над сессиями процесса ---
+
+    def process_id(self, process):
+        """:return: PID процесса с активной аудиосессией или None."""
+        return self.call(lambda: next(iter(self._lookup(process)), None))
+
+    def get_volume(self, process):
+        """:return: Громкость процесса (0.0-1.0) или None, если сессии нет."""
+        def get():
+            for session in self._lookup(process).values():
+                return session.SimpleAudioVolume.GetMasterVolume()
+            return None
+        return self.call(get)
+
+    def change_volume(self, process, level=None, delta=None):
+        """
+        Устанавливает (level) или сдвигает (delta) громкость всех сессий процесса, 0.0-1.0.
+        :return: Новая громкость или None, если у процесса нет аудиосессий.
+        """
+        def change():
+            new_level = None
+            for session in self._lookup(process).values():
+                volume = session.SimpleAudioVolume
+                target = level if level is not None else volume.GetMasterVolume() + delta
+                new_level = min(1.0, max(0.0, target))
+                volume.SetMasterVolume(new_level, None)
+            return new_level
+        return self.call(change)
+
+    def set_mute(self, process, value):
+        """
+        Меняет звук процесса.
+        :param value: "Toggle", "Mute" или "Unmute".
+        :return: True, если звук выключен, False - включен, None - сессии нет.
+        """
+        def mute():
+            muted = None
+            for session in self._lookup(process).values():
+                volume = session.SimpleAudioVolume
+                if muted is None:
+                    # Для нескольких сессий процесса "Toggle" ориентируется на первую
+                    muted = not volume.GetMute() if value == "Toggle" else value == "Mute"
+                volume.SetMute(int(muted), None)
+            return muted
+        return self.call(mute)
+
+    # --- Поток индекса ---
+
+    def _lookup(self, process):
+        """
+        Сессии процесса из индекса (только в потоке индекса); завершенные сессии отбрасываются.
+        Если от процесса не осталось сессий, индекс сразу сверяется с системой: процесс мог
+        создать новую сессию, уведомление о которой еще не обработано.
+        """
+        name = _normalize_process_name(process)
+        sessions = self._sessions.get(name, {})
+        dropped = False
+        for pid, session in list(sessions.items()):
+            try:
+                expired = session.State == _SESSION_STATE_EXPIRED
+            except comtypes.COMError:
+                expired = True
+            if expired:
+                self._remove_session(pid)
+                dropped = True
+        if dropped and name not in self._sessions:
+            self._safe_reconcile()
+        return self._sessions.get(name, {})
+
+    def _run(self):
+        comtypes.CoInitializeEx(comtypes.COINIT_MULTITHREADED)
+        try:
+            self._safe_reconcile()
+            while True:
+                try:
+                    task = self._tasks.get(timeout=self.reconcile_s)
+                except queue.Empty:
+                    self._safe_reconcile()
+                    continue
+                if task is None:
+                    break
+                func, args, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(func(*args))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            self._unregister_manager()
+            for pid in list(self._pid_names):
+                self._remove_session(pid)
+            comtypes.CoUninitialize()
+
+    def _safe_reconcile(self):
+        try:
+            self._reconcile()
+        except Exception as e:
+            print(f"Ошибка при сверке аудиосессий: {e}")
+
+    def _reconcile(self):
+        """
+        Сверяет индекс с системой. Process.name() вызывается только для новых PID.
+        Если проиндексированной сессии процесса больше нет среди активных (процесс заменил ее новой),
+        она заменяется активной сессией того же PID.
+        """
+        self._ensure_manager()
+        present = {} # pid -> {идентификатор экземпляра: сессия}
+        for session in AudioUtilities.GetAllSessions():
+            pid = session.ProcessId
+            if not pid or session.State == _SESSION_STATE_EXPIRED:
+                continue
+            present.setdefault(pid, {})[_instance_id(session)] = session
+        for pid, sessions in present.items():
+            if self._pid_instances.get(pid) not in sessions:
+                self._add_session(next(iter(sessions.values())))
+        for pid in list(self._pid_names):
+            if pid not in present:
+                self._remove_session(pid)
+
+    def _add_session(self, session):
+        """Индексирует сессию; сессия, уже проиндексированная под этим PID, заменяется новой."""
+        pid = session.ProcessId
+        if not pid:
+            return
+        instance = _instance_id(session)
+        name = self._pid_names.get(pid)
+        if name is not None:
+            if instance == self._pid_instances.get(pid):
+                return
+            self._remove_session(pid) # PID тот же - имя процесса запрашивать заново не нужно
+        else:
+            try:
+                name = _normalize_process_name(psutil.Process(pid).name())
+            except psutil.Error:
+                return
+        self._pid_names[pid] = name
+        self._pid_instances[pid] = instance
+        self._sessions.setdefault(name, {})[pid] = session
+        self._watch_session(session, pid, instance)
+
+    def _remove_session(self, pid, instance=None):
+        """
+        Убирает сессию PID из индекса.
+        :param instance: Если задан, сессия убирается, только если проиндексирована именно она
+                         (запоздалое уведомление о завершении старой сессии не трогает новую).
+        """
+        if instance is not None and self._pid_instances.get(pid) != instance:
+            return
+        name = self._pid_names.pop(pid, None)
+        self._pid_instances.pop(pid, None)
+        if name is None:
+            return
+        sessions = self._sessions.get(name, {})
+        session = sessions.pop(pid, None)
+        if not sessions:
+            self._sessions.pop(name, None)
+        if session is not None:
+            try:
+                session.unregister_notification()
+            except (comtypes.COMError, AttributeError):
+                pass
+
+    # --- Уведомления ---
+
+    def _ensure_manager(self):
+        """
+        Подписывается на создание сессий устройства вывода по умолчанию.
+        Сессии принадлежат устройству, поэтому после смены устройства подписка обновляется.
+        """
+        try:
+            from pycaw.callbacks import AudioSessionNotification
+        except ImportError:
+            return # Старый pycaw: индекс обновляется только сверкой
+        device_id = AudioUtilities.GetSpeakers().GetId()
+        if self._manager is not None and device_id == self._manager_device_id:
+            return
+        self._unregister_manager()
+
+        index = self
+
+        class SessionCreated(AudioSessionNotification):
+            # Вызывается службой звука в ее потоке - передаем сессию в поток индекса
+            def on_session_created(self, new_session):
+                # QueryInterface возвращает собственную ссылку - она переживет возврат из уведомления
+                control = new_session.QueryInterface(IAudioSessionControl2)
+                index._tasks.put((index._on_session_created, (control,), Future()))
+
+        self._manager = AudioUtilities.GetAudioSessionManager()
+        self._notification = SessionCreated()
+        self._manager.RegisterSessionNotification(self._notification)
+        # Уведомления начинают приходить только после первого получения перечислителя сессий
+        self._manager.GetSessionEnumerator()
+        self._manager_device_id = device_id
+
+    def _unregister_manager(self):
+        if self._manager is not None:
+            try:
+                self._manager.UnregisterSessionNotification(self._notification)
+            except comtypes.COMError:
+                pass
+        self._manager = None
+        self._notification = None
+        self._manager_device_id = None
+
+    def _on_session_created(self, control):
+        self._add_session(AudioSession(control))
+
+    def _watch_session(self, session, pid, instance):
+        """Подписывается на завершение сессии, чтобы сразу убрать ее из индекса."""
+        try:
+            from pycaw.callbacks import AudioSessionEvents
+        except ImportError:
+            return
+        index = self
+
+        class SessionEvents(AudioSessionEvents):
+            def on_state_changed(self, new_state, new_state_id):
+                if new_state_id == _SESSION_STATE_EXPIRED:
+                    index._tasks.put((index._remove_session, (pid, instance), Future()))
+
+            def on_session_disconnected(self, disconnect_reason, disconnect_reason_id):
+                index._tasks.put((index._remove_session, (pid, instance), Future()))
+
+        try:
+            session.register_notification(SessionEvents())
+        except comtypes.COMError as e:
+            print(f"Не удалось подписаться на события аудиосессии процесса {pid}: {e}")
+
+
+# Общий индекс аудиосессий (поток запускается при первом обращении)
+session_index = AudioSessionIndex()
+
 
 class AudioController:
     """
     Класс для управления громкостью конкретного приложения (процесса).
-    Находит и кэширует аудиосессию при создании для высокой производительности.
+    Сессии процесса берутся из общего индекса AudioSessionIndex (поиск без перебора сессий).
     """
-    def __init__(self, process_name):
+    def __init__(self, process_name, index=None):
         self.process_name = process_name
-        self.audio_interface = None
-        self._find_session()
-
-    def _find_session(self):
-        """Находит и кэширует аудиосессию для указанного процесса."""
-        sessions = AudioUtilities.GetAllSessions()
-        for session in sessions:
-            if session.Process and session.Process.name() == self.process_name:
-                self.audio_interface = session.SimpleAudioVolume
-                print(f"Аудиосессия для '{self.process_name}' найдена.")
-                break # Нашли, выходим из цикла
-        if not self.audio_interface:
+        self.index = index or session_index
+        if self.index.process_id(process_name) is None:
             print(f"Предупреждение: Аудиосессия для '{self.process_name}' не найдена.")
 
     def get_volume(self):
         """Возвращает текущую громкость процесса (от 0.0 до 1.0)."""
-        if self.audio_interface:
-            return self.audio_interface.GetMasterVolume()
-        return None
+        return self.index.get_volume(self.process_name)
 
     def set_volume(self, level):
         """
         Устанавливает громкость для процесса.
         :param level: Уровень громкости от 0.0 (тихо) до 1.0 (макс).
         """
-        if self.audio_interface:
-            volume_level = min(1.0, max(0.0, level))
-            self.audio_interface.SetMasterVolume(volume_level, None)
+        self.index.change_volume(self.process_name, level=level)
 
     def decrease_volume(self, amount):
         """
         Уменьшает громкость на указанное значение.
         :param amount: Значение от 0.0 до 1.0, на которое нужно уменьшить громкость.
         """
-        if self.audio_interface:
-            current_volume = self.audio_interface.GetMasterVolume()
-            new_volume = max(0.0, current_volume - amount)
-            self.audio_interface.SetMasterVolume(new_volume, None)
+        self.index.change_volume(self.process_name, delta=-amount)
 
     def increase_volume(self, amount):
         """
         Увеличивает громкость на указанное значение.
         :param amount: Значение от 0.0 до 1.0, на которое нужно увеличить громкость.
         """
-        if self.audio_interface:
-            current_volume = self.audio_interface.GetMasterVolume()
-            new_volume = min(1.0, current_volume + amount)
-            self.audio_interface.SetMasterVolume(new_volume, None)
+        self.index.change_volume(self.process_name, delta=amount)
 
 
 def muteAndUnMute(process, value):
-    sessions = AudioUtilities.GetAllSessions()
-    for session in sessions:
-        volume = session.SimpleAudioVolume
-        if session.Process and session.Process.name() == process:
-            if value == "Toggle":
-                value = 0 if volume.GetMute() == 1 else 1
-            elif value == "Mute":
-                value = 1
-            elif value == "Unmute":
-                value = 0
-            volume.SetMute(value, None)
+    session_index.set_mute(process, value)
 
 
 def volumeChanger(process, action, value):
@@ -90,12 +362,11 @@ def volumeChanger(process, action, value):
             value = +value if action == "Increase" else -value
             setMasterVolume(100 if (master_vol := getMasterVolume() + value) and master_vol > 100 else master_vol)
     elif action == "Set":
-        AudioController(str(process)).set_volume((int(value)*0.01))
+        session_index.change_volume(str(process), level=int(value) * 0.01)
     elif action == "Increase":
-        AudioController(str(process)).increase_volume((int(value)*0.01))
-
+        session_index.change_volume(str(process), delta=int(value) * 0.01)
     elif action == "Decrease":
-        AudioController(str(process)).decrease_volume((int(value)*0.01))
+        session_index.change_volume(str(process), delta=-int(value) * 0.01)
 
 
 def setMasterVolume(Vol):
@@ -153,8 +424,4 @@ def setDeviceVolume(device_id, direction, volume_level):
 
 
 def get_process_id(name):
-    sessions = AudioUtilities.GetAllSessions()
-    for session in sessions:
-        if session.Process and session.Process.name() == name:
-            return session.Process.pid
-    return None
+    return session_index.process_id(name)
@@ -1,36 +1,112 @@
+import hashlib
 import json
+import marshal
 import os
+import threading
 import constants
 from utils import PROJECT_ROOT # Импортируем путь к корню проекта
 
 # Формируем абсолютные пути к файлам конфигурации
 CONFIG_FILE = os.path.join(PROJECT_ROOT, 'configs', 'config.json')
+# Бинарный снимок уже разобранного и мигрированного config.json для быстрого старта
+CONFIG_SNAPSHOT_FILE = os.path.join(PROJECT_ROOT, 'configs', 'config.snapshot')
 CONFIG_BAR_FILE = os.path.join(PROJECT_ROOT, 'configs', 'config_bar.json')
 CUSTOM_BUTTONS_FILE = os.path.join(PROJECT_ROOT, 'configs', 'CustomButtons.json')
 
 
+# Версия формата снимка. Увеличивается при изменении структуры снимка или логики миграции,
+# чтобы старые снимки автоматически отбрасывались.
+_SNAPSHOT_FORMAT = 1
+
+
 def config_exists():
     """
     Проверяет, существует ли файл конфигурации.
     """
     return os.path.exists(CONFIG_FILE)
 
+def _is_normalized_config(config):
+    """Проверяет, что конфиг уже в новом формате и содержит хотя бы одну страницу."""
+    return (
+        isinstance(config, dict)
+        and "pages" not in config
+        and any(key.startswith(constants.PAGE_PREFIX) for key in config)
+    )
+
+def _save_config_snapshot(config, raw_bytes):
+    """
+    Сохраняет бинарный снимок (marshal) нормализованного конфига рядом с config.json.
+    Снимок привязан к размеру, времени изменения и хешу содержимого JSON-файла.
+    :param config: Нормализованный словарь конфигурации.
+    :param raw_bytes: Байты config.json, из которых получен config.
+    """
+    if not _is_normalized_config(config):
+        return
+    # load_config вызывается и из рабочих потоков - у каждого потока свой временный файл
+    tmp_path = f"{CONFIG_SNAPSHOT_FILE}.{threading.get_ident()}.tmp"
+    try:
+        stat = os.stat(CONFIG_FILE)
+        header = (
+            _SNAPSHOT_FORMAT,
+            stat.st_size,
+            stat.st_mtime_ns,
+            hashlib.sha1(raw_bytes).hexdigest(),
+        )
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(header, f)
+            marshal.dump(config, f)
+        os.replace(tmp_path, CONFIG_SNAPSHOT_FILE)
+    except (OSError, ValueError) as e:
+        # Снимок - лишь ускорение, поэтому ошибка не критична
+        print(f"Не удалось сохранить снимок конфигурации: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def _load_config_snapshot(stat, raw_bytes):
+    """
+    Загружает снимок конфига, если он соответствует текущему config.json.
+    :param stat: Результат os.stat() для config.json.
+    :param raw_bytes: Текущее содержимое config.json.
+    :return: Словарь конфигурации или None, если снимок отсутствует или устарел.
+    """
+    try:
+        with open(CONFIG_SNAPSHOT_FILE, 'rb') as f:
+            header = marshal.load(f)
+            # Сначала дешевая проверка размера и времени изменения, затем хеш содержимого
+            if (not isinstance(header, tuple) or len(header) != 4
+                    or header[0] != _SNAPSHOT_FORMAT
+                    or header[1] != stat.st_size
+                    or header[2] != stat.st_mtime_ns):
+                return None
+            if header[3] != hashlib.sha1(raw_bytes).hexdigest():
+                return None
+            config = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return config if _is_normalized_config(config) else None
+
 def save_config(data):
     """
-    Сохраняет данные конфигурации в файл JSON.
+    Сохраняет данные конфигурации в файл JSON и обновляет бинарный снимок.
     :param data: Словарь с данными для сохранения.
     """
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-    except IOError as e:
+        raw_bytes = json.dumps(data, ensure_ascii=False, indent=4).encode('utf-8')
+        with open(CONFIG_FILE, 'wb') as f:
+            f.write(raw_bytes)
+    except (IOError, TypeError, ValueError) as e:
         print(f"Ошибка при сохранении файла конфигурации: {e}")
+        return
+    _save_config_snapshot(data, raw_bytes)
 
 def load_config():
     """
     Загружает данные конфигурации из файла JSON.
     Если файл не существует, создает его со страницей по умолчанию.
     Также обрабатывает переход от старого формата (список pages) к новому (словари page_x).
+    Если рядом лежит актуальный бинарный снимок, разбор JSON и миграция пропускаются.
     """
     import constants
 
@@ -43,8 +119,17 @@ def load_config():
         return default_config
 
     try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        stat = os.stat(CONFIG_FILE)
+        with open(CONFIG_FILE, 'rb') as f:
+            raw_bytes = f.read()
+
+        # --- Быстрый путь: актуальный снимок ---
+        snapshot = _load_config_snapshot(stat, raw_bytes)
+        if snapshot is not None:
+            return snapshot
+
+        config = json.loads(raw_bytes.decode('utf-8'))
+        was_saved = False
         
         # --- Миграция со старого формата ---
         if "pages" in config and isinstance(config["pages"], list):
@@ -55,6 +140,7 @@ def load_config():
             
             # После миграции можно сразу сохранить конфиг в новом формате
             save_config(config)
+            was_saved = True
             print("Миграция завершена. Конфигурация сохранена в новом формате.")
         # --- Конец миграции ---
 
@@ -62,13 +148,40 @@ def load_config():
         if not any(key.startswith(constants.PAGE_PREFIX) for key in config):
             config[f"{constants.PAGE_PREFIX}1"] = {}
             save_config(config)
+        elif not was_saved:
+            # Файл не менялся при загрузке - сохраняем снимок для следующего запуска
+            _save_config_snapshot(config, raw_bytes)
 
         return config
-    except (IOError, json.JSONDecodeError) as e:
+    except (IOError, UnicodeDecodeError, json.JSONDecodeError) as e:
         print(f"Ошибка при загрузке файла конфигурации: {e}")
         # Возвращаем базовый конфиг в случае серьезной ошибки
         return {f"{constants.PAGE_PREFIX}1": {}}
 
+def read_config_for_reload():
+    """
+    Читает config.json без побочных эффектов (без миграции на диск и без создания
+    конфига по умолчанию). Используется для горячей перезагрузки при внешнем изменении файла.
+    :return: Нормализованный словарь конфигурации или None, если файл отсутствует,
+             записан не полностью или находится в старом формате.
+    """
+    try:
+        stat = os.stat(CONFIG_FILE)
+        with open(CONFIG_FILE, 'rb') as f:
+            raw_bytes = f.read()
+    except OSError:
+        return None
+
+    snapshot = _load_config_snapshot(stat, raw_bytes)
+    if snapshot is not None:
+        return snapshot
+
+    try:
+        config = json.loads(raw_bytes.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return None
+    return config if _is_normalized_config(config) else None
+
 # --- Функции для конфигурации панели виджетов ---
 
 def save_bar_config(data):
@@ -101,6 +214,18 @@ def load_bar_config():
 
 # --- Функции для конфигурации пресетов кнопок ---
 
+def read_custom_buttons_for_reload():
+    """
+    Читает CustomButtons.json для горячей перезагрузки.
+    :return: Список пресетов или None, если файл отсутствует или поврежден.
+    """
+    try:
+        with open(CUSTOM_BUTTONS_FILE, 'r', encoding='utf-8') as f:
+            presets = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return presets if isinstance(presets, list) else None
+
 def load_custom_buttons():
     """Загружает список кастомных кнопок (пресетов) из файла."""
     if not os.path.exists(CUSTOM_BUTTONS_FILE):
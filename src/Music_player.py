@@ -1,4 +1,5 @@
 import json
+import os
 import random
 import sys
 import traceback
@@ -16,6 +17,7 @@ from yandex_music import Client
 
 # ui_MusicPlayer больше не нужен
 from LoadSave import load_config
+from session_snapshot import SESSION_COVER_FILE
 
 
 class WorkerSignals(QObject):
@@ -51,10 +53,91 @@ class DownloaderWorker(QRunnable):
             self.signals.finished.emit()
 
 
+class BootstrapSignals(QObject):
+    """
+    Сигналы фонового запуска плеера.
+    """
+    progress = Signal(str)       # Текстовое описание текущего этапа
+    client_ready = Signal(object) # Инициализированный клиент Яндекс.Музыки
+    tracks_ready = Signal(object) # Список понравившихся треков (может быть пустым)
+    error = Signal(str)
+    finished = Signal()
+
+
+class PlayerBootstrapWorker(QRunnable):
+    """
+    Рабочий поток запуска плеера: инициализация клиента API и загрузка
+    списка понравившихся треков. Все сетевые вызовы выполняются здесь,
+    чтобы медленная сеть не задерживала появление окна.
+    """
+    def __init__(self, token):
+        super().__init__()
+        self.token = token
+        self.signals = BootstrapSignals()
+
+    def run(self):
+        try:
+            self.signals.progress.emit("Подключение к Яндекс.Музыке...")
+            client = Client(self.token).init()
+            self.signals.client_ready.emit(client)
+
+            self.signals.progress.emit("Загрузка понравившихся треков...")
+            liked_tracks_list = client.users_likes_tracks()
+            tracks = liked_tracks_list.tracks if liked_tracks_list and liked_tracks_list.tracks else []
+            self.signals.tracks_ready.emit(tracks)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        finally:
+            self.signals.finished.emit()
+
+
+class TrackInfoSignals(QObject):
+    """
+    Сигналы загрузки информации о треке.
+    """
+    result = Signal(int, object) # (номер запроса, словарь с информацией о треке)
+    error = Signal(int, str)
+
+
+class TrackInfoWorker(QRunnable):
+    """
+    Рабочий поток, получающий полную информацию о треке, ссылку на обложку
+    и прямую ссылку на аудио (fetch_track и get_download_info - сетевые вызовы).
+    """
+    def __init__(self, request_id, track_short):
+        super().__init__()
+        self.request_id = request_id
+        self.track_short = track_short
+        self.signals = TrackInfoSignals()
+
+    def run(self):
+        try:
+            track = self.track_short.fetch_track()
+            download_info = track.get_download_info()
+            info = {
+                'track': track,
+                'artists': ', '.join(artist.name for artist in track.artists),
+                'title': track.title,
+                'duration_ms': track.duration_ms,
+                'cover_url': track.get_cover_url(size='400x400'),
+                'direct_link': download_info[0].get_direct_link(),
+            }
+        except Exception as e:
+            self.signals.error.emit(self.request_id, str(e))
+        else:
+            self.signals.result.emit(self.request_id, info)
+
+
 class MusicPlayer(QObject): # Изменено с QWidget на QObject
     """
     Класс-контроллер музыкального плеера, который использует API Яндекс.Музыки.
     """
+    # Этапы фонового запуска плеера (для отображения прогресса)
+    bootstrap_progress = Signal(str)
+    # Плеер готов: клиент инициализирован и список треков получен (или запуск не удался)
+    bootstrap_finished = Signal(bool)
+
     def __init__(self, ui, parent=None): # Конструктор теперь принимает ui главного окна
         """
         Инициализатор класса MusicPlayer.
@@ -84,6 +167,12 @@ class MusicPlayer(QObject): # Изменено с QWidget на QObject
         self.liked_track_ids = set()
         # Храним оригинальный pixmap для качественного масштабирования
         self.cover_pixmap = None
+        # Номер последнего запроса трека: ответы на устаревшие запросы отбрасываются
+        self._track_request_id = 0
+        # Метаданные текущего трека (для снимка сессии)
+        self._current_track_meta = None
+        # Трек прошлой сессии: показывается до загрузки очереди, с него же продолжается воспроизведение
+        self._resume_state = None
 
         # Состояние плеера (играет / пауза)
         self.is_playing = False
@@ -144,38 +233,121 @@ class MusicPlayer(QObject): # Изменено с QWidget на QObject
 
     def load_config_and_init(self):
         """
-        Загружает конфигурацию, используя централизованную функцию,
-        инициализирует клиент и плеер, и запускает загрузку треков.
+        Загружает конфигурацию, инициализирует плеер и запускает фоновую
+        инициализацию клиента и загрузку треков. Сетевых вызовов в GUI-потоке нет.
         """
         # 1. Загружаем конфиг через LoadSave.py
         config = load_config()
         self.token = config.get('yandex_music', {}).get('token')
         
-        # 2. Инициализируем клиент
-        self.init_yandex_music_client()
-        
-        # 3. Инициализируем плеер
+        # 2. Инициализируем плеер
         self.init_player()
 
-        # 4. Настраиваем соединения
+        # 3. Настраиваем соединения
         self.setup_connections()
 
-        # 5. Запускаем загрузку треков
-        self.fetch_liked_tracks()
+        # 4. Запускаем инициализацию клиента и загрузку треков в фоне
+        self.init_yandex_music_client()
 
     def init_yandex_music_client(self):
         """
-        Инициализирует клиент API Яндекс.Музыки с использованием токена.
+        Запускает фоновую инициализацию клиента API Яндекс.Музыки и загрузку треков.
+        Результат приходит в слоты _on_client_ready / _on_tracks_ready.
         """
-        if self.token and self.token != "YOUR_TOKEN_HERE":
-            try:
-                self.client = Client(self.token).init()
-            except Exception as e:
-                print(f"Не удалось инициализировать клиент Яндекс.Музыки: {e}")
-                self.client = None
-        else:
+        if not self.token or self.token == "YOUR_TOKEN_HERE":
             print("Токен Яндекс.Музыки не найден в config.json. Функционал плеера будет ограничен.")
             self.client = None
+            self.bootstrap_finished.emit(False)
+            return
+
+        worker = PlayerBootstrapWorker(self.token)
+        worker.signals.progress.connect(self._on_bootstrap_progress)
+        worker.signals.client_ready.connect(self._on_client_ready)
+        worker.signals.tracks_ready.connect(self._on_tracks_ready)
+        worker.signals.error.connect(self._on_bootstrap_error)
+        self.threadpool.start(worker)
+
+    def _on_bootstrap_progress(self, message):
+        """Показывает этап запуска плеера, пока трек еще не загружен."""
+        print(message)
+        if self.current_track_index < 0 and self._resume_state is None:
+            self.ui.Track_label.setText(message)
+        self.bootstrap_progress.emit(message)
+
+    def _on_client_ready(self, client):
+        """Сохраняет инициализированный в фоне клиент."""
+        self.client = client
+
+    def _on_tracks_ready(self, tracks):
+        """Получает список понравившихся треков и начинает загрузку первого."""
+        if tracks:
+            self.tracks = tracks
+            # Сохраняем ID всех понравившихся треков
+            self.liked_track_ids = {t.id for t in self.tracks}
+            self.load_track(self._resume_index())
+            print(f"Загружено {len(self.tracks)} треков.")
+        else:
+            print("Понравившиеся треки не найдены.")
+            self.ui.Track_label.setText("")
+        self.bootstrap_finished.emit(True)
+
+    def _on_bootstrap_error(self, message):
+        """Обрабатывает ошибку фонового запуска плеера."""
+        print(f"Не удалось инициализировать клиент Яндекс.Музыки: {message}")
+        if self.current_track_index < 0 and self._resume_state is None:
+            self.ui.Track_label.setText("")
+        self.bootstrap_finished.emit(False)
+
+    # --- Снимок сессии ---
+
+    def restore_session(self, state):
+        """
+        Сразу показывает трек прошлой сессии (название, исполнитель, длительность, обложка),
+        пока клиент и очередь треков загружаются в фоне.
+        :param state: Словарь из export_session() прошлого запуска (или None).
+        """
+        if not state or self.current_track_index >= 0:
+            return
+        self._resume_state = state
+        self.ui.Artist_label.setText(state.get('artists', ''))
+        self.ui.Track_label.setText(state.get('title', ''))
+        duration_ms = int(state.get('duration_ms') or 0)
+        self.ui.Length_track_bar.setMaximum(duration_ms)
+        self.ui.Right_Time_label.setText(self.format_duration(duration_ms))
+        cover_path = state.get('cover_path')
+        if cover_path and os.path.exists(cover_path):
+            pixmap = QPixmap(cover_path)
+            if not pixmap.isNull():
+                self.cover_pixmap = pixmap
+                self._update_cover_widgets()
+
+    def _resume_index(self):
+        """Позиция в очереди, с которой продолжить: тот же трек, что в прошлой сессии, иначе начало."""
+        state = self._resume_state
+        if not state:
+            return 0
+        track_id = state.get('track_id')
+        if track_id is not None:
+            for index, track in enumerate(self.tracks):
+                if str(track.id) == str(track_id):
+                    return index
+        track_index = state.get('track_index', 0)
+        return track_index if isinstance(track_index, int) and 0 <= track_index < len(self.tracks) else 0
+
+    def export_session(self):
+        """
+        Возвращает состояние плеера для снимка сессии и сохраняет обложку текущего трека.
+        :return: Словарь (позиция в очереди и метаданные трека) или None.
+        """
+        if self._current_track_meta is None:
+            # В этой сессии трек так и не загрузился - сохраняем прошлое состояние
+            return self._resume_state
+        state = dict(self._current_track_meta, track_index=self.current_track_index, cover_path=None)
+        if self.cover_pixmap is not None and not self.cover_pixmap.isNull():
+            os.makedirs(os.path.dirname(SESSION_COVER_FILE), exist_ok=True)
+            if self.cover_pixmap.save(SESSION_COVER_FILE, "PNG"):
+                state['cover_path'] = SESSION_COVER_FILE
+        return state
 
     def init_player(self):
         """
@@ -272,32 +444,19 @@ class MusicPlayer(QObject): # Изменено с QWidget на QObject
 
     def fetch_liked_tracks(self):
         """
-        Получает список понравившихся треков пользователя из Яндекс.Музыки
+        Заново запрашивает список понравившихся треков пользователя (в фоне)
         и загружает первый трек, если список не пуст.
         """
-        if not self.client:
+        if not self.token:
             print("Клиент Яндекс.Музыки не инициализирован. Невозможно загрузить треки.")
             return
-
-        try:
-            print("Загрузка понравившихся треков...")
-            liked_tracks_list = self.client.users_likes_tracks()
-            if liked_tracks_list and liked_tracks_list.tracks:
-                self.tracks = liked_tracks_list.tracks
-                # Сохраняем ID всех понравившихся треков
-                self.liked_track_ids = {t.id for t in self.tracks}
-                self.current_track_index = 0
-                self.load_track(self.current_track_index)
-                print(f"Загружено {len(self.tracks)} треков. Текущий трек: {self.ui.Track_label.text()}")
-            else:
-                print("Понравившиеся треки не найдены.")
-        except Exception as e:
-            print(f"Ошибка при загрузке понравившихся треков: {e}")
+        self.init_yandex_music_client()
 
     def load_track(self, track_index):
         """
         Загружает информацию о треке в UI (обложка, название, исполнитель)
-        и подготавливает плеер к воспроизведению.
+        и подготавливает плеер к воспроизведению. Сетевые запросы выполняются в фоне,
+        результат применяется в _apply_track_info.
 
         :param track_index: Индекс трека в списке self.tracks.
         """
@@ -315,35 +474,53 @@ class MusicPlayer(QObject): # Изменено с QWidget на QObject
         self.current_track_index = track_index
         track_short = self.tracks[self.current_track_index]
 
-        try:
-            # Получаем полную информацию о треке
-            track = track_short.fetch_track()
+        # Новый запрос делает устаревшими все предыдущие (быстрое листание треков)
+        self._track_request_id += 1
+        worker = TrackInfoWorker(self._track_request_id, track_short)
+        worker.signals.result.connect(self._apply_track_info)
+        worker.signals.error.connect(self._on_track_info_error)
+        self.threadpool.start(worker)
+
+    def _apply_track_info(self, request_id, info):
+        """
+        Применяет полученную в фоне информацию о треке.
+        :param request_id: Номер запроса; ответы на устаревшие запросы игнорируются.
+        :param info: Словарь от TrackInfoWorker.
+        """
+        if request_id != self._track_request_id:
+            return
 
-            # Обновляем имя исполнителя и название трека
-            artists = ', '.join(artist.name for artist in track.artists)
-            self.ui.Artist_label.setText(artists)
-            self.ui.Track_label.setText(track.title)
+        self._resume_state = None
+        self._current_track_meta = {
+            'track_id': str(info['track'].id),
+            'artists': info['artists'],
+            'title': info['title'],
+            'duration_ms': info['duration_ms'],
+        }
 
-            # Обновляем статус кнопки "Лайк"
-            self.update_like_status(track)
+        # Обновляем имя исполнителя и название трека
+        self.ui.Artist_label.setText(info['artists'])
+        self.ui.Track_label.setText(info['title'])
 
-            # Обновляем длительность
-            duration_ms = track.duration_ms
-            self.ui.Length_track_bar.setMaximum(duration_ms)
-            self.ui.Right_Time_label.setText(self.format_duration(duration_ms))
+        # Обновляем статус кнопки "Лайк"
+        self.update_like_status(info['track'])
 
-            # Запускаем асинхронную загрузку обложки
-            cover_url = track.get_cover_url(size='400x400')
-            if cover_url:
-                self.start_download(cover_url, self.set_cover)
+        # Обновляем длительность
+        duration_ms = info['duration_ms']
+        self.ui.Length_track_bar.setMaximum(duration_ms)
+        self.ui.Right_Time_label.setText(self.format_duration(duration_ms))
 
-            # Запускаем асинхронную загрузку трека
-            download_info = track.get_download_info()
-            direct_link = download_info[0].get_direct_link()
-            self.start_download(direct_link, self.set_track_data)
+        # Запускаем асинхронную загрузку обложки
+        if info['cover_url']:
+            self.start_download(info['cover_url'], self.set_cover, request_id)
 
-        except Exception as e:
-            print(f"Ошибка при загрузке информации о треке: {e}")
+        # Запускаем асинхронную загрузку трека
+        self.start_download(info['direct_link'], self.set_track_data, request_id)
+
+    def _on_track_info_error(self, request_id, message):
+        """Сообщает об ошибке получения информации о треке."""
+        if request_id == self._track_request_id:
+            print(f"Ошибка при загрузке информации о треке: {message}")
 
     def reinitialize_audio_output(self):
         """
@@ -468,15 +645,22 @@ class MusicPlayer(QObject): # Изменено с QWidget на QObject
             print(f"Ошибка при 'дизлайке' трека: {e}")
 
 
-    def start_download(self, url, callback):
+    def start_download(self, url, callback, request_id=None):
         """
         Запускает воркер для скачивания URL в фоновом потоке.
 
         :param url: URL для скачивания.
         :param callback: Функция, которая будет вызвана с результатом.
+        :param request_id: Номер запроса трека. Если задан, результат отбрасывается,
+                           когда пользователь уже переключился на другой трек.
         """
         worker = DownloaderWorker(url)
-        worker.signals.result.connect(callback)
+        if request_id is None:
+            worker.signals.result.connect(callback)
+        else:
+            worker.signals.result.connect(
+                lambda data: callback(data) if request_id == self._track_request_id else None
+            )
         worker.signals.error.connect(lambda err: print(f"Ошибка скачивания {url}: {err}"))
         self.threadpool.start(worker)
 
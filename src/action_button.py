@@ -1,12 +1,32 @@
 import webbrowser
 import subprocess
-import keyboard
 import os
 import LoadSave
 import control_audio # Импортируем наш новый модуль
+from action_executor import CATEGORY_AUDIO, CATEGORY_GUI, CATEGORY_KEYBOARD, CATEGORY_PROGRAM
+from keyboard_injector import injector, parse_shortcut, MEDIA_PLAY_PAUSE
 
 
 class ButtonActions:
+    # Категории методов для ActionExecutor (остальные - CATEGORY_DEFAULT)
+    METHOD_CATEGORIES = {
+        "open_browser": CATEGORY_PROGRAM,
+        "open_calculator": CATEGORY_PROGRAM,
+        "open_notepad": CATEGORY_PROGRAM,
+        "open_editor": CATEGORY_GUI,
+        "open_settings": CATEGORY_GUI,
+        # Громкость меняет собственный поток control_audio - нажатие только сдвигает цель
+        "sound_up": CATEGORY_GUI,
+        "sound_down": CATEGORY_GUI,
+        # Клавиши отправляет поток keyboard_injector - нажатие только ставит их в очередь
+        "media_play_pause": CATEGORY_KEYBOARD,
+        "toggle_main_second_audio": CATEGORY_AUDIO,
+        "set_main_audio_device": CATEGORY_AUDIO,
+        "set_second_audio_device": CATEGORY_AUDIO,
+        "set_third_audio_device": CATEGORY_AUDIO,
+        "set_fourth_audio_device": CATEGORY_AUDIO,
+    }
+
     def __init__(self, main_window, action_handler):
         """
         Инициализирует обработчик действий кнопок.
@@ -20,10 +40,18 @@ class ButtonActions:
         webbrowser.open("https://www.google.com")
 
     def open_calculator(self):
-        subprocess.run(["calc"])
+        self._spawn(["calc"])
 
     def open_notepad(self):
-        subprocess.run(["notepad"])
+        self._spawn(["notepad"])
+
+    def _spawn(self, args):
+        """Запускает программу, не дожидаясь ее завершения."""
+        try:
+            subprocess.Popen(args)
+            print(f"Запуск программы: {args[0]}")
+        except OSError as e:
+            print(f"Не удалось запустить программу '{args[0]}': {e}")
 
     def open_editor(self):
         # Вызываем метод главного окна для отображения редактора
@@ -43,11 +71,7 @@ class ButtonActions:
 
     def media_play_pause(self):
         """Отправляет команду Play/Pause для управления медиа."""
-        try:
-            keyboard.send("play/pause media")
-            print("Отправлена команда Play/Pause")
-        except Exception as e:
-            print(f"Ошибка при отправке команды Play/Pause: {e}")
+        return self.send_keys(parse_shortcut(MEDIA_PLAY_PAUSE), MEDIA_PLAY_PAUSE)
 
     def run_program(self, path):
         """Запускает программу по указанному пути."""
@@ -60,16 +84,27 @@ class ButtonActions:
         except OSError as e:
             print(f"Не удалось запустить программу '{path}': {e}")
 
-    def send_shortcut(self, keys_string):
-        """Отправляет сочетание клавиш."""
-        try:
-            if not isinstance(keys_string, str):
-                print(f"Ошибка: ожидалась строка, но получен {type(keys_string)} ({keys_string})")
-                return
-            keyboard.send(keys_string.lower())
+    def send_keys(self, steps, keys_string, repeat=1):
+        """
+        Ставит заранее разобранное сочетание (см. parse_shortcut) в очередь потока эмуляции
+        клавиатуры, не дожидаясь отправки.
+        :param steps: Результат parse_shortcut.
+        :param keys_string: Исходная строка сочетания (для журнала).
+        :param repeat: Сколько раз отправить подряд.
+        :return: Future отправки; ошибку сообщает тот, кто его ждет (ActionExecutor, макрос).
+        """
+        future = injector.submit(steps, keys_string, repeat=repeat)
+        future.add_done_callback(lambda done: self._report_keys_sent(done, keys_string))
+        return future
+
+    @staticmethod
+    def _report_keys_sent(future, keys_string):
+        if not future.cancelled() and future.exception() is None:
             print(f"Отправлено сочетание клавиш: {keys_string}")
-        except Exception as e:
-            print(f"Ошибка при отправке сочетания клавиш '{keys_string}': {e}")
+
+    def change_app_audio(self, process, operation, percent=None):
+        """Меняет громкость или звук отдельного приложения (действие app_audio)."""
+        control_audio.change_app_audio(process, operation, percent)
 
     # === УПРАВЛЕНИЕ АУДИОУСТРОЙСТВАМИ ===
 
@@ -0,0 +1,411 @@
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+from action_metrics import OUTCOME_CANCELLED, OUTCOME_FAILED, OUTCOME_OK, OUTCOME_TIMEOUT
+
+# Категории действий: у каждой свой лимит одновременных выполнений и тайм-аут
+CATEGORY_GUI = "gui"           # Работа с окнами приложения - выполняется сразу в GUI-потоке
+CATEGORY_AUDIO = "audio"       # COM-вызовы pycaw - строго по одному
+CATEGORY_PROGRAM = "program"   # Запуск программ и открытие ссылок
+# Эмуляция нажатий клавиш: действие в GUI-потоке ставит их в очередь keyboard_injector и возвращает
+# concurrent.futures.Future; задача считается выполненной, когда он завершится. Очередь потока эмуляции
+# одна, поэтому сочетания не перемешиваются и лимит не нужен
+CATEGORY_KEYBOARD = "keyboard"
+CATEGORY_DEFAULT = "default"
+
+CATEGORY_LIMITS = {
+    CATEGORY_AUDIO: 1,
+    CATEGORY_PROGRAM: 4,
+    CATEGORY_DEFAULT: 2,
+}
+CATEGORY_TIMEOUTS_MS = {
+    CATEGORY_AUDIO: 5000,
+    CATEGORY_PROGRAM: 10000,
+    CATEGORY_KEYBOARD: 2000,
+    CATEGORY_DEFAULT: 10000,
+}
+# Категории, которым нужен инициализированный COM в рабочем потоке
+COM_CATEGORIES = frozenset({CATEGORY_AUDIO})
+# Общий размер пула рабочих потоков
+MAX_WORKERS = 4
+# Сколько последних измерений задержки хранить для статистики
+LATENCY_WINDOW = 500
+# Флаг командной строки, включающий вывод каждого измерения задержки в консоль
+# (сами измерения копятся в LatencyStats всегда)
+TRACE_LATENCY_FLAG = "--trace-latency"
+TRACE_LATENCY = TRACE_LATENCY_FLAG in sys.argv
+
+# Состояния задачи
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+
+
+@contextmanager
+def com_apartment():
+    """
+    Инициализирует COM в текущем потоке на время блока.
+    pycaw/comtypes требуют CoInitialize в каждом потоке, который обращается к COM.
+    """
+    try:
+        import comtypes
+    except ImportError:
+        yield
+        return
+    try:
+        comtypes.CoInitialize()
+        initialized = True
+    except OSError:
+        # COM уже инициализирован в этом потоке в другом режиме - используем как есть
+        initialized = False
+    try:
+        yield
+    finally:
+        if initialized:
+            comtypes.CoUninitialize()
+
+
+class LatencyStats:
+    """Скользящая статистика задержек (последние LATENCY_WINDOW измерений)."""
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self.last_ms = None
+
+    def record(self, elapsed_ms):
+        self._samples.append(elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def summary(self):
+        """
+        :return: Словарь count, avg_ms, p50_ms, p95_ms, max_ms (пустой, если измерений нет).
+        """
+        if not self._samples:
+            return {}
+        ordered = sorted(self._samples)
+        count = len(ordered)
+        return {
+            'count': count,
+            'avg_ms': sum(ordered) / count,
+            'p50_ms': ordered[(count - 1) // 2],
+            'p95_ms': ordered[min(count - 1, int(round(0.95 * (count - 1))))],
+            'max_ms': ordered[-1],
+        }
+
+
+class ActionJob:
+    """Одно поставленное в очередь действие."""
+    def __init__(self, job_id, name, func, args, category, timeout_ms, tag=None):
+        self.job_id = job_id
+        self.name = name
+        self.func = func
+        self.args = args
+        self.category = category
+        self.timeout_ms = timeout_ms
+        self.tag = tag
+        self.state = JOB_PENDING
+        # Моменты постановки в очередь, начала и конца выполнения (time.perf_counter)
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.ended_at = None
+        self.cancel_event = threading.Event()
+        self.timer = None
+        self.signals = None
+        self.future = None # Future отправки для CATEGORY_KEYBOARD
+
+
+class ActionJobSignals(QObject):
+    """
+    Сигналы, доступные из рабочего потока действия.
+    """
+    running = Signal(int, float)   # (номер задачи, момент начала выполнения - time.perf_counter)
+    finished = Signal(int, object) # (номер задачи, результат)
+    failed = Signal(int, str)      # (номер задачи, текст ошибки)
+
+
+class ActionJobRunnable(QRunnable):
+    """
+    Рабочий поток, выполняющий одно действие.
+    """
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.signals = ActionJobSignals()
+
+    def run(self):
+        job = self.job
+        if job.cancel_event.is_set():
+            # Отменена, пока ждала свободный поток: сигнал нужен только для освобождения места в лимите
+            self.signals.finished.emit(job.job_id, None)
+            return
+        job.started_at = time.perf_counter()
+        self.signals.running.emit(job.job_id, job.started_at)
+        try:
+            if job.category in COM_CATEGORIES:
+                with com_apartment():
+                    result = job.func(*job.args)
+            else:
+                result = job.func(*job.args)
+        except Exception as e:
+            job.ended_at = time.perf_counter()
+            self.signals.failed.emit(job.job_id, f"{type(e).__name__}: {e}")
+        else:
+            job.ended_at = time.perf_counter()
+            self.signals.finished.emit(job.job_id, result)
+
+
+class ActionExecutor(QObject):
+    """
+    Выполняет действия кнопок в ограниченном пуле рабочих потоков, чтобы нажатие
+    никогда не блокировало интерфейс. Для каждой категории действий задан лимит
+    одновременных выполнений (лишние ждут в очереди) и тайм-аут.
+    Задачу можно отменить, пока она ждет в очереди или выполняется. Python-поток
+    нельзя прервать принудительно, поэтому результат отмененной задачи или задачи
+    с истекшим тайм-аутом просто отбрасывается, а ее место в лимите остается занятым,
+    пока рабочий поток не вернется: иначе зависший COM-вызов пересекся бы со следующим.
+    Тайм-аут отсчитывается с фактического начала выполнения, а не с ожидания в пуле.
+    Если передан metrics (ActionMetrics), для задач с меткой записываются
+    ожидание в очереди, время выполнения и результат.
+    """
+    started = Signal(int, str)        # (номер задачи, имя действия)
+    running = Signal(int, float)      # (номер задачи, момент фактического начала выполнения)
+    finished = Signal(int, str)       # (номер задачи, имя действия)
+    failed = Signal(int, str, str)    # (номер задачи, имя действия, текст ошибки)
+    cancelled = Signal(int, str)      # (номер задачи, имя действия)
+    _future_done = Signal(int, object, float) # (номер задачи, Future, момент завершения) - из чужого потока
+
+    def __init__(self, parent=None, max_workers=MAX_WORKERS, limits=None, timeouts_ms=None, metrics=None):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.threadpool = QThreadPool(self)
+        self.threadpool.setMaxThreadCount(max_workers)
+        self._limits = dict(CATEGORY_LIMITS, **(limits or {}))
+        self._timeouts_ms = dict(CATEGORY_TIMEOUTS_MS, **(timeouts_ms or {}))
+        self._ids = itertools.count(1)
+        self._jobs = {}     # номер -> ActionJob (ожидающие и выполняющиеся, чей результат еще ждут)
+        self._pending = {}  # категория -> deque(ActionJob)
+        self._running = {}  # категория -> число занятых мест (переданных в пул и еще не вернувшихся задач)
+        self._occupied = {} # номер -> ActionJob, чей рабочий поток еще не вернулся
+        # Future завершается в потоке эмуляции клавиатуры - результат доставляется в GUI-поток
+        self._future_done.connect(self._on_future_done)
+
+    def submit(self, name, func, *args, category=CATEGORY_DEFAULT, timeout_ms=None, tag=None):
+        """
+        Ставит действие в очередь.
+        :param name: Имя действия (для сигналов и журнала).
+        :param func: Вызываемый объект; выполняется в рабочем потоке
+                     (для CATEGORY_GUI - сразу, в GUI-потоке).
+        :param category: Категория действия (CATEGORY_*).
+        :param timeout_ms: Тайм-аут; по умолчанию берется из настроек категории.
+        :param tag: Метка для метрик - кортеж (действие, кнопка); None - не измерять.
+        :return: Номер задачи.
+        """
+        job_id = next(self._ids)
+        if timeout_ms is None:
+            timeout_ms = self._timeouts_ms.get(category, self._timeouts_ms[CATEGORY_DEFAULT])
+        job = ActionJob(job_id, name, func, args, category, timeout_ms, tag)
+        if category == CATEGORY_GUI:
+            self._run_inline(job)
+            return job_id
+        if category == CATEGORY_KEYBOARD:
+            self._start_future(job)
+            return job_id
+
+        self._jobs[job_id] = job
+        self._pending.setdefault(category, deque()).append(job)
+        self._dispatch(category)
+        return job_id
+
+    def job_state(self, job_id):
+        """Возвращает JOB_PENDING, JOB_RUNNING или None, если задача уже завершена."""
+        job = self._jobs.get(job_id)
+        return job.state if job else None
+
+    def cancel(self, job_id):
+        """
+        Отменяет задачу.
+        :return: True, если задача была активна и отменена.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        if job.state == JOB_PENDING:
+            self._pending[job.category].remove(job)
+            del self._jobs[job_id]
+        else:
+            self._complete(job_id)
+            if job.future is not None:
+                job.future.cancel() # Снимается с очереди, только если отправка еще не началась
+        self._record(job, OUTCOME_CANCELLED)
+        print(f"Действие '{job.name}' отменено.")
+        self.cancelled.emit(job_id, job.name)
+        return True
+
+    def cancel_all(self):
+        """Отменяет все ожидающие и выполняющиеся задачи."""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    def shutdown(self, wait_ms=2000):
+        """Отменяет задачи и ждет завершения рабочих потоков (при закрытии приложения)."""
+        self.cancel_all()
+        self.threadpool.clear()
+        if not self.threadpool.waitForDone(wait_ms):
+            print("ВНИМАНИЕ: Не все действия завершились до закрытия приложения.")
+
+    # --- Внутренняя логика ---
+
+    def _run_inline(self, job):
+        """Выполняет действие, работающее с окнами, прямо в GUI-потоке."""
+        self.started.emit(job.job_id, job.name)
+        job.state = JOB_RUNNING
+        job.started_at = time.perf_counter()
+        self.running.emit(job.job_id, job.started_at)
+        try:
+            job.func(*job.args)
+        except Exception as e:
+            job.ended_at = time.perf_counter()
+            self._record(job, OUTCOME_FAILED)
+            message = f"{type(e).__name__}: {e}"
+            print(f"Ошибка при выполнении действия '{job.name}': {message}")
+            self.failed.emit(job.job_id, job.name, message)
+        else:
+            job.ended_at = time.perf_counter()
+            self._record(job, OUTCOME_OK)
+            self.finished.emit(job.job_id, job.name)
+
+    def _start_future(self, job):
+        """
+        Запускает действие CATEGORY_KEYBOARD в GUI-потоке. Задача остается выполняющейся,
+        пока не завершится возвращенный Future, и только тогда попадает в метрики.
+        """
+        self.started.emit(job.job_id, job.name)
+        job.state = JOB_RUNNING
+        job.started_at = time.perf_counter()
+        self.running.emit(job.job_id, job.started_at)
+        try:
+            job.future = job.func(*job.args)
+        except Exception as e:
+            job.ended_at = time.perf_counter()
+            self._record(job, OUTCOME_FAILED)
+            message = f"{type(e).__name__}: {e}"
+            print(f"Ошибка при выполнении действия '{job.name}': {message}")
+            self.failed.emit(job.job_id, job.name, message)
+            return
+        self._jobs[job.job_id] = job
+        self._start_timer(job)
+        job.future.add_done_callback(
+            lambda future, job_id=job.job_id: self._future_done.emit(job_id, future, time.perf_counter())
+        )
+
+    def _start_timer(self, job):
+        job.timer = QTimer(self)
+        job.timer.setSingleShot(True)
+        job.timer.timeout.connect(lambda job_id=job.job_id: self._on_job_timeout(job_id))
+        job.timer.start(job.timeout_ms)
+
+    def _record(self, job, outcome):
+        """Передает в метрики ожидание в очереди и время выполнения задачи."""
+        if self.metrics is None or job.tag is None:
+            return
+        queue_ms = execution_ms = None
+        if job.started_at is not None:
+            queue_ms = (job.started_at - job.submitted_at) * 1000
+            execution_ms = ((job.ended_at or time.perf_counter()) - job.started_at) * 1000
+        action, button = job.tag
+        self.metrics.record(action, button, outcome, queue_ms, execution_ms)
+
+    def _dispatch(self, category):
+        """Запускает ожидающие задачи категории, пока не достигнут ее лимит."""
+        queue = self._pending.get(category)
+        limit = self._limits.get(category, self._limits[CATEGORY_DEFAULT])
+        while queue and self._running.get(category, 0) < limit:
+            job = queue.popleft()
+            job.state = JOB_RUNNING
+            self._running[category] = self._running.get(category, 0) + 1
+            self._occupied[job.job_id] = job
+
+            runnable = ActionJobRunnable(job)
+            runnable.signals.running.connect(self._on_job_running)
+            runnable.signals.finished.connect(self._on_job_finished)
+            runnable.signals.failed.connect(self._on_job_failed)
+            job.signals = runnable.signals
+
+            self.started.emit(job.job_id, job.name)
+            self.threadpool.start(runnable)
+
+    def _complete(self, job_id):
+        """Снимает задачу с учета (ее результат больше не ждут). Место в лимите не освобождается."""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return None
+        if job.timer is not None:
+            job.timer.stop()
+            job.timer.deleteLater()
+            job.timer = None
+        return job
+
+    def _release(self, job_id):
+        """Освобождает место вернувшейся задачи в лимите и запускает следующую задачу ее категории."""
+        job = self._occupied.pop(job_id, None)
+        if job is None:
+            return
+        self._running[job.category] -= 1
+        self._dispatch(job.category)
+
+    def _on_job_running(self, job_id, started_at):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        self._start_timer(job)
+        self.running.emit(job_id, started_at)
+
+    def _on_job_finished(self, job_id, result):
+        job = self._complete(job_id)
+        self._release(job_id)
+        if job is not None:
+            self._record(job, OUTCOME_OK)
+            self.finished.emit(job_id, job.name)
+
+    def _on_job_failed(self, job_id, message):
+        job = self._complete(job_id)
+        self._release(job_id)
+        if job is not None:
+            self._record(job, OUTCOME_FAILED)
+            print(f"Ошибка при выполнении действия '{job.name}': {message}")
+            self.failed.emit(job_id, job.name, message)
+
+    def _on_future_done(self, job_id, future, ended_at):
+        job = self._complete(job_id)
+        if job is None:
+            return # Задача уже отменена или снята по тайм-ауту
+        job.ended_at = ended_at
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled():
+            self._record(job, OUTCOME_CANCELLED)
+            print(f"Действие '{job.name}' отменено.")
+            self.cancelled.emit(job_id, job.name)
+        elif error is not None:
+            self._record(job, OUTCOME_FAILED)
+            message = f"{type(error).__name__}: {error}"
+            print(f"Ошибка при выполнении действия '{job.name}': {message}")
+            self.failed.emit(job_id, job.name, message)
+        else:
+            self._record(job, OUTCOME_OK)
+            self.finished.emit(job_id, job.name)
+
+    def _on_job_timeout(self, job_id):
+        job = self._complete(job_id)
+        if job is not None:
+            job.cancel_event.set()
+            if job.future is not None:
+                job.future.cancel()
+            self._record(job, OUTCOME_TIMEOUT)
+            message = f"превышено время ожидания ({job.timeout_ms} мс)"
+            print(f"Действие '{job.name}': {message}.")
+            self.failed.emit(job_id, job.name, message)
@@ -0,0 +1,260 @@
+import csv
+import json
+import os
+import threading
+
+from utils import PROJECT_ROOT
+
+# Гистограммы задержки и результатов действий кнопок (сохраняются между запусками)
+METRICS_FILE = os.path.join(PROJECT_ROOT, 'cache', 'action_metrics.json')
+_METRICS_FORMAT = 1
+# Как часто сбрасывать накопленные измерения на диск
+METRICS_SAVE_INTERVAL_MS = 60000
+
+# Верхние границы корзин гистограммы, мс; последняя корзина - все, что больше
+BUCKET_BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Результаты выполнения
+OUTCOME_OK = "ok"
+OUTCOME_FAILED = "failed"
+OUTCOME_TIMEOUT = "timeout"
+OUTCOME_CANCELLED = "cancelled"
+OUTCOMES = (OUTCOME_OK, OUTCOME_FAILED, OUTCOME_TIMEOUT, OUTCOME_CANCELLED)
+
+# Группировка строк отчета
+GROUP_BY_ACTION = "action"
+GROUP_BY_BUTTON = "button"
+
+
+def bucket_labels():
+    """Подписи корзин гистограммы: "<=1", ..., ">10000"."""
+    return [f"<={bound}" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}"]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами BUCKET_BOUNDS_MS."""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms):
+        index = len(BUCKET_BOUNDS_MS)
+        for i, bound in enumerate(BUCKET_BOUNDS_MS):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def avg_ms(self):
+        return self.sum_ms / self.count if self.count else None
+
+    def percentile_ms(self, fraction):
+        """
+        Оценка перцентиля по корзинам: верхняя граница корзины, в которую он попадает
+        (для последней корзины - максимум).
+        """
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(BUCKET_BOUNDS_MS[i], self.max_ms) if i < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        return {'counts': self.counts, 'count': self.count, 'sum_ms': self.sum_ms, 'max_ms': self.max_ms}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        counts = data.get('counts', [])
+        if len(counts) == len(histogram.counts):
+            histogram.counts = [int(c) for c in counts]
+            histogram.count = int(data.get('count', sum(histogram.counts)))
+            histogram.sum_ms = float(data.get('sum_ms', 0.0))
+            histogram.max_ms = float(data.get('max_ms', 0.0))
+        return histogram
+
+
+class ActionStats:
+    """Статистика одного действия на одной кнопке."""
+    def __init__(self):
+        self.queue = Histogram()      # Ожидание в очереди до начала выполнения
+        self.execution = Histogram()  # Время выполнения
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+
+    def merge(self, other):
+        self.queue.merge(other.queue)
+        self.execution.merge(other.execution)
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+
+    def to_dict(self):
+        return {'queue': self.queue.to_dict(), 'execution': self.execution.to_dict(), 'outcomes': self.outcomes}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.queue = Histogram.from_dict(data.get('queue', {}))
+        stats.execution = Histogram.from_dict(data.get('execution', {}))
+        for outcome, count in data.get('outcomes', {}).items():
+            stats.outcomes[outcome] = int(count)
+        return stats
+
+
+class ActionMetrics:
+    """
+    Гистограммы задержки в очереди и времени выполнения действий кнопок,
+    а также счетчики успехов и ошибок - по каждой паре (действие, кнопка).
+    Данные копятся в памяти, периодически сохраняются в METRICS_FILE
+    и выгружаются в CSV/JSON для сравнения машин и эффекта оптимизаций.
+    """
+    def __init__(self, path=METRICS_FILE):
+        self.path = path
+        self._stats = {} # (действие, кнопка) -> ActionStats
+        self._lock = threading.Lock()
+        # Счетчик изменений и его значение на момент последнего успешного сохранения
+        self._changes = 0
+        self._saved_changes = 0
+
+    def record(self, action, button, outcome, queue_ms=None, execution_ms=None):
+        """
+        Добавляет одно измерение.
+        :param action: Имя действия (метод, путь программы, сочетание клавиш, имя макроса).
+        :param button: Имя кнопки (objectName) или "" для действий без кнопки.
+        :param outcome: Результат (OUTCOME_*).
+        :param queue_ms: Ожидание в очереди, мс (None - действие не дошло до очереди).
+        :param execution_ms: Время выполнения, мс (None - действие не выполнялось).
+        """
+        with self._lock:
+            stats = self._stats.get((action, button))
+            if stats is None:
+                stats = self._stats[(action, button)] = ActionStats()
+            if queue_ms is not None:
+                stats.queue.record(queue_ms)
+            if execution_ms is not None:
+                stats.execution.record(execution_ms)
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+            self._changes += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._changes += 1
+
+    def rows(self, group_by=GROUP_BY_ACTION):
+        """
+        Сводка для отображения и выгрузки.
+        :param group_by: GROUP_BY_ACTION - по действиям (все кнопки вместе) или GROUP_BY_BUTTON.
+        :return: Список словарей, отсортированный по среднему времени выполнения (сначала самые медленные).
+        """
+        with self._lock:
+            grouped = {}
+            for (action, button), stats in self._stats.items():
+                key = action if group_by == GROUP_BY_ACTION else button
+                merged = grouped.get(key)
+                if merged is None:
+                    merged = grouped[key] = ActionStats()
+                merged.merge(stats)
+
+        rows = []
+        for key, stats in grouped.items():
+            row = {
+                group_by: key,
+                'runs': sum(stats.outcomes.values()),
+                'queue_avg_ms': stats.queue.avg_ms(),
+                'queue_p95_ms': stats.queue.percentile_ms(0.95),
+                'exec_avg_ms': stats.execution.avg_ms(),
+                'exec_p50_ms': stats.execution.percentile_ms(0.5),
+                'exec_p95_ms': stats.execution.percentile_ms(0.95),
+                'exec_max_ms': stats.execution.max_ms if stats.execution.count else None,
+            }
+            row.update(stats.outcomes)
+            row['exec_histogram'] = stats.execution.counts
+            rows.append(row)
+        rows.sort(key=lambda row: row['exec_avg_ms'] or 0.0, reverse=True)
+        return rows
+
+    # --- Сохранение и выгрузка ---
+
+    def load(self):
+        """Загружает накопленные в прошлых сессиях измерения."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Не удалось прочитать метрики действий: {e}")
+            return
+        if not isinstance(data, dict) or data.get("format") != _METRICS_FORMAT \
+                or list(data.get("buckets_ms", [])) != list(BUCKET_BOUNDS_MS):
+            return
+        with self._lock:
+            for entry in data.get("stats", []):
+                try:
+                    key = (entry['action'], entry['button'])
+                    self._stats[key] = ActionStats.from_dict(entry)
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    def save(self, force=False):
+        """
+        Атомарно сохраняет измерения, если с прошлого сохранения были новые.
+        Неудачная запись не сбрасывает изменения - они сохранятся при следующем вызове.
+        """
+        with self._lock:
+            if self._changes == self._saved_changes and not force:
+                return
+            changes = self._changes
+            data = {
+                "format": _METRICS_FORMAT,
+                "buckets_ms": list(BUCKET_BOUNDS_MS),
+                "stats": [
+                    dict(stats.to_dict(), action=action, button=button)
+                    for (action, button), stats in self._stats.items()
+                ],
+            }
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Не удалось сохранить метрики действий: {e}")
+            return
+        with self._lock:
+            # Измерения, добавленные во время записи, остаются несохраненными
+            self._saved_changes = max(self._saved_changes, changes)
+
+    def export_json(self, path, group_by=GROUP_BY_ACTION):
+        """Выгружает сводку в JSON (вместе с подписями корзин гистограммы)."""
+        data = {"buckets": bucket_labels(), "group_by": group_by, "rows": self.rows(group_by)}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path, group_by=GROUP_BY_ACTION):
+        """Выгружает сводку в CSV: одна строка на действие (или кнопку), корзины - отдельными колонками."""
+        labels = bucket_labels()
+        columns = [group_by, 'runs', *OUTCOMES, 'queue_avg_ms', 'queue_p95_ms',
+                   'exec_avg_ms', 'exec_p50_ms', 'exec_p95_ms', 'exec_max_ms']
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + [f"exec {label} ms" for label in labels])
+            for row in self.rows(group_by):
+                values = ["" if row.get(column) is None else row.get(column) for column in columns]
+                writer.writerow(values + row['exec_histogram'])
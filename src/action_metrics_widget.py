@@ -0,0 +1,111 @@
+import os
+
+from PySide6.QtWidgets import (
+    QComboBox, QFileDialog, QGroupBox, QHBoxLayout, QHeaderView, QTableWidget, QTableWidgetItem, QToolButton,
+    QVBoxLayout, QWidget
+)
+
+from action_metrics import (
+    ActionMetrics, GROUP_BY_ACTION, GROUP_BY_BUTTON, OUTCOME_CANCELLED, OUTCOME_FAILED, OUTCOME_OK, OUTCOME_TIMEOUT
+)
+from utils import PROJECT_ROOT
+
+# Колонки таблицы: (заголовок, ключ строки ActionMetrics.rows)
+_COLUMNS = (
+    ("Запусков", 'runs'),
+    ("OK", OUTCOME_OK),
+    ("Ошибок", OUTCOME_FAILED),
+    ("Тайм-аутов", OUTCOME_TIMEOUT),
+    ("Отменено", OUTCOME_CANCELLED),
+    ("Очередь, мс", 'queue_avg_ms'),
+    ("Среднее, мс", 'exec_avg_ms'),
+    ("p95, мс", 'exec_p95_ms'),
+    ("Макс., мс", 'exec_max_ms'),
+)
+
+
+class ActionMetricsWidget(QGroupBox):
+    """
+    Сводка метрик действий кнопок для страницы настроек: таблица по действиям
+    или по кнопкам и выгрузка в CSV/JSON.
+    """
+    def __init__(self, metrics: ActionMetrics, parent: QWidget = None):
+        super().__init__("Action metrics", parent)
+        self.setObjectName("Action_metrics_GB")
+        self.metrics = metrics
+
+        self.group_CB = QComboBox(self)
+        self.group_CB.addItem("По действиям", GROUP_BY_ACTION)
+        self.group_CB.addItem("По кнопкам", GROUP_BY_BUTTON)
+        self.group_CB.currentIndexChanged.connect(self.refresh)
+
+        refresh_tB = QToolButton(self)
+        refresh_tB.setText("Обновить")
+        refresh_tB.clicked.connect(self.refresh)
+        csv_tB = QToolButton(self)
+        csv_tB.setText("CSV")
+        csv_tB.clicked.connect(lambda: self.export("csv"))
+        json_tB = QToolButton(self)
+        json_tB.setText("JSON")
+        json_tB.clicked.connect(lambda: self.export("json"))
+        reset_tB = QToolButton(self)
+        reset_tB.setText("Сбросить")
+        reset_tB.clicked.connect(self.reset)
+
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(self.group_CB, 1)
+        for button in (refresh_tB, csv_tB, json_tB, reset_tB):
+            button.setMinimumHeight(30)
+            header_layout.addWidget(button)
+
+        self.table = QTableWidget(0, len(_COLUMNS) + 1, self)
+        self.table.setHorizontalHeaderLabels(["Действие"] + [title for title, _ in _COLUMNS])
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for column in range(1, len(_COLUMNS) + 1):
+            self.table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+
+        layout = QVBoxLayout(self)
+        layout.addLayout(header_layout)
+        layout.addWidget(self.table)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+
+    def refresh(self):
+        """Перечитывает сводку из ActionMetrics."""
+        group_by = self.group_CB.currentData()
+        self.table.setHorizontalHeaderItem(
+            0, QTableWidgetItem("Действие" if group_by == GROUP_BY_ACTION else "Кнопка")
+        )
+        rows = self.metrics.rows(group_by)
+        self.table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            self.table.setItem(row_index, 0, QTableWidgetItem(str(row[group_by] or "-")))
+            for column, (_, key) in enumerate(_COLUMNS, start=1):
+                value = row.get(key)
+                text = "-" if value is None else (f"{value:.1f}" if isinstance(value, float) else str(value))
+                self.table.setItem(row_index, column, QTableWidgetItem(text))
+
+    def export(self, file_format):
+        """Выгружает текущую сводку в выбранный пользователем файл."""
+        default_path = os.path.join(PROJECT_ROOT, 'cache', f"action_metrics.{file_format}")
+        file_filter = "CSV (*.csv)" if file_format == "csv" else "JSON (*.json)"
+        path, _ = QFileDialog.getSaveFileName(self, "Экспорт метрик действий", default_path, file_filter)
+        if not path:
+            return
+        group_by = self.group_CB.currentData()
+        try:
+            if file_format == "csv":
+                self.metrics.export_csv(path, group_by)
+            else:
+                self.metrics.export_json(path, group_by)
+            print(f"Метрики действий выгружены в '{path}'.")
+        except OSError as e:
+            print(f"Не удалось выгрузить метрики действий: {e}")
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
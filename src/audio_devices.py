@@ -0,0 +1,408 @@
+import sys
+import threading
+from ctypes import POINTER, cast
+
+from PySide6.QtCore import QObject, Signal
+
+from action_executor import com_apartment
+
+# Идентификаторы устройств вывода (render) в Windows начинаются с этого префикса,
+# устройств записи (capture) - с "{0.0.1."
+RENDER_ID_PREFIX = "{0.0.0."
+
+
+class AudioBackend:
+    """
+    Источник данных реестра аудиоустройств. Реализации: PycawAudioBackend (Windows, COM)
+    и FakeAudioBackend (без системного звука - для отладки на Linux и самопроверки
+    в блоке __main__ этого модуля).
+    Методы вызываются из любого потока.
+    """
+    def enumerate_outputs(self):
+        """:return: Словарь {id: имя} активных устройств вывода."""
+        raise NotImplementedError
+
+    def default_output_id(self):
+        """:return: id устройства вывода по умолчанию или None."""
+        raise NotImplementedError
+
+    def output_name(self, device_id):
+        """:return: Имя устройства вывода, если оно активно, иначе None."""
+        raise NotImplementedError
+
+    def set_default_output(self, device_id):
+        """Делает устройство устройством вывода по умолчанию для всех ролей."""
+        raise NotImplementedError
+
+    def activate_volume(self, device_id):
+        """
+        Получает интерфейс громкости устройства (None - устройство по умолчанию).
+        Для COM интерфейс действителен только в потоке, где он получен.
+        :return: Объект с методами get_level() и set_level(scalar), уровень от 0.0 до 1.0.
+        """
+        raise NotImplementedError
+
+    def subscribe(self, listener):
+        """
+        Подписывает реестр на системные уведомления об устройствах.
+        Вызовы listener: on_device_added(id), on_device_removed(id), on_device_state_changed(id, active),
+        on_default_changed(id). Вызывается из GUI-потока.
+        """
+        raise NotImplementedError
+
+    def unsubscribe(self):
+        raise NotImplementedError
+
+
+class PycawAudioBackend(AudioBackend):
+    """Устройства Windows через pycaw/comtypes с уведомлениями IMMNotificationClient."""
+    def __init__(self):
+        from pycaw.pycaw import AudioUtilities, DEVICE_STATE, EDataFlow, ERole
+        from audio_manager import audioSwitch as switcher
+        self._utilities = AudioUtilities
+        self._active_state = DEVICE_STATE.ACTIVE.value
+        self._render_flow = EDataFlow.eRender.value
+        self._multimedia_role = ERole.eMultimedia.value
+        self._switcher = switcher
+        self._notification_enumerator = None
+        self._notification_client = None
+
+    def enumerate_outputs(self):
+        devices = {}
+        with com_apartment():
+            enumerator = self._utilities.GetDeviceEnumerator()
+            collection = enumerator.EnumAudioEndpoints(self._render_flow, self._active_state)
+            for i in range(collection.GetCount()):
+                device = self._utilities.CreateDevice(collection.Item(i))
+                if device.FriendlyName:
+                    devices[device.id] = device.FriendlyName
+        return devices
+
+    def default_output_id(self):
+        with com_apartment():
+            enumerator = self._utilities.GetDeviceEnumerator()
+            return enumerator.GetDefaultAudioEndpoint(self._render_flow, self._multimedia_role).GetId()
+
+    def output_name(self, device_id):
+        if not device_id.startswith(RENDER_ID_PREFIX):
+            return None
+        with com_apartment():
+            enumerator = self._utilities.GetDeviceEnumerator()
+            device = enumerator.GetDevice(device_id)
+            if device.GetState() != self._active_state:
+                return None
+            return self._utilities.CreateDevice(device).FriendlyName
+
+    def set_default_output(self, device_id):
+        pc = self._switcher.pc
+        with com_apartment():
+            for role in (pc.ERole.eConsole, pc.ERole.eMultimedia, pc.ERole.eCommunications):
+                self._switcher.switchOutput(device_id, role)
+
+    def activate_volume(self, device_id):
+        from comtypes import CLSCTX_ALL
+        from pycaw.pycaw import IAudioEndpointVolume
+        enumerator = self._utilities.GetDeviceEnumerator()
+        if device_id:
+            device = enumerator.GetDevice(device_id)
+        else:
+            device = enumerator.GetDefaultAudioEndpoint(self._render_flow, self._multimedia_role)
+        interface = device.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+        return _PycawEndpointVolume(cast(interface, POINTER(IAudioEndpointVolume)))
+
+    def subscribe(self, listener):
+        from pycaw.callbacks import MMNotificationClient
+        render_flow = self._render_flow
+        multimedia_role = self._multimedia_role
+        active_state = self._active_state
+
+        class NotificationClient(MMNotificationClient):
+            # Вызывается службой звука Windows в ее собственных потоках
+            def on_device_added(self, added_device_id):
+                listener.on_device_added(added_device_id)
+
+            def on_device_removed(self, removed_device_id):
+                listener.on_device_removed(removed_device_id)
+
+            def on_device_state_changed(self, device_id, new_state, new_state_id):
+                listener.on_device_state_changed(device_id, new_state_id == active_state)
+
+            def on_default_device_changed(self, flow, flow_id, role, role_id, default_device_id):
+                if flow_id == render_flow and role_id == multimedia_role:
+                    listener.on_default_changed(default_device_id)
+
+        self._notification_client = NotificationClient()
+        self._notification_enumerator = self._utilities.GetDeviceEnumerator()
+        self._notification_enumerator.RegisterEndpointNotificationCallback(self._notification_client)
+
+    def unsubscribe(self):
+        if self._notification_enumerator is not None:
+            self._notification_enumerator.UnregisterEndpointNotificationCallback(self._notification_client)
+        self._notification_enumerator = None
+        self._notification_client = None
+
+
+class _PycawEndpointVolume:
+    """Обертка над IAudioEndpointVolume."""
+    def __init__(self, interface):
+        self._interface = interface
+
+    def get_level(self):
+        return self._interface.GetMasterVolumeLevelScalar()
+
+    def set_level(self, level):
+        self._interface.SetMasterVolumeLevelScalar(level, None)
+
+
+class _FakeEndpointVolume:
+    def __init__(self, levels, device_id):
+        self._levels = levels
+        self._device_id = device_id
+
+    def get_level(self):
+        return self._levels.get(self._device_id, 0.5)
+
+    def set_level(self, level):
+        self._levels[self._device_id] = level
+
+
+class FakeAudioBackend(AudioBackend):
+    """
+    Реализация в памяти: устройства добавляются и удаляются методами add_device/remove_device,
+    уведомления приходят синхронно, как от системы.
+    """
+    def __init__(self, devices=None, default_id=None):
+        self._lock = threading.Lock()
+        self._devices = dict(devices or {}) # id -> имя
+        self._default_id = default_id if default_id is not None else next(iter(self._devices), None)
+        self._listener = None
+        self.levels = {} # id -> громкость (0.0-1.0)
+
+    def enumerate_outputs(self):
+        with self._lock:
+            return dict(self._devices)
+
+    def default_output_id(self):
+        return self._default_id
+
+    def output_name(self, device_id):
+        with self._lock:
+            return self._devices.get(device_id)
+
+    def set_default_output(self, device_id):
+        with self._lock:
+            if device_id not in self._devices:
+                raise ValueError(f"нет устройства {device_id}")
+        self._default_id = device_id
+        if self._listener is not None:
+            self._listener.on_default_changed(device_id)
+
+    def activate_volume(self, device_id):
+        return _FakeEndpointVolume(self.levels, device_id or self._default_id)
+
+    def subscribe(self, listener):
+        self._listener = listener
+
+    def unsubscribe(self):
+        self._listener = None
+
+    def add_device(self, device_id, name):
+        with self._lock:
+            self._devices[device_id] = name
+            if self._default_id is None:
+                self._default_id = device_id
+        if self._listener is not None:
+            self._listener.on_device_added(device_id)
+
+    def remove_device(self, device_id):
+        with self._lock:
+            self._devices.pop(device_id, None)
+        if self._listener is not None:
+            self._listener.on_device_removed(device_id)
+
+
+def create_backend():
+    """Выбирает реализацию: pycaw в Windows, иначе (или если pycaw недоступен) - FakeAudioBackend."""
+    if sys.platform == "win32":
+        try:
+            return PycawAudioBackend()
+        except (ImportError, OSError) as e:
+            print(f"Не удалось загрузить pycaw ({e}). Аудиоустройства недоступны.")
+    return FakeAudioBackend()
+
+
+class AudioDeviceRegistry(QObject):
+    """
+    Кэш устройств вывода звука. Устройства перечисляются один раз (при первом обращении),
+    дальше реестр обновляется по системным уведомлениям о добавлении/удалении устройств
+    и смене устройства по умолчанию. Поиск id по имени и текущего устройства - без COM-вызовов.
+    """
+    devices_changed = Signal(list) # Имена активных устройств
+    default_changed = Signal(str)  # Имя нового устройства по умолчанию ("" - неизвестно)
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock() # Первое перечисление выполняется один раз
+        self._by_id = None  # id -> имя; None - еще не перечислены
+        self._by_name = {}  # имя -> id
+        self._default_id = None
+        self._subscribed = False
+
+    def start(self):
+        """Подписывается на уведомления (вызывать из GUI-потока). Перечисление откладывается до первого запроса."""
+        if self._subscribed:
+            return
+        try:
+            self.backend.subscribe(self)
+            self._subscribed = True
+        except Exception as e:
+            # Без уведомлений реестр остается рабочим, но обновляется только через refresh()
+            print(f"Не удалось подписаться на уведомления об аудиоустройствах: {e}")
+
+    def stop(self):
+        if not self._subscribed:
+            return
+        try:
+            self.backend.unsubscribe()
+        except Exception as e:
+            print(f"Ошибка при отписке от уведомлений об аудиоустройствах: {e}")
+        self._subscribed = False
+
+    def refresh(self):
+        """Полностью перечисляет устройства заново."""
+        devices = self.backend.enumerate_outputs()
+        default_id = self.backend.default_output_id()
+        with self._lock:
+            previous = self._by_id
+            self._by_id = devices
+            self._by_name = {name: device_id for device_id, name in devices.items()}
+            self._default_id = default_id
+        # Первое перечисление получает тот, кто его запросил, - оповещаем только об изменениях
+        if previous is not None and previous != devices:
+            self.devices_changed.emit(list(devices.values()))
+
+    def _ensure_loaded(self):
+        if self._by_id is None:
+            with self._load_lock:
+                if self._by_id is None:
+                    self.refresh()
+
+    # --- Запросы ---
+
+    def names(self):
+        """:return: Список имен активных устройств вывода."""
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._by_id.values())
+
+    def id_for(self, name):
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_name.get(name)
+
+    def default_id(self):
+        """:return: id устройства вывода по умолчанию или None."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._default_id
+
+    def current_name(self):
+        """:return: Имя устройства вывода по умолчанию или None."""
+        self._ensure_loaded()
+        with self._lock:
+            return self._by_id.get(self._default_id) if self._default_id else None
+
+    def set_default(self, name):
+        """
+        Делает устройство с указанным именем устройством по умолчанию.
+        :return: True в случае успеха.
+        :raises: Ошибку бэкенда при неудачном переключении.
+        """
+        device_id = self.id_for(name)
+        if device_id is None:
+            return False
+        self.backend.set_default_output(device_id)
+        # Уведомление придет асинхронно - обновляем сразу, чтобы следующий запрос видел новое значение
+        with self._lock:
+            self._default_id = device_id
+        return True
+
+    # --- Уведомления бэкенда (любой поток) ---
+
+    def on_device_added(self, device_id):
+        self.on_device_state_changed(device_id, True)
+
+    def on_device_removed(self, device_id):
+        self.on_device_state_changed(device_id, False)
+
+    def on_device_state_changed(self, device_id, active):
+        with self._lock:
+            if self._by_id is None:
+                return # Еще не перечисляли - первое обращение получит актуальный список
+        try:
+            name = self.backend.output_name(device_id) if active else None
+        except Exception as e:
+            print(f"Не удалось получить данные аудиоустройства {device_id}: {e}")
+            return
+        with self._lock:
+            old_name = self._by_id.pop(device_id, None)
+            if old_name is not None and self._by_name.get(old_name) == device_id:
+                del self._by_name[old_name]
+            if name:
+                self._by_id[device_id] = name
+                self._by_name[name] = device_id
+            if old_name == name:
+                return
+            names = list(self._by_id.values())
+        self.devices_changed.emit(names)
+
+    def on_default_changed(self, device_id):
+        with self._lock:
+            if self._by_id is None:
+                return
+            changed = device_id != self._default_id
+            self._default_id = device_id
+            name = self._by_id.get(device_id, "")
+        if changed:
+            self.default_changed.emit(name)
+
+
+if __name__ == '__main__':
+    # Этот блок для быстрой проверки реестра без системного звука (работает и на Linux):
+    # перечисление, поиск по имени и id, добавление/удаление устройств и смена устройства по умолчанию.
+    backend = FakeAudioBackend({"{0.0.0.1}": "Динамики", "{0.0.0.2}": "Наушники"}, default_id="{0.0.0.1}")
+    registry = AudioDeviceRegistry(backend)
+    registry.start()
+    device_lists = []
+    default_names = []
+    registry.devices_changed.connect(device_lists.append)
+    registry.default_changed.connect(default_names.append)
+
+    # Уведомления до первого перечисления игнорируются - первый запрос получит актуальный список
+    backend.add_device("{0.0.0.3}", "HDMI")
+    assert device_lists == []
+    assert registry.names() == ["Динамики", "Наушники", "HDMI"]
+    assert registry.id_for("Наушники") == "{0.0.0.2}"
+    assert registry.id_for("Нет такого") is None
+    assert registry.current_name() == "Динамики"
+
+    backend.remove_device("{0.0.0.3}")
+    assert device_lists == [["Динамики", "Наушники"]]
+    assert registry.id_for("HDMI") is None
+    backend.add_device("{0.0.0.4}", "USB")
+    assert device_lists[-1] == ["Динамики", "Наушники", "USB"]
+
+    assert registry.set_default("Наушники")
+    assert registry.default_id() == "{0.0.0.2}"
+    assert registry.current_name() == "Наушники"
+    assert not registry.set_default("Нет такого")
+    # Смена из системы (микшер Windows) приходит уведомлением
+    backend.set_default_output("{0.0.0.4}")
+    assert default_names[-1] == "USB"
+
+    registry.stop()
+    backend.add_device("{0.0.0.5}", "Bluetooth")
+    assert "Bluetooth" not in device_lists[-1]
+    print("AudioDeviceRegistry: все проверки пройдены.")
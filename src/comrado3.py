@@ -1,31 +1,64 @@
-import os
 import warnings
 import copy
-from PySide6.QtGui import QIcon, QFont, QColor
+import time
+from functools import partial
+from PySide6.QtGui import QIcon, QFont, QColor, QInputDevice
 from PySide6.QtCore import QSize, Qt, QObject, QEvent, QTimer, QTime, Signal, QThread
 from PySide6.QtWidgets import QToolButton, QGraphicsDropShadowEffect, QFrame, QPushButton, QDialog, QVBoxLayout
 from action_button import ButtonActions
-from page_manager import PageManager
-from Music_player import MusicPlayer
+from action_executor import (
+    ActionExecutor, LatencyStats, CATEGORY_AUDIO, CATEGORY_DEFAULT, CATEGORY_GUI, CATEGORY_KEYBOARD, CATEGORY_PROGRAM,
+    JOB_PENDING, TRACE_LATENCY
+)
+from macro_engine import MacroScheduler
+from keyboard_injector import parse_shortcut
+from action_metrics import OUTCOME_CANCELLED, OUTCOME_FAILED, OUTCOME_OK
+from page_manager import PageManager, sort_page_keys, get_page_grid
 import constants
 import control_audio
 import LoadSave
-from utils import apply_shadow, resource_path
-from control_hwinfo import HwInfoReader
+from utils import apply_shadow
+from icon_cache import get_icon, resolve_icon_path
+from startup_profiler import profiler
+# Вместе с control_hwinfo загружаются тяжелые clr/wmi - в отчете запуска это отдельная фаза
+with profiler.phase("Импорт clr/wmi (control_hwinfo)"):
+    from control_hwinfo import HwInfoReader
 from save_message_dialog import SaveMessageDialog
 from storage_widget import StorageWidget # <--- Импортируем новый виджет
+from session_snapshot import (
+    save_session, KEY_PAGE, KEY_TAB, KEY_GPU_NAMES, KEY_SENSORS, KEY_AUDIO_DEVICES, KEY_MUSIC,
+    TAB_MAIN, TAB_BUTTONS, TAB_SETTINGS, TAB_MUSIC
+)
 # from utils import adjust_font_size - Больше не нужно
 
 
 
 
+class TapTimeFilter(QObject):
+    """
+    Запоминает на кнопке момент отпускания мыши - начало отсчета задержки нажатия -
+    и то, что клик синтезирован из касания (его действие уже запустил TouchDispatcher).
+    """
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.MouseButtonRelease:
+            watched._tap_time = time.perf_counter()
+            watched._tap_synthesized = (
+                event.deviceType() == QInputDevice.DeviceType.TouchScreen
+                or event.source() != Qt.MouseEventSource.MouseEventNotSynthesized
+            )
+        return False
+
+
 class ActionHandler(QObject):
     audio_device_changed = Signal() # Сигнал для оповещения о смене аудиоустройства
+    dispatch_latency_measured = Signal(float) # Задержка нажатие -> запуск действия, мс
 
-    def __init__(self, main_window):
+    def __init__(self, main_window, restore_session=False):
         """
         Инициализирует обработчик действий.
         :param main_window: Экземпляр главного окна (MainWindow) для доступа к его элементам и состоянию.
+        :param restore_session: Показать снимок прошлой сессии (main_window.session). Только при запуске:
+                                обработчик, пересозданный после сохранения в редакторе, начинает с живых данных.
         """
         super().__init__(main_window)
         self.main_window = main_window
@@ -37,19 +70,90 @@ class ActionHandler(QObject):
         # ======================================
 
         self.button_actions = ButtonActions(main_window, self) # Передаем self (ActionHandler)
+
+        # Реестр устройств вывода создается в GUI-потоке (подписка на уведомления Windows);
+        # устройства перечисляются при первом запросе. Реестр общий на процесс - отключаемся в shutdown()
+        self._device_registry = control_audio.device_registry()
+        self._device_registry.devices_changed.connect(self._on_audio_devices_changed)
+
+        # Действия кнопок выполняются в пуле рабочих потоков, состояние показывается на кнопке
+        self.action_executor = ActionExecutor(self, metrics=main_window.action_metrics)
+        self.action_executor.started.connect(
+            lambda job_id, name: self._set_action_state(job_id, constants.ACTION_STATE_RUNNING)
+        )
+        self.action_executor.finished.connect(lambda job_id, name: self._set_action_state(job_id, ""))
+        self.action_executor.cancelled.connect(lambda job_id, name: self._set_action_state(job_id, ""))
+        self.action_executor.failed.connect(
+            lambda job_id, name, message: self._set_action_state(job_id, constants.ACTION_STATE_FAILED)
+        )
+        self._action_buttons = {} # номер задачи (или ключ запуска макроса) -> кнопка
+
+        # Макросы выполняются в собственных потоках, их шаги - те же действия кнопок
+        self.macro_scheduler = MacroScheduler(self.resolve_action, self)
+        self.macro_scheduler.run_started.connect(
+            lambda run_id, name: self._set_action_state(self._macro_key(run_id), constants.ACTION_STATE_RUNNING)
+        )
+        self.macro_scheduler.run_finished.connect(
+            lambda run_id, name, total_ms: self._set_action_state(self._macro_key(run_id), "")
+        )
+        self.macro_scheduler.run_cancelled.connect(
+            lambda run_id, name: self._set_action_state(self._macro_key(run_id), "")
+        )
+        self.macro_scheduler.run_failed.connect(
+            lambda run_id, name, message: self._set_action_state(self._macro_key(run_id), constants.ACTION_STATE_FAILED)
+        )
+        # Метрики макросов: общая длительность и результат запуска
+        self._macro_tags = {} # ключ запуска -> (имя макроса, кнопка)
+        self.macro_scheduler.run_finished.connect(
+            lambda run_id, name, total_ms: self._record_macro(run_id, OUTCOME_OK, total_ms)
+        )
+        self.macro_scheduler.run_cancelled.connect(lambda run_id, name: self._record_macro(run_id, OUTCOME_CANCELLED))
+        self.macro_scheduler.run_failed.connect(
+            lambda run_id, name, message: self._record_macro(run_id, OUTCOME_FAILED)
+        )
+        # Трассы касаний: начало выполнения (или отмена) действий и макросов, запущенных касанием.
+        # Соединения живут вместе с исполнителями этого обработчика
+        touch_dispatcher = main_window.touch_dispatcher
+        self.action_executor.running.connect(touch_dispatcher.on_action_running)
+        self.action_executor.failed.connect(lambda job_id, name, message: touch_dispatcher.on_action_dropped(job_id))
+        self.action_executor.cancelled.connect(lambda job_id, name: touch_dispatcher.on_action_dropped(job_id))
+        self.macro_scheduler.run_started.connect(
+            lambda run_id, name: touch_dispatcher.on_action_running(self._macro_key(run_id), time.perf_counter())
+        )
+        self.macro_scheduler.run_cancelled.connect(
+            lambda run_id, name: touch_dispatcher.on_action_dropped(self._macro_key(run_id))
+        )
+        # Задержка от нажатия до запуска действия
+        self.dispatch_latency = LatencyStats()
+        self._tap_time_filter = TapTimeFilter(self)
         self.page_manager = PageManager(self)
 
-        # === ПРОВЕРКА И ИНИЦИАЛИЗАЦИЯ НАСТРОЕК АУДИО И HWINFO ===
-        self._initialize_audio_settings()
+        # === ПРОВЕРКА И ИНИЦИАЛИЗАЦИЯ НАСТРОЕК HWINFO ===
         self._initialize_hwinfo_settings()
         # =======================================================
 
-        # === ИНИЦИАЛИЗАЦИЯ ПЛЕЕРА ===
-        self.music_player = MusicPlayer(self.ui)
+        # === ЛЕНИВЫЕ ПОДСИСТЕМЫ ===
+        # Плеер (клиент Яндекс.Музыки, QMediaPlayer) и страница настроек (опрос аудиоустройств)
+        # создаются при первом открытии своей вкладки или заранее в простое (см. _schedule_idle_warmup)
+        self.music_player = None
+        self._settings_page_ready = False
+        self._warmup_steps = []
+        # ==========================
+
+        # === СНИМОК ПРОШЛОЙ СЕССИИ ===
+        # При запуске списки устройств и данные датчиков прошлого запуска показываются сразу,
+        # живые данные заменяют их по мере готовности подсистем
+        self.session = main_window.session
+        self._restore_session = restore_session
+        restored = self.session if restore_session else {}
+        self._gpu_names = list(restored.get(KEY_GPU_NAMES, []))
+        self._audio_devices = restored.get(KEY_AUDIO_DEVICES) # None - список еще не получен
+        self._last_sensor_data = dict(restored.get(KEY_SENSORS, {}))
+        self._restore_page_key = restored.get(KEY_PAGE)
         # =============================
-        
+
         # === ПОДКЛЮЧАЕМ СИГНАЛ СМЕНЫ АУДИОУСТРОЙСТВА К ПЛЕЕРУ ===
-        self.audio_device_changed.connect(self.music_player.reinitialize_audio_output)
+        self.audio_device_changed.connect(self._on_audio_output_changed)
         # =======================================================
 
         # === ИНИЦИАЛИЗАЦИЯ ТАЙМЕРА ДЛЯ ЧАСОВ ===
@@ -69,11 +173,12 @@ class ActionHandler(QObject):
         self.hw_reader.gpu_data_updated.connect(self.update_gpu_display)
         self.hw_reader.memory_data_updated.connect(self.update_ram_display)
         self.hw_reader.storage_data_updated.connect(self.update_storage_display)
-        self.hw_reader.available_gpus_found.connect(self._populate_hwinfo_selectors)
+        self.hw_reader.available_gpus_found.connect(self._on_available_gpus_found)
         # Подключаем сигналы для корректного завершения
         self.hw_thread.finished.connect(self.hw_thread.deleteLater)
         # Запускаем поток
-        self.hw_thread.start()
+        with profiler.phase("Запуск потока HWINFO"):
+            self.hw_thread.start()
         # =========================================
 
         # === КОНТЕЙНЕР ДЛЯ ДИНАМИЧЕСКИХ ВИДЖЕТОВ ХРАНИЛИЩА ===
@@ -90,6 +195,9 @@ class ActionHandler(QObject):
             print("Layout для виджетов дисков был создан программно.")
         # ==========================================================
 
+        # Данные датчиков прошлой сессии - до первого ответа потока мониторинга
+        self._paint_session_sensors()
+
         self.page_manager.page_changed.connect(self.switch_to_page)
         self.current_page_index = 0
         self._page_keys = [] # Список для хранения отсортированных ключей страниц
@@ -101,10 +209,6 @@ class ActionHandler(QObject):
         self.ui._4Music_tab.installEventFilter(self)
         # ============================================
 
-        # === ЗАПОЛНЕНИЕ ВЫПАДАЮЩИХ СПИСКОВ АУДИОУСТРОЙСТВ ===
-        self._settings_audio_device_selectors()
-        # ======================================================
-
         # === ПОДКЛЮЧЕНИЕ ОБРАБОТЧИКОВ ДЛЯ ЭЛЕМЕНТОВ НАСТРОЕК HWINFO ===
         if hasattr(self.ui, 'gpu_name_CB'):
             self.ui.gpu_name_CB.textActivated.connect(self._on_gpu_selection_changed)
@@ -150,6 +254,7 @@ class ActionHandler(QObject):
         apply_shadow(self.ui.Page_control_frame, blur_radius=25, color=(0, 0, 0, 200))
 
         # Добавляем легкую тень к кнопкам и меткам управления
+        # (тень повторяет их текст и края, поэтому всегда рисуется эффектом)
         widgets_to_shadow = [
             self.ui.Change_Button,
             self.ui.Editor_button,
@@ -158,7 +263,7 @@ class ActionHandler(QObject):
             self.ui.NextButton_main,
         ]
         for widget in widgets_to_shadow:
-            apply_shadow(widget, blur_radius=15, x_offset=2, y_offset=2, color=(0, 0, 0, 80))
+            apply_shadow(widget, blur_radius=15, x_offset=2, y_offset=2, color=(0, 0, 0, 80), opaque=False)
 
         # # === ТЕНИ ДЛЯ КНОПОК ПЛЕЕРА ===
         # player_buttons_to_shadow = [
@@ -173,6 +278,174 @@ class ActionHandler(QObject):
         # for button in player_buttons_to_shadow:
         #     apply_shadow(button, blur_radius=20, color=(243, 102, 168, 255)) # Используем RGBA для QColor
 
+        if restore_session:
+            self._restore_session_tab()
+        self._schedule_idle_warmup()
+
+    def shutdown(self):
+        """
+        Останавливает выполнение действий обработчика и отключает его от общего реестра
+        аудиоустройств: при закрытии приложения и перед заменой обработчика новым
+        (после сохранения в редакторе).
+        Макросы вызывают слоты обработчика в GUI-потоке, поэтому они отменяются первыми.
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            try:
+                self._device_registry.devices_changed.disconnect(self._on_audio_devices_changed)
+            except (TypeError, RuntimeError):
+                pass
+        self.macro_scheduler.shutdown()
+        self.action_executor.shutdown()
+        # Номера задач нового обработчика начнутся заново - незавершенные трассы старых не должны с ними совпасть
+        self.main_window.touch_dispatcher.drop_pending_traces()
+
+    # --- Снимок сессии ---
+
+    def _paint_session_sensors(self):
+        """Показывает последние данные датчиков из снимка прошлой сессии."""
+        sensors = self._last_sensor_data
+        try:
+            if sensors.get('cpu'):
+                self.update_cpu_display(sensors['cpu'])
+            if sensors.get('gpu'):
+                self.update_gpu_display(sensors['gpu'])
+            if sensors.get('ram'):
+                self.update_ram_display(sensors['ram'])
+            if sensors.get('storage'):
+                self.update_storage_display(sensors['storage'])
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"Не удалось показать данные датчиков из снимка сессии: {e}")
+
+    def _restore_session_tab(self):
+        """Открывает вкладку, которая была открыта при выходе."""
+        tab = self.session.get(KEY_TAB)
+        if tab == TAB_BUTTONS:
+            self._show_button_page()
+        elif tab == TAB_SETTINGS:
+            self._show_settings_page()
+        elif tab == TAB_MUSIC:
+            self._show_music_page()
+
+    def _take_initial_page_number(self):
+        """Номер страницы кнопок для первого показа: страница прошлой сессии или первая."""
+        page_key, self._restore_page_key = self._restore_page_key, None
+        index = self.page_manager.get_index_for_key(page_key) if page_key else None
+        return index + 1 if isinstance(index, int) and index >= 0 else 1
+
+    def _current_tab(self):
+        """Возвращает имя открытой вкладки для снимка сессии."""
+        current = self.ui.Main_stackW.currentWidget()
+        tabs = {
+            TAB_BUTTONS: self.ui.Button_page,
+            TAB_SETTINGS: self.ui.Settings_page,
+            TAB_MUSIC: self.ui.Music_page,
+        }
+        return next((name for name, page in tabs.items() if current is page), TAB_MAIN)
+
+    def save_session(self):
+        """Сохраняет снимок сессии при выходе из приложения."""
+        music = self.music_player.export_session() if self.music_player is not None else None
+        save_session({
+            KEY_PAGE: self.page_manager.get_key_for_index(self.page_manager.current_page_index),
+            KEY_TAB: self._current_tab(),
+            KEY_GPU_NAMES: self._gpu_names,
+            KEY_SENSORS: self._last_sensor_data,
+            KEY_AUDIO_DEVICES: self._audio_devices,
+            # Если плеер в этой сессии не создавался, сохраняем прошлое состояние
+            KEY_MUSIC: music if music is not None else self.session.get(KEY_MUSIC),
+        })
+
+    # --- Ленивые подсистемы ---
+
+    def ensure_music_player(self):
+        """
+        Создает плеер при первом обращении. Модуль Music_player (yandex_music, QtMultimedia)
+        тоже импортируется только здесь.
+        :return: Экземпляр MusicPlayer.
+        """
+        if self.music_player is None:
+            with profiler.phase("MusicPlayer"):
+                from Music_player import MusicPlayer
+                self.music_player = MusicPlayer(self.ui)
+            if self._restore_session:
+                self.music_player.restore_session(self.session.get(KEY_MUSIC))
+            print("Плеер инициализирован.")
+        return self.music_player
+
+    def ensure_settings_page(self):
+        """
+        Заполняет страницу настроек при первом обращении: проверяет конфигурацию аудио
+        (опрос устройств через COM), заполняет списки аудиоустройств и GPU.
+        Если есть список устройств из снимка прошлой сессии, списки заполняются по нему,
+        а живой опрос выполняется следующим проходом цикла событий.
+        """
+        if self._settings_page_ready:
+            return
+        self._settings_page_ready = True
+        if self._audio_devices is not None:
+            self._settings_audio_device_selectors(self._audio_devices)
+            QTimer.singleShot(0, self._refresh_audio_devices)
+        else:
+            self._refresh_audio_devices()
+        self._populate_hwinfo_selectors()
+        self._add_action_metrics_view()
+        print("Страница настроек инициализирована.")
+
+    def _add_action_metrics_view(self):
+        """Добавляет под настройками HWINFO и аудио таблицу метрик действий (один раз за время работы окна)."""
+        if getattr(self.ui, "Action_metrics_GB", None) is not None:
+            return
+        from action_metrics_widget import ActionMetricsWidget
+        widget = ActionMetricsWidget(self.main_window.action_metrics, self.ui.scrollAreaWidgetContents)
+        # Содержимое прокрутки размечено абсолютно: блоки настроек занимают верхние 250 px
+        widget.setGeometry(10, 260, 641, 330)
+        widget.show()
+        self.ui.Action_metrics_GB = widget
+
+    def _refresh_audio_devices(self):
+        """Опрашивает аудиоустройства один раз и обновляет по результату конфиг и списки настроек."""
+        with profiler.phase("Опрос аудиоустройств"):
+            self._audio_devices = control_audio.get_all_devices()
+        with profiler.phase("Настройки аудио"):
+            self._initialize_audio_settings(self._audio_devices)
+        with profiler.phase("Списки аудиоустройств"):
+            self._settings_audio_device_selectors(self._audio_devices)
+
+    def _on_audio_devices_changed(self, available_devices):
+        """Обновляет списки устройств на странице настроек при подключении или отключении устройства."""
+        self._audio_devices = available_devices
+        if self._settings_page_ready:
+            self._settings_audio_device_selectors(available_devices)
+
+    def _on_audio_output_changed(self):
+        """Переподключает вывод плеера к новому устройству, если плеер уже создан."""
+        if self.music_player is not None:
+            self.music_player.reinitialize_audio_output()
+
+    def _schedule_idle_warmup(self):
+        """
+        Если включено в ui_settings, после запуска по одной готовит ленивые подсистемы,
+        чтобы первое открытие вкладок было мгновенным.
+        """
+        ui_settings = self.main_window.config.get(constants.KEY_UI_SETTINGS, {})
+        if not ui_settings.get(constants.KEY_IDLE_WARMUP, constants.DEFAULT_IDLE_WARMUP):
+            return
+        self._warmup_steps = [self.ensure_settings_page, self.ensure_music_player]
+        QTimer.singleShot(constants.IDLE_WARMUP_DELAY_MS, self._warm_up_next)
+
+    def _warm_up_next(self):
+        """Выполняет один шаг прогрева за проход цикла событий, чтобы не блокировать ввод."""
+        if not self._warmup_steps:
+            return
+        step = self._warmup_steps.pop(0)
+        try:
+            step()
+        except Exception as e:
+            print(f"Ошибка при фоновой инициализации: {e}")
+        if self._warmup_steps:
+            QTimer.singleShot(0, self._warm_up_next)
+
     def handle_audio_switch(self):
         """
         Обрабатывает нажатие на кнопку переключения аудио.
@@ -199,14 +472,14 @@ class ActionHandler(QObject):
         print("="*45)
 
 
-    def _initialize_audio_settings(self):
+    def _initialize_audio_settings(self, available_devices):
         """
         Проверяет и обновляет конфигурацию аудио при каждом запуске.
         Заполняет пустые слоты доступными устройствами, не удаляя
         настроенные, но временно отключенные устройства.
+        :param available_devices: Список активных аудиоустройств.
         """
         config = self.main_window.config
-        available_devices = control_audio.get_all_devices()
 
         # 1. Гарантируем наличие секции audio_settings
         if "audio_settings" not in config:
@@ -246,17 +519,21 @@ class ActionHandler(QObject):
         else:
             print("Аудиоустройства в норме. Обновление конфигурации не требуется.")
 
-    def _settings_audio_device_selectors(self):
+    def _settings_audio_device_selectors(self, available_devices=None):
         """
         Заполняет комбобоксы на странице настроек списком доступных
         и сохраненных аудиоустройств из ВРЕМЕННОГО состояния.
+        :param available_devices: Уже полученный список устройств; если не передан, устройства опрашиваются.
         """
         # При первом запуске инициализируем временное хранилище из основного конфига
         if not self.staged_audio_settings:
             self.staged_audio_settings = copy.deepcopy(self.main_window.config.get("audio_settings", {}))
 
         # 1. Получаем все необходимые данные
-        available_devices = control_audio.get_all_devices()
+        if available_devices is None:
+            with profiler.phase("Опрос аудиоустройств"):
+                available_devices = control_audio.get_all_devices()
+            self._audio_devices = available_devices
         # РАБОТАЕМ С ВРЕМЕННЫМИ НАСТРОЙКАМИ
         audio_settings = self.staged_audio_settings
         
@@ -359,10 +636,7 @@ class ActionHandler(QObject):
     def setup_pages_and_controls(self):
         """Настраивает элементы управления страницами и загружает начальную страницу."""
         # Получаем и сохраняем отсортированные ключи страниц
-        page_keys = sorted(
-            [key for key in self.main_window.config if key.startswith(constants.PAGE_PREFIX)],
-            key=lambda k: int(k.split('_')[1])
-        )
+        page_keys = sort_page_keys(key for key in self.main_window.config if key.startswith(constants.PAGE_PREFIX))
         self.page_manager.set_page_keys(page_keys)
         
         # Подключаем кнопки навигации по страницам
@@ -382,7 +656,7 @@ class ActionHandler(QObject):
                 pass
         self.ui.BackButton_main.clicked.connect(self.page_manager.previous)
 
-        self.page_manager.go_to_page(1)
+        self.page_manager.go_to_page(self._take_initial_page_number())
 
         # Отключаем предыдущий обработчик, только если он был подключен
         with warnings.catch_warnings():
@@ -454,6 +728,7 @@ class ActionHandler(QObject):
 
     def update_cpu_display(self, data: dict):
         """Обновляет метки с информацией о CPU на главной странице."""
+        self._last_sensor_data['cpu'] = data
         # Извлекаем значения, предоставляя "заглушки" на случай их отсутствия или значения None
         name = data.get('name') or 'N/A'
         clocks = data.get('clocks') or 0
@@ -471,6 +746,7 @@ class ActionHandler(QObject):
 
     def update_ram_display(self, data: dict):
         """Обновляет метки и прогресс-бар с информацией о RAM на главной странице."""
+        self._last_sensor_data['ram'] = data
         if not hasattr(self.ui, 'progressBar_ram'):
             return # Если виджетов нет, ничего не делаем
 
@@ -489,6 +765,7 @@ class ActionHandler(QObject):
         Динамически обновляет отображение накопителей в ScrollArea.
         Очищает старые виджеты и создает новые на основе свежих данных.
         """
+        self._last_sensor_data['storage'] = drives_data
         # --- 1. Очистка старых виджетов ---
         # Удаляем виджеты из layout и помечаем их для удаления сборщиком мусора
         for widget in self.drive_widgets:
@@ -509,6 +786,7 @@ class ActionHandler(QObject):
 
     def update_gpu_display(self, data: dict):
         """Обновляет метки с информацией о GPU на главной странице."""
+        self._last_sensor_data['gpu'] = data
         if not hasattr(self.ui, 'value_name_gpu'):
              return
 
@@ -542,10 +820,12 @@ class ActionHandler(QObject):
 
     def _show_settings_page(self):
         """Переключает главный QStackedWidget на страницу 'Settings_page'."""
+        self.ensure_settings_page()
         self.ui.Main_stackW.setCurrentWidget(self.ui.Settings_page)
 
     def _show_music_page(self):
         """Переключает главный QStackedWidget на страницу 'Music_page'."""
+        self.ensure_music_player()
         self.ui.Main_stackW.setCurrentWidget(self.ui.Music_page)
 
     def _update_page_label(self):
@@ -570,25 +850,20 @@ class ActionHandler(QObject):
         self.hwinfo_settings_dirty = False
         print("Настройки HWINFO инициализированы.")
 
-    def _populate_hwinfo_selectors(self, gpu_names):
-        """Заполняет комбобокс выбора GPU и устанавливает начальное значение."""
-        if not hasattr(self.ui, 'gpu_name_CB'):
-            return
+    def _on_available_gpus_found(self, gpu_names):
+        """Выбирает GPU для мониторинга; комбобокс заполняется вместе со страницей настроек."""
         #print(f"Найденные GPU: {gpu_names}")
-        self.ui.gpu_name_CB.clear()
-        self.ui.gpu_name_CB.addItems(gpu_names)
+        self._gpu_names = list(gpu_names)
 
         # Определяем GPU для мониторинга
         saved_gpu = self.main_window.config.get("hwinfo_settings", {}).get("selected_gpu_name")
         target_gpu = ""
 
         if saved_gpu and saved_gpu in gpu_names:
-            self.ui.gpu_name_CB.setCurrentText(saved_gpu)
             target_gpu = saved_gpu
             print(f"Загружен сохраненный GPU: {target_gpu}")
         elif gpu_names:
             target_gpu = gpu_names[0]
-            self.ui.gpu_name_CB.setCurrentText(target_gpu)
             # Так как это выбор по умолчанию, сохраним его сразу, чтобы при следующем запуске он уже был.
             self._on_gpu_selection_changed(target_gpu) 
             self._apply_hwinfo_settings() # Сохраняем начальный выбор
@@ -597,6 +872,19 @@ class ActionHandler(QObject):
         # Сразу передаем имя в поток мониторинга
         if target_gpu:
             self.hw_reader.target_gpu_name = target_gpu
+
+        if self._settings_page_ready:
+            self._populate_hwinfo_selectors()
+
+    def _populate_hwinfo_selectors(self):
+        """Заполняет комбобокс выбора GPU найденными GPU и выбирает сохраненный."""
+        if not hasattr(self.ui, 'gpu_name_CB'):
+            return
+        self.ui.gpu_name_CB.clear()
+        self.ui.gpu_name_CB.addItems(self._gpu_names)
+        selected_gpu = self.staged_hwinfo_settings.get("selected_gpu_name")
+        if selected_gpu:
+            self.ui.gpu_name_CB.setCurrentText(selected_gpu)
     
     def _on_gpu_selection_changed(self, gpu_name):
         """Обновляет временные настройки при выборе GPU в комбобоксе."""
@@ -662,70 +950,236 @@ class ActionHandler(QObject):
             warnings.warn(f"Попытка переключиться на страницу {page_number}, которой нет в UI главного окна.")
             return
 
+        started = time.perf_counter()
+        stacked_widget = self.ui.Button_stackedWidget
+        previous_index = stacked_widget.currentIndex()
         self.current_page_index = page_index
-        self.ui.Button_stackedWidget.setCurrentIndex(page_index)
-
-        # Обновляем размеры иконок для новой страницы
-        self.main_window.update_icon_sizes()
 
+        # Создаем содержимое страницы при первом переходе на нее (или берем из LRU).
+        # Если страница уже отрисована с актуальной версией конфига, перерисовка не нужна.
+        up_to_date = self.main_window.prepare_page(page_index)
 
+        # Анимация рисует снимки страниц поверх стека, поэтому запускается до смены страницы
+        transition = self.main_window.page_transition
+        animated = transition.can_animate(previous_index, page_index)
+        if animated:
+            transition.start(previous_index, page_index, self._transition_direction(previous_index, page_index))
+        else:
+            transition.finish()
+        stacked_widget.setCurrentIndex(page_index)
 
         self._update_page_label()
-        
-        self.load_page_config(page_index)
+
+        if not animated:
+            transition.schedule_prerender()
+
+        if TRACE_LATENCY:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"Страница {page_number}: {elapsed_ms:.2f} мс ({'без перерисовки' if up_to_date else 'перерисована'})")
+
+    def _transition_direction(self, from_index, to_index):
+        """Определяет направление анимации с учетом зацикливания страниц: 1 - вперед, -1 - назад."""
+        page_count = self.ui.Button_stackedWidget.count()
+        if to_index == (from_index + 1) % page_count:
+            return 1
+        if to_index == (from_index - 1) % page_count:
+            return -1
+        return 1 if to_index > from_index else -1
 
     def on_button_clicked(self):
-        """Обрабатывает клик мыши по кнопке."""
+        """Обрабатывает клик мыши по кнопке. Клики, синтезированные из касаний, пропускаются."""
         button = self.main_window.sender()
-        if button:
-            self.handle_button_action(button)
+        if not button:
+            return
+        touch_dispatcher = getattr(self.main_window, "touch_dispatcher", None)
+        if touch_dispatcher is not None and touch_dispatcher.is_duplicate_click(button):
+            button._tap_time = None
+            return
+        self.handle_button_action(button)
 
     def handle_button_action(self, button):
         """
-        Извлекает и выполняет действие, назначенное на кнопку.
+        Выполняет действие, назначенное на кнопку. Действие заранее скомпилировано
+        в compile_button_action при загрузке страницы, поэтому нажатие - один вызов.
         :param button: Объект QToolButton, для которого нужно выполнить действие.
+        :return: Номер задачи ActionExecutor или ключ запуска макроса (None, если ничего не запущено).
         """
-        if not isinstance(button, QToolButton):
-            return
-
-        page_key = self.page_manager.get_key_for_index(self.page_manager.current_page_index)
-        if not page_key:
+        dispatch = getattr(button, "_dispatch", None)
+        if dispatch is None:
+            return None
+        key = dispatch()
+
+        tap_time = getattr(button, "_tap_time", None)
+        if tap_time is not None:
+            button._tap_time = None
+            elapsed_ms = (time.perf_counter() - tap_time) * 1000
+            self.dispatch_latency.record(elapsed_ms)
+            self.dispatch_latency_measured.emit(elapsed_ms)
+            if TRACE_LATENCY:
+                print(f"Нажатие -> запуск действия: {elapsed_ms:.2f} мс")
+        return key
+
+    def cancel_button_action(self, button):
+        """
+        Отменяет действие или макрос, запущенный кнопкой (долгое нажатие).
+        :return: True, если было что отменять.
+        """
+        key = button.property("actionJob")
+        if key not in self._action_buttons:
+            return False
+        if isinstance(key, str) and key.startswith("macro-"):
+            return self.macro_scheduler.cancel(int(key.split("-", 1)[1]))
+        return self.action_executor.cancel(key)
+
+    def compile_button_action(self, button, action_config):
+        """
+        Превращает конфигурацию действия кнопки в готовый вызов и сохраняет его на кнопке.
+        :param button: Кнопка страницы.
+        :param action_config: Словарь действия из конфига ({"type": ..., "value": ...}).
+        """
+        button._dispatch = None
+        if not isinstance(action_config, dict):
             return
-        
-        page_config = self.main_window.config.get(page_key, {})
-        
-        button_number_str = ''.join(filter(str.isdigit, button.objectName()))
-        if not button_number_str:
+        action_type = action_config.get(constants.KEY_ACTION_TYPE)
+        action_value = action_config.get(constants.KEY_ACTION_VALUE)
+        if not action_value:
             return
-        
-        button_number = int(button_number_str)
-        button_name_config = f"{constants.BUTTON_PREFIX}{button_number}"
-
-        button_config = page_config.get(button_name_config, {})
-        action_config = button_config.get(constants.KEY_ACTION, {})
 
-        if isinstance(action_config, dict):
-            action_type = action_config.get(constants.KEY_ACTION_TYPE)
-            action_value = action_config.get(constants.KEY_ACTION_VALUE)
-
-            if not action_value:
+        if action_type == constants.ACTION_TYPE_MACRO:
+            try:
+                steps = self.macro_scheduler.compile(action_value)
+            except ValueError as e:
+                print(f"Предупреждение: Некорректный макрос у кнопки {button.objectName()}: {e}")
                 return
+            name = action_config.get(constants.KEY_NAME) or f"Макрос {button.objectName()}"
+            button._dispatch = partial(self._toggle_macro, button, name, steps)
+        else:
+            resolved = self.resolve_action(action_type, action_value)
+            if resolved is None:
+                if action_type:
+                    print(f"Предупреждение: Неизвестное действие '{action_value}' у кнопки {button.objectName()}.")
+                return
+            func, args, category = resolved
+            button._dispatch = partial(self._submit_action, button, action_value, func, *args, category=category)
+        button.installEventFilter(self._tap_time_filter)
 
-            if action_type == constants.ACTION_TYPE_METHOD:
-                action_method = getattr(self.button_actions, action_value, None)
-                if not action_method:
-                    action_method = getattr(self, action_value, None)
-                if action_method and callable(action_method):
-                    action_method()
-            
-            elif action_type == constants.ACTION_TYPE_PROGRAM:
-                self.button_actions.run_program(action_value)
-
-            elif action_type == constants.ACTION_TYPE_SHORTCUT:
-                self.button_actions.send_shortcut(action_value)
-
-    def load_page_config(self, page_index):
-        """Загружает конфигурацию кнопок для указанной страницы."""
+    def resolve_action(self, action_type, action_value):
+        """
+        Находит вызов для простого действия (method, program, shortcut, app_audio).
+        :return: Кортеж (функция, аргументы, категория ActionExecutor) или None.
+        """
+        if action_type == constants.ACTION_TYPE_METHOD:
+            category = ButtonActions.METHOD_CATEGORIES.get(action_value, CATEGORY_DEFAULT)
+            func = getattr(self.button_actions, action_value, None)
+            if not func:
+                # Методы ActionHandler (листание страниц и т.п.) работают с виджетами
+                func = getattr(self, action_value, None)
+                category = CATEGORY_GUI
+            return (func, (), category) if callable(func) else None
+        if action_type == constants.ACTION_TYPE_PROGRAM:
+            return self.button_actions.run_program, (action_value,), CATEGORY_PROGRAM
+        if action_type == constants.ACTION_TYPE_SHORTCUT:
+            # Строка разбирается один раз при загрузке страницы, нажатие ставит готовые скан-коды
+            # в очередь потока эмуляции клавиатуры и завершается вместе с их отправкой
+            try:
+                steps = parse_shortcut(action_value)
+            except ValueError as e:
+                print(f"Предупреждение: Не удалось разобрать сочетание клавиш '{action_value}': {e}")
+                return None
+            return self.button_actions.send_keys, (steps, action_value), CATEGORY_KEYBOARD
+        if action_type == constants.ACTION_TYPE_APP_AUDIO:
+            try:
+                process, operation, percent = control_audio.parse_app_audio(action_value)
+            except ValueError as e:
+                print(f"Предупреждение: Некорректное действие громкости приложения '{action_value}': {e}")
+                return None
+            # Индекс аудиосессий начинает заполняться в фоне уже при загрузке страницы
+            control_audio.session_index()
+            return self.button_actions.change_app_audio, (process, operation, percent), CATEGORY_AUDIO
+        return None
+
+    @staticmethod
+    def _macro_key(run_id):
+        """Ключ запуска макроса в _action_buttons (не пересекается с номерами задач ActionExecutor)."""
+        return f"macro-{run_id}"
+
+    def _toggle_macro(self, button, name, steps):
+        """
+        Запускает макрос кнопки; повторное нажатие во время выполнения отменяет его.
+        :return: Ключ запуска макроса или None.
+        """
+        key = button.property("actionJob")
+        if isinstance(key, str) and key.startswith("macro-"):
+            if self.macro_scheduler.cancel(int(key.split("-", 1)[1])):
+                return None
+        run_id = self.macro_scheduler.start(name, steps)
+        if run_id is None:
+            return None
+        key = self._macro_key(run_id)
+        self._macro_tags[key] = (name, button.objectName())
+        self._action_buttons[key] = button
+        button.setProperty("actionJob", key)
+        self._set_action_state(key, constants.ACTION_STATE_RUNNING)
+        return key
+
+    def _submit_action(self, button, name, func, *args, category=CATEGORY_DEFAULT):
+        """
+        Передает действие в ActionExecutor и отмечает кнопку как занятую.
+        :return: Номер задачи ActionExecutor.
+        """
+        job_id = self.action_executor.submit(name, func, *args, category=category, tag=(name, button.objectName()))
+        state = self.action_executor.job_state(job_id)
+        if state is None:
+            return job_id # Действие уже выполнено (GUI-действия выполняются сразу)
+        self._action_buttons[job_id] = button
+        button.setProperty("actionJob", job_id)
+        self._set_action_state(
+            job_id, constants.ACTION_STATE_QUEUED if state == JOB_PENDING else constants.ACTION_STATE_RUNNING
+        )
+        return job_id
+
+    def _record_macro(self, run_id, outcome, total_ms=None):
+        """Передает результат запуска макроса в метрики действий."""
+        tag = self._macro_tags.pop(self._macro_key(run_id), None)
+        if tag is not None:
+            name, button_name = tag
+            # Макрос стартует сразу в своем потоке - ожидания в очереди нет
+            queue_ms = 0.0 if total_ms is not None else None
+            self.main_window.action_metrics.record(name, button_name, outcome, queue_ms, total_ms)
+
+    def _set_action_state(self, job_id, state):
+        """
+        Меняет свойство actionState кнопки, по которому Style.qss рисует индикатор.
+        Кнопка могла быть переиспользована пулом, поэтому проверяется номер задачи.
+        """
+        button = self._action_buttons.get(job_id)
+        if button is None:
+            return
+        if state not in (constants.ACTION_STATE_QUEUED, constants.ACTION_STATE_RUNNING):
+            del self._action_buttons[job_id]
+        if button.property("actionJob") != job_id:
+            return
+        button.setProperty("actionState", state)
+        button.style().unpolish(button)
+        button.style().polish(button)
+        if state == constants.ACTION_STATE_FAILED:
+            QTimer.singleShot(constants.ACTION_FAILED_STATE_MS, lambda: self._clear_failed_state(button, job_id))
+
+    @staticmethod
+    def _clear_failed_state(button, job_id):
+        """Снимает отметку об ошибке, если кнопка не занята новым действием."""
+        if button.property("actionJob") == job_id and button.property("actionState") == constants.ACTION_STATE_FAILED:
+            button.setProperty("actionState", "")
+            button.style().unpolish(button)
+            button.style().polish(button)
+
+    def load_page_config(self, page_index, only_buttons=None):
+        """
+        Загружает конфигурацию кнопок для указанной страницы.
+        :param page_index: Индекс страницы (0-индексированный).
+        :param only_buttons: Необязательное множество номеров кнопок (с 1), которые нужно обновить.
+                             None - обновить все кнопки страницы.
+        """
         page_key = self.page_manager.get_key_for_index(page_index)
         if not page_key:
             return # Выходим, если индекс страницы некорректен
@@ -737,10 +1191,15 @@ class ActionHandler(QObject):
             warnings.warn(f"Страница с индексом {page_index} не найдена в QStackedWidget.")
             return
 
-        # Добавляем тень к самой странице, если ее еще нет
-        apply_shadow(page_widget, blur_radius=25, color=(0, 0, 0, 200))
+        # Добавляем тень к самой странице, если ее еще нет.
+        # Поля вокруг внутреннего фрейма прозрачны: готовая тень рисуется под самим фреймом
+        page_container = page_widget.findChild(QFrame, "page_container", Qt.FindChildOption.FindDirectChildrenOnly)
+        apply_shadow(page_widget, blur_radius=25, color=(0, 0, 0, 200), opaque=False, anchor=page_container)
 
-        for i in range(1, 13):
+        rows, columns = get_page_grid(current_page_config)
+        for i in range(1, rows * columns + 1):
+            if only_buttons is not None and i not in only_buttons:
+                continue
             button_name_config = f"{constants.BUTTON_PREFIX}{i}"
             button_name_ui = f"ToolButton_{i:02d}"
             
@@ -751,8 +1210,6 @@ class ActionHandler(QObject):
             # Создаем и применяем эффект тени, если его еще нет
             apply_shadow(button, blur_radius=15, x_offset=5, y_offset=5, color=(0, 0, 0, 160))
 
-            button.setFixedSize(150, 150) # Фиксируем размер кнопки
-
             # Отключаем все предыдущие соединения, чтобы избежать задваивания обработчиков
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore", RuntimeWarning)
@@ -762,6 +1219,7 @@ class ActionHandler(QObject):
                     pass
 
             button_config = current_page_config.get(button_name_config, {})
+            self.compile_button_action(button, button_config.get(constants.KEY_ACTION))
             icon_path = button_config.get(constants.KEY_ICON_PATH)
             sign_text = button_config.get(constants.KEY_SIGN, "")
             font_name = button_config.get(constants.KEY_FONT, "")
@@ -781,24 +1239,18 @@ class ActionHandler(QObject):
                 button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonIconOnly)
 
             if icon_path:
-                # --- ИСПРАВЛЕНИЕ ПУТИ К ИКОНКАМ ---
-                # 1. Проверяем, начинается ли путь со старого префикса "icons/"
-                if icon_path.startswith("icons/"):
-                    # Заменяем его на новый, правильный префикс
-                    icon_path = icon_path.replace("icons/", "resources/icons/", 1)
-                
-                # 2. Оборачиваем путь в resource_path для корректной работы
-                full_icon_path = resource_path(icon_path)
-
-                # 3. Устанавливаем иконку, только если файл реально существует
-                if os.path.exists(full_icon_path):
-                    button.setIcon(QIcon(full_icon_path))
-                else:
-                    print(f"Предупреждение: Файл иконки не найден по пути: {full_icon_path}")
-                    button.setIcon(QIcon()) # Устанавливаем пустую иконку
+                # Иконка берется из общего кэша: повторный переход на страницу
+                # не обращается к диску и не декодирует изображения заново.
+                icon = get_icon(icon_path, constants.MAIN_BUTTON_SIZE - constants.MAIN_ICON_PADDING)
+                if icon.isNull():
+                    print(f"Предупреждение: Файл иконки не найден по пути: {resolve_icon_path(icon_path)}")
+                button.setIcon(icon)
             else:
                 button.setIcon(QIcon())
-            # --- КОНЕЦ ИСПРАВЛЕНИЯ ---
 
             # Подключаем все кнопки к единому обработчику кликов мыши
             button.clicked.connect(self.on_button_clicked)
+
+        if only_buttons is None:
+            # Вся страница перерисована - запоминаем версию, с которой она отрисована
+            self.main_window.page_cache.mark_rendered(page_index, page_key)
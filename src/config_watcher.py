@@ -0,0 +1,138 @@
+import os
+
+from PySide6.QtCore import QObject, QFileSystemWatcher, QRunnable, QThreadPool, QTimer, Signal
+
+import constants
+import LoadSave
+
+
+class ConfigReloadSignals(QObject):
+    """
+    Сигналы, доступные из рабочего потока перезагрузки конфигурации.
+    """
+    # (config или None, presets или None)
+    result = Signal(object, object)
+
+
+class ConfigReloadWorker(QRunnable):
+    """
+    Рабочий поток для чтения и разбора файлов конфигурации вне GUI-потока.
+    """
+    def __init__(self, reload_config, reload_presets):
+        super().__init__()
+        self.reload_config = reload_config
+        self.reload_presets = reload_presets
+        self.signals = ConfigReloadSignals()
+
+    def run(self):
+        config = LoadSave.read_config_for_reload() if self.reload_config else None
+        presets = LoadSave.read_custom_buttons_for_reload() if self.reload_presets else None
+        self.signals.result.emit(config, presets)
+
+
+def diff_config_pages(old_config, new_config):
+    """
+    Сравнивает страницы двух конфигураций.
+    :return: None, если изменился сам набор страниц (нужна полная перестройка),
+             иначе словарь {ключ_страницы: множество номеров измененных кнопок}.
+    """
+    old_pages = {key for key in old_config if key.startswith(constants.PAGE_PREFIX)}
+    new_pages = {key for key in new_config if key.startswith(constants.PAGE_PREFIX)}
+    if old_pages != new_pages:
+        return None
+
+    changed_pages = {}
+    for page_key in new_pages:
+        old_page = old_config.get(page_key) or {}
+        new_page = new_config.get(page_key) or {}
+        if old_page == new_page:
+            continue
+
+        changed_buttons = set()
+        for button_key in set(old_page) | set(new_page):
+            if old_page.get(button_key) == new_page.get(button_key):
+                continue
+            number = button_key[len(constants.BUTTON_PREFIX):] if button_key.startswith(constants.BUTTON_PREFIX) else ""
+            if number.isdigit():
+                changed_buttons.add(int(number))
+            else:
+                # Изменились свойства самой страницы - перерисовываем ее целиком
+                changed_buttons = None
+                break
+        changed_pages[page_key] = changed_buttons
+    return changed_pages
+
+
+class ConfigWatcher(QObject):
+    """
+    Следит за config.json и CustomButtons.json и сообщает о внешних изменениях.
+    События файловой системы объединяются (debounce), а разбор файлов выполняется в фоне.
+    """
+    config_reloaded = Signal(dict)   # Новый нормализованный конфиг
+    presets_reloaded = Signal(list)  # Новый список пресетов
+
+    DEBOUNCE_MS = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._watched_files = [LoadSave.CONFIG_FILE, LoadSave.CUSTOM_BUTTONS_FILE]
+        self._pending_config = False
+        self._pending_presets = False
+        self._last_presets = LoadSave.read_custom_buttons_for_reload()
+
+        self.watcher = QFileSystemWatcher(self)
+        # Следим и за папкой: редакторы и синхронизаторы часто заменяют файл целиком,
+        # после чего QFileSystemWatcher перестает следить за старым путем.
+        config_dir = os.path.dirname(LoadSave.CONFIG_FILE)
+        if os.path.isdir(config_dir):
+            self.watcher.addPath(config_dir)
+        self._rewatch_files()
+
+        self.watcher.fileChanged.connect(self._on_path_changed)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self._start_reload)
+
+    def _rewatch_files(self):
+        """Добавляет в наблюдение файлы, которые существуют, но еще не отслеживаются."""
+        watched = set(self.watcher.files())
+        for path in self._watched_files:
+            if path not in watched and os.path.exists(path):
+                self.watcher.addPath(path)
+
+    def _on_path_changed(self, path):
+        """Помечает измененный файл и перезапускает таймер объединения событий."""
+        if os.path.normcase(path) == os.path.normcase(LoadSave.CONFIG_FILE):
+            self._pending_config = True
+        elif os.path.normcase(path) == os.path.normcase(LoadSave.CUSTOM_BUTTONS_FILE):
+            self._pending_presets = True
+        self._rewatch_files()
+        self.debounce_timer.start()
+
+    def _on_directory_changed(self, _path):
+        """Файл мог быть заменен атомарно - проверяем оба файла."""
+        self._pending_config = True
+        self._pending_presets = True
+        self._rewatch_files()
+        self.debounce_timer.start()
+
+    def _start_reload(self):
+        """Запускает разбор измененных файлов в пуле потоков."""
+        if not (self._pending_config or self._pending_presets):
+            return
+        worker = ConfigReloadWorker(self._pending_config, self._pending_presets)
+        self._pending_config = False
+        self._pending_presets = False
+        worker.signals.result.connect(self._on_reload_result)
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_reload_result(self, config, presets):
+        """Передает прочитанные данные дальше (уже в GUI-потоке)."""
+        if config is not None:
+            self.config_reloaded.emit(config)
+        if presets is not None and presets != self._last_presets:
+            self._last_presets = presets
+            self.presets_reloaded.emit(presets)
@@ -18,6 +18,13 @@ KEY_FONT_SIZE = "font_size"
 KEY_ACTION = "action"
 KEY_NAME = "name" # For presets
 
+# --- Dictionary Keys for Page Configuration ---
+KEY_GRID_ROWS = "grid_rows"       # Optional per-page grid size, e.g. {"grid_rows": 5, "grid_columns": 3}
+KEY_GRID_COLUMNS = "grid_columns"
+DEFAULT_GRID_ROWS = 3
+DEFAULT_GRID_COLUMNS = 4
+MAX_GRID_SIDE = 10
+
 # --- Dictionary Keys for Action Configuration ---
 KEY_ACTION_TYPE = "type"
 KEY_ACTION_VALUE = "value"
@@ -27,6 +34,55 @@ ACTION_TYPE_METHOD = "method"
 ACTION_TYPE_PROGRAM = "program"
 ACTION_TYPE_SHORTCUT = "shortcut"
 ACTION_TYPE_EMPTY = ""
+ACTION_TYPE_MACRO = "macro" # value: list of steps, each {"type": ..., "value": ...}
+ACTION_TYPE_APP_AUDIO = "app_audio" # value: "<process> <change>", e.g. "Discord -10", "chrome.exe =50", "Discord mute"
+
+# --- Macro Step Types (in addition to method/program/shortcut) ---
+MACRO_STEP_DELAY = "delay"               # value: milliseconds
+MACRO_STEP_WAIT_WINDOW = "wait_window"   # value: part of the window title
+MACRO_STEP_WAIT_PROCESS = "wait_process" # value: process name, e.g. "chrome.exe"
+KEY_MACRO_TIMEOUT_MS = "timeout_ms"      # Optional timeout of wait_* steps
+KEY_MACRO_REPEAT = "repeat"              # Optional repeat count of shortcut steps (burst of key presses)
+
+# --- Button Action State (dynamic "actionState" property, styled in Style.qss) ---
+ACTION_STATE_QUEUED = "queued"   # Waiting for a free worker of its category
+ACTION_STATE_RUNNING = "running"
+ACTION_STATE_FAILED = "failed"   # Shown for ACTION_FAILED_STATE_MS, then cleared
+ACTION_FAILED_STATE_MS = 1500
+
+# --- UI Settings (section "ui_settings" in config.json) ---
+KEY_UI_SETTINGS = "ui_settings"
+KEY_MATERIALIZED_PAGES = "materialized_pages" # How many button pages are kept alive
+DEFAULT_MATERIALIZED_PAGES = 3
+KEY_SHADOW_MODE = "shadow_mode" # "effect" | "pixmap" | "off" (see utils.SHADOW_MODES)
+KEY_PAGE_TRANSITION = "page_transition" # Page switch animation: "slide" or "none"
+KEY_PAGE_TRANSITION_MS = "page_transition_ms"
+PAGE_TRANSITION_SLIDE = "slide"
+PAGE_TRANSITION_NONE = "none"
+DEFAULT_PAGE_TRANSITION_MS = 220
+KEY_IDLE_WARMUP = "idle_warmup" # Build Music/Settings tabs in the background after startup
+DEFAULT_IDLE_WARMUP = True
+IDLE_WARMUP_DELAY_MS = 1500
+KEY_TOUCH_DISPATCH = "touch_dispatch" # When a tap fires its action: "press" (finger down) or "release"
+TOUCH_DISPATCH_PRESS = "press"     # Fastest, but a touch on a button is always a tap: no swipe or long press from it
+TOUCH_DISPATCH_RELEASE = "release" # Swipes and long presses starting on a button do not fire its action
+DEFAULT_TOUCH_DISPATCH = TOUCH_DISPATCH_RELEASE
+KEY_LONG_PRESS_MS = "long_press_ms" # In "release" mode holding a button this long cancels its running action
+DEFAULT_LONG_PRESS_MS = 600
+KEY_SWIPE_MIN_PX = "swipe_min_px" # Horizontal swipe distance that flips the button page
+DEFAULT_SWIPE_MIN_PX = 80
+
+# --- Button Grid Geometry ---
+MAIN_BUTTON_SIZE = 150   # Maximum side of a button on the main panel (px)
+MAIN_BUTTON_MIN_SIZE = 48 # Buttons of dense grids shrink down to this size
+MAIN_GRID_SPACING = 15
+MAIN_ICON_PADDING = 15   # Gap between the button border and its icon (px)
+EDITOR_ICON_SIZE = 64    # Icon side on editor grid buttons (px)
+EDITOR_BUTTON_SIZE = 96  # Maximum side of an editor grid button (px)
+EDITOR_BUTTON_MIN_SIZE = 32
+EDITOR_GRID_SPACING = 24
+BUTTON_POOL_SIZE = 48    # Detached buttons kept for reuse by a page cache
+PRESET_LIST_ICON_SIZE = 32
 
 # --- Texts ---
 QUESTION_SAVE_CHANGES = "Сохранить настройки?"
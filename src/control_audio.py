@@ -1,13 +1,66 @@
-from audio_manager import audioSwitch as switcher
-from pycaw.pycaw import AudioUtilities
-from audio_manager.audioController import getMasterVolume, setMasterVolume
+import threading
+
+from audio_devices import AudioDeviceRegistry, create_backend
+from volume_control import VolumeRamper
+
+# Шаг громкости кнопок sound_up/sound_down, %
+VOLUME_STEP_PERCENT = 10
+# Изменения звука приложения, задаваемые словом (см. parse_app_audio)
+APP_AUDIO_MUTE_VALUES = {"mute": "Mute", "unmute": "Unmute", "toggle": "Toggle"}
+
+_registry = None
+_registry_lock = threading.Lock()
+_volume = None
+_session_index = None
+
+
+def device_registry():
+    """
+    Возвращает общий реестр устройств вывода (создается при первом вызове).
+    Первый вызов должен быть из GUI-потока: там регистрируется подписка на уведомления.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = AudioDeviceRegistry(create_backend())
+            _registry.start()
+        return _registry
+
+def volume_controller():
+    """Возвращает общий VolumeRamper общей громкости (поток создается при первом изменении громкости)."""
+    global _volume
+    registry = device_registry()
+    with _registry_lock:
+        if _volume is None:
+            _volume = VolumeRamper(registry)
+        return _volume
+
+def session_index():
+    """
+    Возвращает индекс аудиосессий приложений и запускает его поток
+    (первая сверка с системой выполняется в фоне).
+    """
+    global _session_index
+    with _registry_lock:
+        if _session_index is None:
+            from audio_manager.audioController import session_index as index
+            index.start()
+            _session_index = index
+        return _session_index
+
+def shutdown():
+    """Останавливает фоновые потоки звука и отписывает реестр устройств от уведомлений (при закрытии приложения)."""
+    if _volume is not None:
+        _volume.shutdown()
+    if _session_index is not None:
+        _session_index.stop()
+    if _registry is not None:
+        _registry.stop()
 
 def get_all_devices():
     """Возвращает список имен всех активных устройств вывода звука."""
     try:
-        # Используем правильный метод getAllDevices из MyAudioUtilities
-        devices = switcher.MyAudioUtilities.getAllDevices("output")
-        return list(devices.keys())
+        return device_registry().names()
     except Exception as e:
         print(f"Ошибка при получении списка аудиоустройств: {e}")
         return []
@@ -15,10 +68,7 @@ def get_all_devices():
 def get_current_device():
     """Возвращает имя текущего аудиоустройства по умолчанию."""
     try:
-        # Используем стандартный метод GetSpeakers() из pycaw для получения устройства по умолчанию
-        speakers_device = AudioUtilities.GetSpeakers()
-        # "Распаковываем" COM-объект, чтобы получить доступ к его свойствам, таким как FriendlyName
-        return AudioUtilities.CreateDevice(speakers_device).FriendlyName
+        return device_registry().current_name()
     except Exception as e:
         print(f"Ошибка при получении текущего устройства: {e}")
         return None
@@ -31,19 +81,11 @@ def set_device(device_name: str):
     :return: True в случае успеха, False в случае ошибки.
     """
     try:
-        # Получаем словарь {имя: id} всех устройств
-        all_devices = switcher.MyAudioUtilities.getAllDevices("output")
-        device_id = all_devices.get(device_name)
-
-        if not device_id:
+        # Устройство по умолчанию устанавливается для всех ролей для надежности
+        if not device_registry().set_default(device_name):
             print(f"Аудиоустройство с именем '{device_name}' не найдено.")
             return False
 
-        # Устанавливаем устройство по умолчанию для всех ролей для надежности
-        switcher.switchOutput(device_id, switcher.pc.ERole.eConsole)
-        switcher.switchOutput(device_id, switcher.pc.ERole.eMultimedia)
-        switcher.switchOutput(device_id, switcher.pc.ERole.eCommunications)
-        
         print(f"Аудиоустройство переключено на: {device_name}")
         return True
     except Exception as e:
@@ -78,26 +120,79 @@ def toggle_devices(primary_device: str, secondary_device: str):
     
     return None
 
+def _format_volume(volume, delta):
+    """Ожидаемый уровень или, если он еще неизвестен, сам сдвиг."""
+    return f"{volume}%" if volume is not None else f"{delta:+}%"
+
 def sound_up():
-    """Увеличивает системную громкость на 10%."""
+    """
+    Увеличивает системную громкость на 10%. Не ждет применения: изменение плавно
+    выполняет поток громкости, быстрые повторные нажатия складываются.
+    """
     try:
-        current_volume = getMasterVolume()
-        new_volume = min(100, current_volume + 10)
-        setMasterVolume(new_volume)
-        print(f"Sound Up: {new_volume}%")
+        new_volume = volume_controller().nudge(VOLUME_STEP_PERCENT)
+        print(f"Sound Up: {_format_volume(new_volume, VOLUME_STEP_PERCENT)}")
     except Exception as e:
         print(f"Ошибка при увеличении громкости: {e}")
 
 def sound_down():
-    """Уменьшает системную громкость на 10%."""
+    """Уменьшает системную громкость на 10% (см. sound_up)."""
     try:
-        current_volume = getMasterVolume()
-        new_volume = max(0, current_volume - 10)
-        setMasterVolume(new_volume)
-        print(f"Sound Down: {new_volume}%")
+        new_volume = volume_controller().nudge(-VOLUME_STEP_PERCENT)
+        print(f"Sound Down: {_format_volume(new_volume, -VOLUME_STEP_PERCENT)}")
     except Exception as e:
         print(f"Ошибка при уменьшении громкости: {e}")
 
+def parse_app_audio(value):
+    """
+    Разбирает значение действия громкости приложения.
+
+    :param value: "<процесс> <изменение>", где изменение - "+N"/"-N" (сдвиг в %), "=N" (уровень в %),
+                  "mute", "unmute" или "toggle". Например: "Discord -10", "chrome.exe =50".
+    :return: Кортеж (процесс, операция, проценты): операция - "Increase"/"Decrease"/"Set"
+             или "Mute"/"Unmute"/"Toggle" (тогда проценты - None).
+    :raises ValueError: Если значение некорректно.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"ожидалась строка, получено {value!r}")
+    process, _, change = value.strip().rpartition(" ")
+    if not process.strip() or not change:
+        raise ValueError(f"ожидалось '<процесс> <изменение>', получено '{value}'")
+    change = change.lower()
+    if change in APP_AUDIO_MUTE_VALUES:
+        return process.strip(), APP_AUDIO_MUTE_VALUES[change], None
+    operations = {"+": "Increase", "-": "Decrease", "=": "Set"}
+    if change[0] not in operations or not change[1:].isdigit() or int(change[1:]) > 100:
+        raise ValueError(f"некорректное изменение '{change}': ожидалось +N, -N, =N (0-100), mute, unmute или toggle")
+    return process.strip(), operations[change[0]], int(change[1:])
+
+def change_app_audio(process, operation, percent=None):
+    """
+    Меняет громкость или звук приложения через индекс аудиосессий (см. parse_app_audio).
+    :return: True, если у приложения нашлась аудиосессия.
+    """
+    try:
+        index = session_index()
+        if percent is None:
+            muted = index.set_mute(process, operation)
+            if muted is None:
+                print(f"Аудиосессия приложения '{process}' не найдена.")
+                return False
+            print(f"Звук '{process}': {'выключен' if muted else 'включен'}")
+            return True
+        if operation == "Set":
+            level = index.change_volume(process, level=percent / 100)
+        else:
+            level = index.change_volume(process, delta=(percent if operation == "Increase" else -percent) / 100)
+        if level is None:
+            print(f"Аудиосессия приложения '{process}' не найдена.")
+            return False
+        print(f"Громкость '{process}': {round(level * 100)}%")
+        return True
+    except Exception as e:
+        print(f"Ошибка при изменении звука приложения '{process}': {e}")
+        return False
+
 
 if __name__ == '__main__':
     # Этот блок для быстрой проверки и отладки.
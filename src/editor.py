@@ -1,23 +1,25 @@
 # -*- coding: utf-8 -*-
 
+import copy
 import sys
-import os
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QButtonGroup, QToolButton, QFileDialog, 
-    QComboBox, QWidget, QAbstractItemView, QListWidget, QMenu, QMessageBox, QInputDialog,
-    QListWidgetItem, QFrame, QGraphicsDropShadowEffect
+    QComboBox, QAbstractItemView, QListWidget, QMenu, QMessageBox, QInputDialog,
+    QListWidgetItem, QFrame, QGraphicsDropShadowEffect, QGridLayout, QSizePolicy
 )
 from PySide6.QtGui import QIcon, QKeySequence, QFont, QDrag, QAction, QColor
-from PySide6.QtCore import QSize, Signal, QEvent, QMimeData, Qt, QRect
+from PySide6.QtCore import QSize, Signal, QEvent, QMimeData, Qt
 from ui_Editor import Ui_Editor_Window
 from LoadSave import (
     load_config, save_config, 
     load_custom_buttons, add_custom_button, save_custom_buttons
 )
 from preset_dialog import PresetNameDialog
-from page_manager import PageManager
+from page_manager import PageManager, sort_page_keys, get_page_grid
+from page_cache import PageCache
 import constants
 from utils import apply_shadow
+from icon_cache import get_icon
 # from utils import adjust_font_size - Больше не нужно
 
 # Список "безопасных" шрифтов, которые обычно есть в Windows
@@ -27,6 +29,9 @@ SAFE_FONTS = constants.SAFE_FONTS
 METHOD_ACTIONS = constants.METHOD_ACTIONS
 # Обратный словарь для быстрого поиска названия по методу
 REVERSED_METHOD_ACTIONS = constants.REVERSED_METHOD_ACTIONS
+# Типы действий, для которых в редакторе нет вкладок: они задаются в config.json
+# и сохраняются как есть, пока пользователь не задаст кнопке новое действие
+KEPT_ACTION_TYPES = (constants.ACTION_TYPE_MACRO, constants.ACTION_TYPE_APP_AUDIO)
 
 
 # Новый класс для списка с поддержкой Drag and Drop
@@ -67,7 +72,14 @@ class EditorWindow(QMainWindow):
         """Initializes instance variables and state managers."""
         self.config = load_config()
         self.page_manager = PageManager(self)
+        # Страницы редактора строятся лениво; кнопки вытесненных страниц переиспользуются
+        self.page_cache = PageCache(
+            self.ui.Button_editor_stackedWidget, self._build_page_content,
+            capacity=2, create_button=self._create_page_button
+        )
         self.current_icon_path = ""
+        self._kept_action = None        # Действие, которое редактор не умеет показывать
+        self._kept_action_fields = None # Содержимое вкладок действия на момент его загрузки
         self.buttons = []
         self.button_group = QButtonGroup(self)
         self.button_group.setExclusive(False)
@@ -180,11 +192,16 @@ class EditorWindow(QMainWindow):
         self.ui.Ready_Button_listWidget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.ui.Ready_Button_listWidget.customContextMenuRequested.connect(self.show_preset_context_menu)
 
+        # Контекстное меню страницы (размер сетки кнопок)
+        self.ui.Button_editor_stackedWidget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.ui.Button_editor_stackedWidget.customContextMenuRequested.connect(self.show_page_context_menu)
+
     def _apply_shadow_effects(self):
         """Создает и применяет тени к указанным виджетам."""
         # Применяем стандартную тень к списку пресетов и группе редактирования
         apply_shadow(self.ui.Ready_Button_listWidget, blur_radius=15, x_offset=5, y_offset=5)
-        apply_shadow(self.ui.Edit_Button_groupBox, blur_radius=15, x_offset=5, y_offset=5)
+        # Над рамкой группы прозрачная полоса заголовка - тень рисуется эффектом
+        apply_shadow(self.ui.Edit_Button_groupBox, blur_radius=15, x_offset=5, y_offset=5, opaque=False)
         
         # Для предпросмотра тень не нужна, так как она уже есть у родительского layout
         # Если QFrame `Button_example_layout` все же нужен с тенью, можно добавить:
@@ -198,9 +215,8 @@ class EditorWindow(QMainWindow):
 
     def _get_sorted_page_keys(self):
         """Возвращает отсортированный список ключей страниц (['page_1', 'page_2', ...])."""
-        page_keys = [key for key in self.config.keys() if key.startswith(constants.PAGE_PREFIX)]
         # Сортируем по числовому индексу в ключе
-        return sorted(page_keys, key=lambda k: int(k.split('_')[1]))
+        return sort_page_keys(key for key in self.config.keys() if key.startswith(constants.PAGE_PREFIX))
 
     def _setup_buttons_for_current_page(self):
         """Находит и настраивает кнопки для текущей активной страницы."""
@@ -220,12 +236,6 @@ class EditorWindow(QMainWindow):
         # Добавляем все кнопки в существующую группу для отслеживания нажатий
         for button in self.buttons:
             self.button_group.addButton(button)
-            # Включаем прием drop-событий и устанавливаем фильтр
-            button.setAcceptDrops(True)
-            button.installEventFilter(self)
-            # Включаем кастомное контекстное меню
-            button.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-            button.customContextMenuRequested.connect(self.show_button_context_menu)
 
 
     def setup_page_controls(self):
@@ -276,65 +286,70 @@ class EditorWindow(QMainWindow):
         """Обновляет текстовую метку с номером текущей страницы."""
         self.ui.Current_page_label_editor.setText(self.page_manager.get_page_label_text())
 
-    def _create_new_page_widget(self, page_key):
+    def _build_page_content(self, page_widget):
         """
-        Создает и возвращает виджет страницы (QWidget) с 12-ю кнопками.
-        :param page_key: Ключ страницы, который будет использован как objectName.
+        Создает содержимое страницы редактора: фрейм с сеткой кнопок размером,
+        заданным в конфиге страницы. Вызывается PageCache при первом переходе на страницу.
+        :param page_widget: Виджет-заглушка страницы (objectName - ключ страницы).
+        :return: Фрейм с кнопками.
         """
-        new_page = QWidget()
-        new_page.setObjectName(page_key)
-        
-        button_frame = QFrame(new_page)
+        rows, columns = get_page_grid(self.config.get(page_widget.objectName(), {}))
+
+        button_frame = QFrame(page_widget)
         button_frame.setObjectName(u"Button_frame")
-        button_frame.setGeometry(QRect(0, 10, 500, 340))
         button_frame.setFrameShape(QFrame.Shape.StyledPanel)
         button_frame.setFrameShadow(QFrame.Shadow.Raised)
 
         # Добавляем тень к фрейму, как в главном окне
         apply_shadow(button_frame, blur_radius=25, color=(0, 0, 0, 200))
 
-        for i in range(1, 13):
-            button = QToolButton(button_frame)
-            button.setObjectName(f"{constants.EDITOR_BUTTON_PREFIX}{i:02d}")
-            row = (i - 1) // 4
-            col = (i - 1) % 4
-            button.setGeometry(QRect(20 + col * 120, 10 + row * 110, 96, 96))
-            button.setFixedSize(96, 96) # Фиксируем размер кнопки
-            button.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-            button.setIconSize(QSize(64, 64))
-            button.setCheckable(True)
-            button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
-
-            # Добавляем тень к кнопке
-            apply_shadow(button, blur_radius=15, x_offset=5, y_offset=5)
-        
-        return new_page
+        grid_layout = QGridLayout(button_frame)
+        grid_layout.setSpacing(constants.EDITOR_GRID_SPACING)
+
+        for index in range(rows * columns):
+            button = self.page_cache.button_pool.acquire(button_frame)
+            button.setObjectName(f"{constants.EDITOR_BUTTON_PREFIX}{index + 1:02d}")
+            grid_layout.addWidget(button, index // columns, index % columns)
+
+        return button_frame
+
+    def _create_page_button(self):
+        """Создает новую кнопку сетки редактора (используется пулом кнопок)."""
+        button = QToolButton()
+        button.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        button.setMinimumSize(constants.EDITOR_BUTTON_MIN_SIZE, constants.EDITOR_BUTTON_MIN_SIZE)
+        button.setMaximumSize(constants.EDITOR_BUTTON_SIZE, constants.EDITOR_BUTTON_SIZE)
+        button.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        button.setIconSize(QSize(constants.EDITOR_ICON_SIZE, constants.EDITOR_ICON_SIZE))
+        button.setCheckable(True)
+        button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
+
+        # Добавляем тень к кнопке
+        apply_shadow(button, blur_radius=15, x_offset=5, y_offset=5)
+
+        # Кнопка переживает свою страницу (пул), поэтому подключаем ее один раз при создании
+        # Включаем прием drop-событий и устанавливаем фильтр
+        button.setAcceptDrops(True)
+        button.installEventFilter(self)
+        # Включаем кастомное контекстное меню
+        button.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        button.customContextMenuRequested.connect(self.show_button_context_menu)
+        return button
 
     def _rebuild_editor_pages(self):
         """
         Полностью перестраивает страницы в редакторе на основе текущего self.config.
+        Создаются только заглушки; кнопки страницы появляются при переходе на нее.
         """
-        # Очищаем старые страницы
-        while self.ui.Button_editor_stackedWidget.count() > 0:
-            widget = self.ui.Button_editor_stackedWidget.widget(0)
-            self.ui.Button_editor_stackedWidget.removeWidget(widget)
-            widget.deleteLater()
-        
         # Получаем отсортированные ключи
         self._page_keys = self._get_sorted_page_keys()
         self.page_manager.set_page_keys(self._page_keys)
 
-        # Создаем и добавляем новые страницы
-        for page_key in self._page_keys:
-            page_widget = self._create_new_page_widget(page_key)
-            self.ui.Button_editor_stackedWidget.addWidget(page_widget)
+        # Очищаем старые страницы и создаем заглушки новых
+        self.page_cache.reset(self._page_keys)
 
     def add_page(self):
         """Добавляет новую пустую страницу в редактор и в конфигурацию."""
-        if len(self._page_keys) >= 10:
-            QMessageBox.warning(self, "Ограничение", "Достигнуто максимальное количество страниц (10).")
-            return
-
         # Находим максимальный существующий индекс, чтобы создать следующий
         if self._page_keys:
             last_key = self._page_keys[-1]
@@ -344,11 +359,8 @@ class EditorWindow(QMainWindow):
         
         new_page_key = f"{constants.PAGE_PREFIX}{new_index}"
 
-        # Создаем новый виджет страницы с помощью хелпера
-        new_page = self._create_new_page_widget(new_page_key)
-        
-        # Добавляем новую страницу в виджет и в конфиг
-        new_widget_index = self.ui.Button_editor_stackedWidget.addWidget(new_page)
+        # Добавляем заглушку новой страницы в виджет и страницу в конфиг
+        new_widget_index = self.page_cache.add_page(new_page_key)
         self.config[new_page_key] = {}
         self._page_keys.append(new_page_key) # Обновляем список ключей
         self.page_manager.set_page_keys(self._page_keys)
@@ -416,7 +428,9 @@ class EditorWindow(QMainWindow):
              return
 
         self.current_page_index = page_index
-        
+
+        # Создаем кнопки страницы при первом переходе на нее
+        self.page_cache.ensure(page_index)
         # Переключаем QStackedWidget
         self.ui.Button_editor_stackedWidget.setCurrentIndex(page_index)
         
@@ -431,6 +445,39 @@ class EditorWindow(QMainWindow):
         self.clear_editor_fields()
         self.ui.Edit_Button_groupBox.setEnabled(False)
 
+    def show_page_context_menu(self, pos):
+        """Показывает контекстное меню страницы редактора."""
+        context_menu = QMenu(self)
+        grid_action = QAction("Размер сетки...", self)
+        grid_action.triggered.connect(self.edit_page_grid)
+        context_menu.addAction(grid_action)
+        context_menu.exec(self.ui.Button_editor_stackedWidget.mapToGlobal(pos))
+
+    def edit_page_grid(self):
+        """Запрашивает и сохраняет число строк и столбцов кнопок текущей страницы."""
+        page_key = self.page_manager.get_key_for_index(self.current_page_index)
+        if not page_key:
+            return
+        page_config = self.config.setdefault(page_key, {})
+        rows, columns = get_page_grid(page_config)
+
+        rows, ok = QInputDialog.getInt(self, "Размер сетки", "Строк:", rows, 1, constants.MAX_GRID_SIDE)
+        if not ok:
+            return
+        columns, ok = QInputDialog.getInt(self, "Размер сетки", "Столбцов:", columns, 1, constants.MAX_GRID_SIDE)
+        if not ok:
+            return
+
+        # Настройки кнопок за пределами новой сетки сохраняются и вернутся при ее увеличении
+        page_config[constants.KEY_GRID_ROWS] = rows
+        page_config[constants.KEY_GRID_COLUMNS] = columns
+        save_config(self.config)
+
+        # Пересоздаем кнопки текущей страницы под новую сетку
+        self.page_cache.discard(self.current_page_index)
+        self.switch_to_page(self.current_page_index + 1)
+        self.config_saved.emit() # Отправляем сигнал, чтобы главное окно обновилось
+
     def eventFilter(self, watched, event):
         """Обрабатывает события Drag and Drop для кнопок в сетке."""
         if watched in self.buttons:
@@ -479,10 +526,7 @@ class EditorWindow(QMainWindow):
                     target_button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonIconOnly)
 
                 icon_path = selected_preset.get(constants.KEY_ICON_PATH, "")
-                if icon_path and os.path.exists(icon_path):
-                    target_button.setIcon(QIcon(icon_path))
-                else:
-                    target_button.setIcon(QIcon())
+                target_button.setIcon(get_icon(icon_path, constants.EDITOR_ICON_SIZE))
 
                 self.config_saved.emit()
                 
@@ -611,8 +655,9 @@ class EditorWindow(QMainWindow):
             item = QListWidgetItem(preset_name)
             
             # Устанавливаем иконку, если она есть
-            if icon_path and os.path.exists(icon_path):
-                item.setIcon(QIcon(icon_path))
+            icon = get_icon(icon_path, constants.PRESET_LIST_ICON_SIZE)
+            if not icon.isNull():
+                item.setIcon(icon)
             
             # Добавляем готовый элемент в список
             self.ui.Ready_Button_listWidget.addItem(item)
@@ -642,10 +687,7 @@ class EditorWindow(QMainWindow):
             self.font_combo_box.setCurrentIndex(0)
             
         # Обновляем иконку-пример
-        if self.current_icon_path and os.path.exists(self.current_icon_path):
-            self.ui.Example_toolButton.setIcon(QIcon(self.current_icon_path))
-        else:
-            self.ui.Example_toolButton.setIcon(QIcon())
+        self.ui.Example_toolButton.setIcon(get_icon(self.current_icon_path))
 
         # Загружаем действие
         action_config = selected_preset.get(constants.KEY_ACTION, {})
@@ -667,6 +709,7 @@ class EditorWindow(QMainWindow):
             display_name = REVERSED_METHOD_ACTIONS.get(action_value, "")
             self.ui.Action_comboBox.setCurrentText(display_name)
             self.ui.Edit_action_tabWidget.setCurrentWidget(self.action_tab)
+        self._remember_kept_action(action_config)
 
         # Обновляем предпросмотр
         self.update_preview()
@@ -704,11 +747,10 @@ class EditorWindow(QMainWindow):
             else:
                 button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonIconOnly)
 
-            if icon_path and os.path.exists(icon_path):
-                button.setIcon(QIcon(icon_path))
-                button.setIconSize(QSize(64, 64))
-            else:
-                button.setIcon(QIcon())
+            icon = get_icon(icon_path, constants.EDITOR_ICON_SIZE)
+            button.setIcon(icon)
+            if not icon.isNull():
+                button.setIconSize(QSize(constants.EDITOR_ICON_SIZE, constants.EDITOR_ICON_SIZE))
 
     def on_button_group_clicked(self, clicked_button):
         """Обрабатывает нажатие на любую кнопку в сетке."""
@@ -774,11 +816,8 @@ class EditorWindow(QMainWindow):
 
         # Загружаем и отображаем иконку
         self.current_icon_path = button_config.get(constants.KEY_ICON_PATH, "")
-        if self.current_icon_path and os.path.exists(self.current_icon_path):
-            # QIcon в Qt поддерживает SVG нативно, просто передаем путь
-            self.ui.Example_toolButton.setIcon(QIcon(self.current_icon_path))
-        else:
-            self.ui.Example_toolButton.setIcon(QIcon()) # Сбрасываем иконку, если путь не указан или неверен
+        # Пустой QIcon сбрасывает иконку, если путь не указан или неверен
+        self.ui.Example_toolButton.setIcon(get_icon(self.current_icon_path))
 
         # Загружаем подпись
         sign_text = button_config.get(constants.KEY_SIGN, "")
@@ -825,11 +864,37 @@ class EditorWindow(QMainWindow):
             self.ui.Edit_keySequenceEdit.clear()
             self.ui.Edit_action_tabWidget.setCurrentWidget(self.action_tab)
         else:
-            # Если тип не задан, очищаем все поля
+            # Тип не задан или для него нет вкладки (макрос, app_audio): поля пустые,
+            # а само действие запоминается и сохраняется, пока пользователь не задаст новое
             self.ui.Edit_keySequenceEdit.clear()
             self.ui.Soft_lineEdit.clear()
             self.ui.Action_comboBox.setCurrentIndex(0)
-            # Здесь можно добавить логику для других вкладок (soft_tab, script_tab)
+        self._remember_kept_action(action_config)
+
+    def _action_fields(self):
+        """Содержимое вкладок действия - по нему видно, задавал ли пользователь новое действие."""
+        return (
+            self.ui.Edit_keySequenceEdit.keySequence().toString(),
+            self.ui.Soft_lineEdit.text(),
+            self.ui.Action_comboBox.currentText(),
+        )
+
+    def _remember_kept_action(self, action_config):
+        """Запоминает загруженное действие, если для его типа в редакторе нет вкладки."""
+        action_type = action_config.get(constants.KEY_ACTION_TYPE)
+        if action_type in KEPT_ACTION_TYPES:
+            self._kept_action = copy.deepcopy(action_config)
+            self._kept_action_fields = self._action_fields()
+        else:
+            self._kept_action = None
+
+    def _unchanged_kept_action(self):
+        """
+        :return: Копия запомненного действия, если пользователь не менял вкладки действия, иначе None.
+        """
+        if self._kept_action is None or self._action_fields() != self._kept_action_fields:
+            return None
+        return copy.deepcopy(self._kept_action)
     
     def clear_editor_fields(self):
         """Очищает поля редактора, когда ни одна кнопка не выбрана."""
@@ -840,6 +905,7 @@ class EditorWindow(QMainWindow):
         self.font_combo_box.setCurrentIndex(0) # Сбрасываем шрифт
         self.ui.Size_font_comboBox.setCurrentIndex(0) # Сбрасываем размер
         self.current_icon_path = ""
+        self._kept_action = None
         # Здесь нужно будет добавить очистку для полей других вкладок
 
     def browse_custom_icon(self):
@@ -890,8 +956,11 @@ class EditorWindow(QMainWindow):
         }
 
         current_tab = self.ui.Edit_action_tabWidget.currentWidget()
+        kept_action = self._unchanged_kept_action()
 
-        if current_tab == self.ui.shortcut_tab:
+        if kept_action is not None:
+            preset_config[constants.KEY_ACTION] = kept_action
+        elif current_tab == self.ui.shortcut_tab:
             preset_config[constants.KEY_ACTION][constants.KEY_ACTION_TYPE] = constants.ACTION_TYPE_SHORTCUT
             preset_config[constants.KEY_ACTION][constants.KEY_ACTION_VALUE] = self.ui.Edit_keySequenceEdit.keySequence().toString(QKeySequence.NativeText)
         elif current_tab == self.ui.soft_tab:
@@ -941,8 +1010,13 @@ class EditorWindow(QMainWindow):
             self.config[current_page_key][button_name][constants.KEY_ACTION] = {}
 
         current_tab = self.ui.Edit_action_tabWidget.currentWidget()
+        kept_action = self._unchanged_kept_action()
 
-        if current_tab == self.ui.shortcut_tab:
+        if kept_action is not None:
+            # Макрос или app_audio: вкладки действия не трогали - оставляем действие как есть
+            self.config[current_page_key][button_name][constants.KEY_ACTION] = kept_action
+
+        elif current_tab == self.ui.shortcut_tab:
             # Сохраняем сочетание клавиш
             shortcut = self.ui.Edit_keySequenceEdit.keySequence().toString(QKeySequence.NativeText)
             self.config[current_page_key][button_name][constants.KEY_ACTION][constants.KEY_ACTION_TYPE] = constants.ACTION_TYPE_SHORTCUT
@@ -971,10 +1045,7 @@ class EditorWindow(QMainWindow):
         self.config_saved.emit()
 
         # Обновляем иконку на самой кнопке в сетке
-        if self.current_icon_path and os.path.exists(self.current_icon_path):
-            selected_button.setIcon(QIcon(self.current_icon_path))
-        else:
-            selected_button.setIcon(QIcon())
+        selected_button.setIcon(get_icon(self.current_icon_path, constants.EDITOR_ICON_SIZE))
 
     def browse_program_file(self):
         """Открывает диалог для выбора исполняемого файла или ярлыка."""
@@ -0,0 +1,152 @@
+import os
+from collections import OrderedDict
+
+from PySide6.QtGui import QIcon, QGuiApplication, QPixmap
+
+from utils import resource_path
+from thumbnail_cache import thumbnail_cache
+
+# Бюджет кэша по умолчанию (байты декодированных изображений)
+DEFAULT_BUDGET_BYTES = 32 * 1024 * 1024
+
+
+def resolve_icon_path(icon_path):
+    """
+    Приводит путь к иконке из конфига к абсолютному нормализованному виду.
+    Поддерживает старый префикс "icons/" и относительные пути от корня проекта.
+    :return: Абсолютный путь или пустая строка, если путь не задан.
+    """
+    if not icon_path:
+        return ""
+    # Старые конфиги хранят пути с префиксом "icons/" вместо "resources/icons/"
+    if icon_path.startswith("icons/"):
+        icon_path = icon_path.replace("icons/", "resources/icons/", 1)
+    if not os.path.isabs(icon_path):
+        icon_path = resource_path(icon_path)
+    return os.path.normcase(os.path.abspath(icon_path))
+
+
+class IconCache:
+    """
+    Общий для всего процесса кэш иконок с ограничением по памяти и вытеснением LRU.
+    Ключ записи: (абсолютный путь, целевой размер, device pixel ratio, mtime файла),
+    поэтому измененный на диске файл автоматически перечитывается.
+    """
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict() # ключ -> (QIcon, стоимость в байтах)
+        self._path_mtimes = {}        # путь -> mtime, с которым записи лежат в кэше
+        self._used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, icon_path, size=None, device_pixel_ratio=None):
+        """
+        Возвращает иконку для пути из конфига.
+        :param icon_path: Путь к файлу иконки (абсолютный или относительный от корня проекта).
+        :param size: Сторона квадратной иконки в логических пикселях. None - исходный размер.
+        :param device_pixel_ratio: DPR экрана. None - DPR основного экрана.
+        :return: QIcon (пустой, если файл не найден).
+        """
+        resolved = resolve_icon_path(icon_path)
+        if not resolved:
+            return QIcon()
+        try:
+            mtime = os.stat(resolved).st_mtime_ns
+        except OSError:
+            return QIcon()
+
+        if device_pixel_ratio is None:
+            device_pixel_ratio = self._screen_device_pixel_ratio()
+        size = int(size) if size else None
+
+        # Файл изменился на диске - выбрасываем все его старые варианты
+        if self._path_mtimes.get(resolved, mtime) != mtime:
+            self._purge_path(resolved)
+        self._path_mtimes[resolved] = mtime
+
+        key = (resolved, size, device_pixel_ratio, mtime)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        icon, cost = self._load(resolved, size, device_pixel_ratio)
+        if icon.isNull():
+            return icon
+        self._entries[key] = (icon, cost)
+        self._used_bytes += cost
+        self._evict()
+        return icon
+
+    def clear(self):
+        """Полностью очищает кэш."""
+        self._entries.clear()
+        self._path_mtimes.clear()
+        self._used_bytes = 0
+
+    def stats(self):
+        """Возвращает статистику кэша (для отладки и замеров)."""
+        return {
+            'entries': len(self._entries),
+            'used_bytes': self._used_bytes,
+            'budget_bytes': self.budget_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _load(self, path, size, device_pixel_ratio):
+        """Загружает иконку и оценивает занимаемую ею память."""
+        if size is None:
+            # Без целевого размера Qt сам выберет масштаб; оцениваем по размеру файла
+            return QIcon(path), max(1, os.path.getsize(path))
+
+        # Берем готовую миниатюру с диска или декодируем сразу в нужном размере
+        image = thumbnail_cache.load_image(path, size, device_pixel_ratio)
+        if image.isNull():
+            return QIcon(), 0
+        pixmap = QPixmap.fromImage(image)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        cost = pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+        return QIcon(pixmap), cost
+
+    def _evict(self):
+        """Вытесняет давно неиспользуемые записи, пока кэш не уложится в бюджет."""
+        while self._used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (_, cost) = self._entries.popitem(last=False)
+            self._used_bytes -= cost
+
+    def _purge_path(self, path):
+        """Удаляет из кэша все варианты указанного файла."""
+        for key in [key for key in self._entries if key[0] == path]:
+            _, cost = self._entries.pop(key)
+            self._used_bytes -= cost
+
+    @staticmethod
+    def _screen_device_pixel_ratio():
+        """Возвращает DPR основного экрана (1.0, если приложение еще не создано)."""
+        app = QGuiApplication.instance()
+        screen = app.primaryScreen() if app else None
+        return screen.devicePixelRatio() if screen else 1.0
+
+
+# Единственный экземпляр кэша на процесс: его используют и главное окно, и редактор
+icon_cache = IconCache()
+
+
+def get_icon(icon_path, size=None, device_pixel_ratio=None):
+    """Сокращение для icon_cache.get()."""
+    return icon_cache.get(icon_path, size, device_pixel_ratio)
+
+
+def prefetch_thumbnails(icon_paths):
+    """
+    Запускает фоновую генерацию миниатюр для списка путей из конфига,
+    чтобы при первом показе страниц иконки читались уже из дискового кэша.
+    """
+    resolved = {resolve_icon_path(path) for path in icon_paths if path}
+    existing = [path for path in resolved if os.path.exists(path)]
+    if existing:
+        thumbnail_cache.request(existing, IconCache._screen_device_pixel_ratio())
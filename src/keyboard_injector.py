@@ -0,0 +1,130 @@
+import queue
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+
+import keyboard
+
+from precise_timing import WaitCancelled, precise_wait
+
+# Пауза между шагами последовательности ("ctrl+c, ctrl+v") и между повторами
+DEFAULT_STEP_INTERVAL_MS = 10
+
+MEDIA_PLAY_PAUSE = "play/pause media"
+
+
+@lru_cache(maxsize=256)
+def parse_shortcut(keys_string):
+    """
+    Разбирает строку сочетания клавиш в последовательность скан-кодов.
+    Результат кэшируется: одна и та же строка разбирается один раз за сессию.
+    :param keys_string: Строка вида "ctrl+shift+esc" или "ctrl+c, ctrl+v".
+    :return: Кортеж шагов keyboard.parse_hotkey (шаг - кортеж клавиш, клавиша - кортеж скан-кодов).
+    :raises ValueError: Если строка не разбирается.
+    """
+    if not isinstance(keys_string, str) or not keys_string.strip():
+        raise ValueError(f"ожидалась непустая строка, получено {keys_string!r}")
+    return keyboard.parse_hotkey(keys_string.lower())
+
+
+class _Injection:
+    """Одна поставленная в очередь отправка."""
+    def __init__(self, steps, label, repeat, interval_ms):
+        self.steps = steps
+        self.label = label
+        self.repeat = repeat
+        self.interval_ms = interval_ms
+        self.future = Future()
+
+
+class KeyboardInjector:
+    """
+    Долгоживущий поток эмуляции клавиатуры. Все нажатия идут через одну очередь,
+    поэтому сочетания из разных кнопок и макросов не перемешиваются, а GUI-поток
+    и рабочие потоки действий не блокируются на системном хуке.
+    Последовательности передаются уже разобранными (parse_shortcut), паузы между
+    шагами и повторами выдерживаются с точностью до миллисекунды.
+    """
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._run, name="keyboard-injector", daemon=True)
+                self._thread.start()
+
+    def submit(self, steps, label=None, repeat=1, interval_ms=DEFAULT_STEP_INTERVAL_MS):
+        """
+        Ставит последовательность в очередь отправки и сразу возвращается.
+        :param steps: Результат parse_shortcut.
+        :param label: Описание для журнала (исходная строка сочетания).
+        :param repeat: Сколько раз отправить последовательность подряд (серия нажатий).
+        :param interval_ms: Пауза между шагами и повторами.
+        :return: concurrent.futures.Future, завершающийся после отправки.
+        """
+        injection = _Injection(steps, label or str(steps), max(1, int(repeat)), max(0, interval_ms))
+        self._ensure_thread()
+        self._queue.put(injection)
+        return injection.future
+
+    def shutdown(self, wait_s=1.0):
+        """Останавливает поток; неотправленные последовательности отменяются."""
+        self._stop_event.set()
+        self._queue.put(None)
+        thread = self._thread
+        if thread is not None:
+            thread.join(wait_s)
+
+    # --- Поток отправки ---
+
+    def _run(self):
+        while True:
+            injection = self._queue.get()
+            if injection is None or self._stop_event.is_set():
+                self._cancel_pending(injection)
+                return
+            if not injection.future.set_running_or_notify_cancel():
+                continue
+            try:
+                self._inject(injection)
+            except WaitCancelled:
+                injection.future.set_exception(RuntimeError("поток эмуляции клавиатуры остановлен"))
+                self._cancel_pending(None)
+                return
+            except Exception as e:
+                # Об ошибке сообщает тот, кто ждет Future (ActionExecutor, макрос)
+                injection.future.set_exception(e)
+            else:
+                injection.future.set_result(None)
+
+    def _inject(self, injection):
+        first = True
+        for _ in range(injection.repeat):
+            for step in injection.steps:
+                if not first and injection.interval_ms:
+                    precise_wait(injection.interval_ms / 1000, self._stop_event)
+                first = False
+                for scan_codes in step:
+                    keyboard.press(scan_codes[0])
+                for scan_codes in reversed(step):
+                    keyboard.release(scan_codes[0])
+
+    def _cancel_pending(self, injection):
+        if injection is not None:
+            injection.future.cancel()
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if pending is not None:
+                pending.future.cancel()
+
+
+# Общий поток эмуляции клавиатуры
+injector = KeyboardInjector()
@@ -0,0 +1,329 @@
+import ctypes
+import itertools
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+
+import psutil
+from PySide6.QtCore import QObject, Signal
+
+import constants
+from action_executor import CATEGORY_GUI, CATEGORY_KEYBOARD, CATEGORY_TIMEOUTS_MS, COM_CATEGORIES, com_apartment
+from precise_timing import WaitCancelled, precise_wait
+
+# Сколько макросов может выполняться одновременно
+MAX_CONCURRENT_MACROS = 4
+# Тайм-аут шагов ожидания окна/процесса по умолчанию
+DEFAULT_WAIT_TIMEOUT_MS = 10000
+# Период опроса при ожидании окна/процесса
+WAIT_POLL_MS = 50
+
+
+class MacroCancelled(WaitCancelled):
+    """Выполнение макроса отменено."""
+
+
+class MacroStepError(Exception):
+    """Шаг макроса не выполнен (тайм-аут ожидания, ошибка действия)."""
+
+
+class _TimerResolution:
+    """
+    Повышает разрешение системного таймера Windows до 1 мс, пока выполняется хотя бы один макрос.
+    На других системах ничего не делает.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._winmm = ctypes.WinDLL("winmm") if sys.platform == "win32" else None
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+            if self._users == 1 and self._winmm is not None:
+                self._winmm.timeBeginPeriod(1)
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._winmm is not None:
+                self._winmm.timeEndPeriod(1)
+
+
+def find_window(title_part):
+    """
+    Проверяет, есть ли видимое окно, заголовок которого содержит title_part (без учета регистра).
+    Поддерживается только в Windows.
+    """
+    if sys.platform != "win32":
+        raise MacroStepError("Ожидание окна поддерживается только в Windows")
+    user32 = ctypes.windll.user32
+    needle = title_part.lower()
+    found = []
+
+    @ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_void_p)
+    def enum_proc(hwnd, _):
+        if not user32.IsWindowVisible(hwnd):
+            return True
+        length = user32.GetWindowTextLengthW(hwnd)
+        if length:
+            buffer = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            if needle in buffer.value.lower():
+                found.append(hwnd)
+                return False # Останавливаем перебор
+        return True
+
+    user32.EnumWindows(enum_proc, 0)
+    return bool(found)
+
+
+def process_running(name):
+    """Проверяет, запущен ли процесс с указанным именем (без учета регистра)."""
+    name = name.lower()
+    for process in psutil.process_iter(['name']):
+        if (process.info.get('name') or "").lower() == name:
+            return True
+    return False
+
+
+class MacroStep:
+    """Один подготовленный шаг макроса."""
+    def __init__(self, kind, value, label, func=None, args=(), category=None, timeout_ms=None):
+        self.kind = kind
+        self.value = value
+        self.label = label
+        self.func = func
+        self.args = args
+        self.category = category
+        self.timeout_ms = timeout_ms
+
+
+class MacroRun:
+    """Один запуск макроса."""
+    def __init__(self, run_id, name, steps):
+        self.run_id = run_id
+        self.name = name
+        self.steps = steps
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+
+class MacroScheduler(QObject):
+    """
+    Выполняет макросы - последовательности действий кнопок, задержек и ожиданий.
+    Каждый запуск идет в своем потоке, поэтому длинные ожидания не занимают пул
+    ActionExecutor и никогда не блокируют отрисовку. Шаги, работающие с окнами
+    приложения (CATEGORY_GUI), передаются в GUI-поток, и поток макроса ждет их завершения.
+    Нажатия клавиш (CATEGORY_KEYBOARD) поток макроса сам ставит в очередь эмуляции клавиатуры
+    и ждет их фактической отправки, поэтому следующий шаг не обгоняет клавиши.
+    Запуск можно отменить в любой момент, в том числе во время задержки или ожидания.
+    """
+    run_started = Signal(int, str)                # (номер запуска, имя макроса)
+    step_finished = Signal(int, int, str, float)  # (номер запуска, индекс шага, описание, длительность мс)
+    run_finished = Signal(int, str, float)        # (номер запуска, имя макроса, общая длительность мс)
+    run_failed = Signal(int, str, str)            # (номер запуска, имя макроса, текст ошибки)
+    run_cancelled = Signal(int, str)              # (номер запуска, имя макроса)
+    _gui_call_requested = Signal(object)
+
+    def __init__(self, resolve_action, parent=None, max_concurrent=MAX_CONCURRENT_MACROS):
+        """
+        :param resolve_action: Функция (тип, значение) -> (функция, аргументы, категория) или None;
+                               превращает шаги method/program/shortcut в вызовы.
+        """
+        super().__init__(parent)
+        self._resolve_action = resolve_action
+        self.max_concurrent = max_concurrent
+        self._ids = itertools.count(1)
+        self._runs = {} # номер -> MacroRun
+        self._lock = threading.Lock()
+        self._timer_resolution = _TimerResolution()
+        # Вызов из потока макроса доставляется в GUI-поток через очередь событий
+        self._gui_call_requested.connect(self._run_gui_call)
+
+    # --- Подготовка ---
+
+    def compile(self, steps_config):
+        """
+        Проверяет конфигурацию макроса и подготавливает шаги.
+        :param steps_config: Список шагов вида {"type": ..., "value": ..., "timeout_ms": ...}.
+        :return: Список MacroStep.
+        :raises ValueError: Если конфигурация некорректна.
+        """
+        if not isinstance(steps_config, list) or not steps_config:
+            raise ValueError("макрос должен быть непустым списком шагов")
+        steps = []
+        for number, step in enumerate(steps_config, start=1):
+            if not isinstance(step, dict):
+                raise ValueError(f"шаг {number}: ожидался словарь")
+            kind = step.get(constants.KEY_ACTION_TYPE)
+            value = step.get(constants.KEY_ACTION_VALUE)
+            label = f"{number}. {kind}: {value}"
+
+            if kind == constants.MACRO_STEP_DELAY:
+                if not isinstance(value, (int, float)) or value < 0:
+                    raise ValueError(f"шаг {number}: задержка должна быть неотрицательным числом мс")
+                steps.append(MacroStep(kind, value, label))
+            elif kind in (constants.MACRO_STEP_WAIT_WINDOW, constants.MACRO_STEP_WAIT_PROCESS):
+                if not value or not isinstance(value, str):
+                    raise ValueError(f"шаг {number}: не указано окно или процесс")
+                timeout_ms = step.get(constants.KEY_MACRO_TIMEOUT_MS, DEFAULT_WAIT_TIMEOUT_MS)
+                steps.append(MacroStep(kind, value, label, timeout_ms=timeout_ms))
+            else:
+                resolved = self._resolve_action(kind, value) if value else None
+                if resolved is None:
+                    raise ValueError(f"шаг {number}: неизвестное действие '{kind}: {value}'")
+                func, args, category = resolved
+                repeat = step.get(constants.KEY_MACRO_REPEAT)
+                if repeat is not None:
+                    if kind != constants.ACTION_TYPE_SHORTCUT or not isinstance(repeat, int) or repeat < 1:
+                        raise ValueError(f"шаг {number}: повтор задается только для сочетания клавиш целым числом >= 1")
+                    args = args + (repeat,)
+                steps.append(MacroStep(kind, value, label, func, args, category))
+        return steps
+
+    # --- Управление запусками ---
+
+    def start(self, name, steps):
+        """
+        Запускает макрос в отдельном потоке.
+        :return: Номер запуска или None, если уже выполняется максимум макросов.
+        """
+        with self._lock:
+            if len(self._runs) >= self.max_concurrent:
+                print(f"Макрос '{name}' не запущен: уже выполняется {len(self._runs)} макросов.")
+                return None
+            run = MacroRun(next(self._ids), name, steps)
+            self._runs[run.run_id] = run
+        run.thread = threading.Thread(target=self._run, args=(run,), name=f"macro-{run.run_id}", daemon=True)
+        self.run_started.emit(run.run_id, name)
+        run.thread.start()
+        return run.run_id
+
+    def is_running(self, run_id):
+        with self._lock:
+            return run_id in self._runs
+
+    def cancel(self, run_id):
+        """
+        Отменяет запуск. Поток макроса остановится на ближайшей границе шага, задержки или опроса.
+        :return: True, если запуск был активен.
+        """
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is None:
+            return False
+        run.cancel_event.set()
+        return True
+
+    def cancel_all(self):
+        with self._lock:
+            runs = list(self._runs.values())
+        for run in runs:
+            run.cancel_event.set()
+
+    def shutdown(self, wait_ms=2000):
+        """Отменяет все макросы и ждет завершения их потоков (при закрытии приложения)."""
+        self.cancel_all()
+        with self._lock:
+            threads = [run.thread for run in self._runs.values() if run.thread is not None]
+        deadline = time.perf_counter() + wait_ms / 1000
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.perf_counter()))
+
+    # --- Выполнение (поток макроса) ---
+
+    def _run(self, run):
+        self._timer_resolution.acquire()
+        started = time.perf_counter()
+        step_times = []
+        try:
+            for index, step in enumerate(run.steps):
+                if run.cancel_event.is_set():
+                    raise MacroCancelled()
+                step_started = time.perf_counter()
+                self._execute_step(run, step)
+                elapsed_ms = (time.perf_counter() - step_started) * 1000
+                step_times.append((step.label, elapsed_ms))
+                self.step_finished.emit(run.run_id, index, step.label, elapsed_ms)
+        except WaitCancelled:
+            # Отмена между шагами (MacroCancelled) или во время задержки (precise_wait)
+            print(f"Макрос '{run.name}' отменен.")
+            self.run_cancelled.emit(run.run_id, run.name)
+        except Exception as e:
+            message = f"шаг {len(step_times) + 1}: {e}"
+            print(f"Ошибка макроса '{run.name}': {message}")
+            self.run_failed.emit(run.run_id, run.name, message)
+        else:
+            total_ms = (time.perf_counter() - started) * 1000
+            details = ", ".join(f"{label} - {elapsed:.1f} мс" for label, elapsed in step_times)
+            print(f"Макрос '{run.name}' выполнен за {total_ms:.1f} мс ({details})")
+            self.run_finished.emit(run.run_id, run.name, total_ms)
+        finally:
+            self._timer_resolution.release()
+            with self._lock:
+                self._runs.pop(run.run_id, None)
+
+    def _execute_step(self, run, step):
+        if step.kind == constants.MACRO_STEP_DELAY:
+            precise_wait(step.value / 1000, run.cancel_event)
+        elif step.kind == constants.MACRO_STEP_WAIT_WINDOW:
+            self._wait_for(lambda: find_window(step.value), step, run.cancel_event)
+        elif step.kind == constants.MACRO_STEP_WAIT_PROCESS:
+            self._wait_for(lambda: process_running(step.value), step, run.cancel_event)
+        elif step.category == CATEGORY_GUI:
+            self._call_in_gui_thread(step, run.cancel_event)
+        elif step.category == CATEGORY_KEYBOARD:
+            self._wait_future(step.func(*step.args), run.cancel_event)
+        elif step.category in COM_CATEGORIES:
+            with com_apartment():
+                step.func(*step.args)
+        else:
+            step.func(*step.args)
+
+    @staticmethod
+    def _wait_for(condition, step, cancel_event):
+        """Опрашивает условие до его выполнения или тайм-аута шага."""
+        deadline = time.perf_counter() + step.timeout_ms / 1000
+        while not condition():
+            if time.perf_counter() >= deadline:
+                raise MacroStepError(f"'{step.value}' не появился за {step.timeout_ms} мс")
+            if cancel_event.wait(WAIT_POLL_MS / 1000):
+                raise MacroCancelled()
+
+    @staticmethod
+    def _wait_future(future, cancel_event):
+        """Ждет отправки клавиш; ошибка отправки проваливает шаг."""
+        deadline = time.perf_counter() + CATEGORY_TIMEOUTS_MS[CATEGORY_KEYBOARD] / 1000
+        while True:
+            try:
+                return future.result(WAIT_POLL_MS / 1000)
+            except FutureTimeoutError:
+                pass
+            except CancelledError:
+                raise MacroStepError("отправка клавиш отменена")
+            if cancel_event.is_set():
+                future.cancel()
+                raise MacroCancelled()
+            if time.perf_counter() >= deadline:
+                future.cancel()
+                raise MacroStepError(f"клавиши не отправлены за {CATEGORY_TIMEOUTS_MS[CATEGORY_KEYBOARD]} мс")
+
+    def _call_in_gui_thread(self, step, cancel_event):
+        """Выполняет шаг в GUI-потоке и ждет его завершения."""
+        call = {'func': step.func, 'args': step.args, 'done': threading.Event(), 'error': None}
+        self._gui_call_requested.emit(call)
+        while not call['done'].wait(WAIT_POLL_MS / 1000):
+            if cancel_event.is_set():
+                raise MacroCancelled()
+        if call['error'] is not None:
+            raise MacroStepError(call['error'])
+
+    def _run_gui_call(self, call):
+        try:
+            call['func'](*call['args'])
+        except Exception as e:
+            call['error'] = f"{type(e).__name__}: {e}"
+        finally:
+            call['done'].set()
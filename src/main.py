@@ -17,54 +17,27 @@ sys.path.insert(0, src_dir)
 sys.path.insert(0, libs_dir)
 # -------------------------------------------------------------
 
+# Профилировщик запуска (флаг --profile-startup) импортируется первым,
+# чтобы в отчет попало время импорта всех остальных модулей
+from startup_profiler import profiler
+
 import subprocess
-from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QLabel, QGridLayout, QFrame, QToolButton, QSizePolicy,
-    QVBoxLayout
-)
-from PySide6.QtCore import Qt, QRect, QSize, QEvent
-from PySide6.QtGui import QIcon
+with profiler.phase("Импорт PySide6"):
+    from PySide6.QtWidgets import (
+        QApplication, QMainWindow, QWidget, QLabel, QGridLayout, QFrame, QToolButton, QSizePolicy
+    )
+    from PySide6.QtCore import Qt, QTimer
+    from PySide6.QtGui import QIcon
 import warnings
 
 # Импорты для виджетов бара - добавляем сюда
-from Music_player import MusicPlayer
+# Music_player (yandex_music, QtMultimedia) импортируется лениво - при первом открытии плеера
 # Убираем старый импорт, так как compile_ui_files_recursively будет вызвана в __main__
 # from utils import compile_ui_files 
-import icons_rc
-
-def compile_ui_files_recursively_local_import(start_dir, output_dir):
-    """
-    Локальная версия функции, чтобы избежать проблем с импортом subprocess до main.
-    """
-    import subprocess
-    if not os.path.isdir(start_dir):
-        print(f"Ошибка: Директория '{start_dir}' не найдена.")
-        sys.exit(1)
-
-    for root, _, files in os.walk(start_dir):
-        for ui_file in files:
-            if not ui_file.endswith(".ui"):
-                continue
-
-            ui_path = os.path.join(root, ui_file)
-            
-            # Генерируем имя .py файла (например, comrado3.ui -> ui_comrado3.py)
-            # или resource/Bar_widget/Clock_widget.ui -> resource/Bar_widget/ui_Clock_widget.py
-            base_name = os.path.splitext(ui_file)[0]
-            py_file_name = f"ui_{base_name}.py"
-            py_path = os.path.join(root, py_file_name)
-
-            # Перекомпилируем, если .py файл отсутствует или .ui файл новее
-            if not os.path.exists(py_path) or os.path.getmtime(ui_path) > os.path.getmtime(py_path):
-                print(f"Обнаружены изменения в '{ui_path}'. Компиляция в '{py_path}'...")
-                try:
-                    subprocess.run(['pyside6-uic', ui_path, '-o', py_path], check=True)
-                    print("Компиляция прошла успешно.")
-                except (subprocess.CalledProcessError, FileNotFoundError) as e:
-                    print(f"Ошибка: Не удалось скомпилировать '{ui_path}'.")
-                    print(f"Подробности: {e}")
-                    print("Убедитесь, что 'pyside6-tools' установлены и доступны в системном PATH.")
-                    sys.exit(1)
+from utils import register_icon_resources
+# Системные иконки (:/icons) грузятся из бинарного icons.rcc, icons_rc.py - запасной вариант
+with profiler.phase("Регистрация ресурсов иконок"):
+    register_icon_resources()
 
 # Импортируем сгенерированные классы и обработчик действий уже ПОСЛЕ компиляции
 # (Это объявление будет выполнено после блока if __name__ == '__main__')
@@ -105,7 +78,35 @@ class MainWindow(QMainWindow):
 
         self.setAttribute(Qt.WA_AcceptTouchEvents)
 
-        self.config = load_config()
+        with profiler.phase("load_config"):
+            self.config = load_config()
+
+        # Способ отрисовки теней выбирается в config.json до создания виджетов с тенями
+        set_shadow_mode(self.config.get(constants.KEY_UI_SETTINGS, {}).get(
+            constants.KEY_SHADOW_MODE, SHADOW_MODE_EFFECT
+        ))
+
+        # Ленивое создание страниц кнопок с LRU материализованных страниц
+        # Размер иконок следует за фактическим размером кнопок (с объединением событий)
+        self.icon_sizer = ButtonIconSizer(constants.MAIN_ICON_PADDING, self)
+        self.page_cache = PageCache(
+            self.ui.Button_stackedWidget, self._build_page_content, create_button=self._create_page_button
+        )
+        # Анимация перелистывания на основе снимков страниц
+        self.page_transition = PageTransition(
+            self.ui.Button_stackedWidget, self.page_cache, self.prepare_page,
+            lambda index: self.action_handler.page_manager.get_key_for_index(index), self,
+            after_layout=self.icon_sizer.apply_to
+        )
+
+        # Касания страниц кнопок: одно срабатывание на касание, долгое нажатие, свайп
+        self.touch_dispatcher = TouchDispatcher(
+            self, self.ui.Button_stackedWidget,
+            lambda button: self.action_handler.handle_button_action(button), self
+        )
+        # Жесты подключаются один раз и всегда идут к текущему обработчику действий
+        self.touch_dispatcher.swiped.connect(self._on_swipe)
+        self.touch_dispatcher.long_pressed.connect(lambda button: self.action_handler.cancel_button_action(button))
 
         # self.setWindowTitle("El GUI COMRADO 5.1.2") # Удаляем эту строку
 
@@ -114,15 +115,41 @@ class MainWindow(QMainWindow):
         self.music_player_window = None
 
         # Перестраиваем страницы при запуске, чтобы UI соответствовал конфигу
-        self.rebuild_pages()
+        with profiler.phase("rebuild_pages"):
+            self.rebuild_pages()
+
+        # Заранее готовим миниатюры иконок всех страниц в фоновом пуле
+        prefetch_thumbnails(
+            button.get(constants.KEY_ICON_PATH)
+            for key, page in self.config.items() if key.startswith(constants.PAGE_PREFIX)
+            for button in page.values() if isinstance(button, dict)
+        )
+
+        # Гистограммы задержки и результатов действий кнопок; переживают пересоздание ActionHandler
+        self.action_metrics = ActionMetrics()
+        self.action_metrics.load()
+        self.metrics_save_timer = QTimer(self)
+        self.metrics_save_timer.timeout.connect(self.action_metrics.save)
+        self.metrics_save_timer.start(METRICS_SAVE_INTERVAL_MS)
+
+        # Снимок прошлой сессии читается и применяется один раз - при запуске
+        with profiler.phase("load_session"):
+            self.session = load_session()
 
         # Создаем экземпляр обработчика действий и передаем ему себя
-        self.action_handler = ActionHandler(self)
-        self.action_handler.setup_pages_and_controls()
+        with profiler.phase("ActionHandler"):
+            self.action_handler = ActionHandler(self, restore_session=True)
+        with profiler.phase("setup_pages_and_controls"):
+            self.action_handler.setup_pages_and_controls()
 
         # Подключаем кнопку к слоту
         self.ui.Music_bttn.clicked.connect(self.open_music_player)
 
+        # Следим за внешними изменениями config.json и CustomButtons.json
+        self.config_watcher = ConfigWatcher(self)
+        self.config_watcher.config_reloaded.connect(self.apply_external_config)
+        self.config_watcher.presets_reloaded.connect(self.apply_external_presets)
+
 
     def closeEvent(self, event):
         """
@@ -130,7 +157,19 @@ class MainWindow(QMainWindow):
         фоновых потоков.
         """
         print("Запрос на закрытие приложения. Завершение фоновых потоков...")
+
+        # 0. Сохраняем снимок сессии для быстрого следующего запуска
+        if hasattr(self, 'action_handler'):
+            self.action_handler.save_session()
         
+        # Отменяем ожидающие действия кнопок и ждем рабочие потоки
+        if hasattr(self, 'action_handler'):
+            self.action_handler.shutdown()
+        keyboard_injector.shutdown()
+        control_audio.shutdown()
+        if hasattr(self, 'action_metrics'):
+            self.action_metrics.save()
+
         # 1. Даем команду на остановку цикла мониторинга
         if hasattr(self, 'action_handler') and hasattr(self.action_handler, 'hw_reader'):
             self.action_handler.hw_reader.stop()
@@ -155,6 +194,7 @@ class MainWindow(QMainWindow):
         В будущем будет заменен на вызов через систему виджетов/плагинов.
         """
         if self.music_player_window is None or not self.music_player_window.isVisible():
+            from Music_player import MusicPlayer
             self.music_player_window = MusicPlayer()
             self.music_player_window.show()
 
@@ -180,31 +220,20 @@ class MainWindow(QMainWindow):
             self.showNormal()
 
     def event(self, event):
-        """Перехватывает события, чтобы обработать касания."""
-        if event.type() == QEvent.Type.TouchBegin:
-            # Проверяем, есть ли точки касания
-            if not event.points():
-                return super().event(event)
-
-            # Получаем первую точку касания
-            touch_point = event.points()[0]
-            
-            # Находим виджет (кнопку) под точкой касания
-            widget = self.childAt(touch_point.position().toPoint())
-            
-            # Проверяем, что это одна из наших кнопок ToolButton
-            if isinstance(widget, QToolButton) and "ToolButton" in widget.objectName():
-                # Вызываем наш универсальный обработчик
-                self.action_handler.handle_button_action(widget)
-                return True # Сообщаем, что событие обработано
-
+        """Перехватывает события, чтобы обработать касания (см. TouchDispatcher)."""
+        # Окно получает события еще во время setupUi, до создания конвейера
+        touch_dispatcher = getattr(self, "touch_dispatcher", None)
+        if touch_dispatcher is not None and touch_dispatcher.handle_event(event):
+            return True
         # Для всех остальных событий вызываем стандартный обработчик
         return super().event(event)
 
-    def resizeEvent(self, event):
-        """Перехватывает событие изменения размера окна для обновления иконок."""
-        super().resizeEvent(event)
-        self.update_icon_sizes()
+    def _on_swipe(self, direction):
+        """Листает страницы кнопок свайпом: 1 - следующая страница, -1 - предыдущая."""
+        if direction > 0:
+            self.action_handler.next_page()
+        else:
+            self.action_handler.previous_page()
 
     def show_editor_window(self):
         """Открывает модальное окно редактора."""
@@ -215,94 +244,140 @@ class MainWindow(QMainWindow):
             self.editor_window.config_saved.connect(self.update_buttons)
             self.editor_window.show()
 
-    def update_icon_sizes(self):
-        """Обновляет размеры иконок кнопок на текущей видимой странице."""
-        current_page = self.ui.Button_stackedWidget.currentWidget()
-        if not current_page:
-            return
-
-        buttons = current_page.findChildren(QToolButton)
-        for button in buttons:
-            # Оставляем небольшой отступ (padding) вокруг иконки
-            padding = 15
-            # Рассчитываем размер иконки, чтобы она была чуть меньше кнопки
-            icon_w = button.width() - padding
-            icon_h = button.height() - padding
-            
-            # Используем меньшую из сторон, чтобы иконка была квадратной и вписывалась
-            new_size = max(0, min(icon_w, icon_h)) 
-            
-            button.setIconSize(QSize(new_size, new_size))
-
     def update_buttons(self):
         """Перезагружает конфиг, перестраивает страницы и обновляет кнопки в главном окне."""
         print("Обновление кнопок и страниц после сохранения в редакторе...")
+        # Действия и макросы старого обработчика отменяются до перестройки страниц (их кнопки еще на месте)
+        self.action_handler.shutdown()
         self.config = load_config()
         self.rebuild_pages()
         # Полностью пересоздаем обработчик, чтобы гарантировать сброс его состояния
         self.action_handler = ActionHandler(self)
         self.action_handler.setup_pages_and_controls()
 
-    def rebuild_pages(self):
-        """Полностью перестраивает страницы в QStackedWidget на основе текущего конфига."""
-        # Очищаем старые страницы
-        while self.ui.Button_stackedWidget.count() > 0:
-            widget = self.ui.Button_stackedWidget.widget(0)
-            self.ui.Button_stackedWidget.removeWidget(widget)
-            widget.deleteLater()
+    def apply_external_config(self, new_config):
+        """
+        Применяет config.json, измененный извне (скриптом или синхронизацией),
+        перерисовывая только измененные страницы и кнопки.
+        """
+        changed_pages = diff_config_pages(self.config, new_config)
+        if changed_pages is None:
+            print("Набор страниц в config.json изменился извне. Полная перестройка...")
+            self.update_buttons()
+            return
+
+        # Остальные секции (аудио, HWINFO и т.д.) просто заменяем - они читаются по требованию
+        self.config = new_config
+        if not changed_pages:
+            return
 
+        print(f"config.json изменен извне. Обновляются страницы: {', '.join(sorted(changed_pages))}")
+        page_manager = self.action_handler.page_manager
+        current_index = page_manager.current_page_index
+        current_key = page_manager.get_key_for_index(current_index)
+        # Частичной перерисовки достаточно, только если текущая страница была актуальна до изменения
+        current_was_fresh = self.page_cache.is_up_to_date(current_index, current_key)
+
+        # Неактивные страницы перерисуются при переключении на них (их версия устареет),
+        # поэтому сразу перерисовываем только текущую.
+        for page_key, changed_buttons in changed_pages.items():
+            self.page_cache.bump_version(page_key)
+            if changed_buttons is None:
+                # Изменились свойства страницы (например, размер сетки) - пересоздаем ее содержимое
+                self.page_cache.discard(page_manager.get_index_for_key(page_key))
+
+        if current_key in changed_pages:
+            only_buttons = changed_pages[current_key] if current_was_fresh else None
+            if only_buttons is None:
+                self.prepare_page(current_index)
+            else:
+                self.action_handler.load_page_config(current_index, only_buttons=only_buttons)
+                self.page_cache.mark_rendered(current_index, current_key)
+
+    def apply_external_presets(self, presets):
+        """Обновляет список пресетов в открытом редакторе после внешнего изменения CustomButtons.json."""
+        print(f"CustomButtons.json изменен извне. Пресетов: {len(presets)}")
+        if self.editor_window is not None and self.editor_window.isVisible():
+            self.editor_window.load_presets_to_list()
+
+    def rebuild_pages(self):
+        """
+        Перестраивает страницы в QStackedWidget на основе текущего конфига.
+        Создаются только легкие заглушки; содержимое страниц строится лениво
+        при первом переходе на них (см. PageCache).
+        """
         # Получаем отсортированные ключи страниц
-        page_keys = sorted(
-            [key for key in self.config if key.startswith("page_")],
-            key=lambda k: int(k.split('_')[1])
-        )
+        page_keys = sort_page_keys(key for key in self.config if key.startswith(constants.PAGE_PREFIX))
         
         # Если страниц нет, создаем одну пустую для отображения
         if not page_keys:
             page_keys = ["page_1"]
 
-        for page_key in page_keys:
-            # Создаем ВНЕШНИЙ виджет-контейнер для тени
-            page_widget = QWidget()
-            page_widget.setObjectName(page_key)
-            
-            # Создаем компоновку для внешнего виджета, чтобы внутренний фрейм его заполнил
-            container_layout = QVBoxLayout(page_widget)
-            container_layout.setContentsMargins(10, 10, 10, 10) # Отступы для тени
-
-            # Создаем ВНУТРЕННИЙ фрейм для фона и скругления
-            page_container = QFrame()
-            page_container.setObjectName("page_container") # Имя для QSS
-            container_layout.addWidget(page_container)
-
-            # Создаем сеточную компоновку уже для ВНУТРЕННЕГО фрейма
-            grid_layout = QGridLayout(page_container)
-            grid_layout.setSpacing(15) # Расстояние между кнопками
-            
-            # Создаем 12 кнопок и добавляем их в сетку 3x4
-            button_index = 0
-            for row in range(3):
-                for col in range(4):
-                    if button_index >= 12:
-                        break
-                    
-                    button = QToolButton()
-                    # Имя объекта теперь включает номер от 1 до 12
-                    button.setObjectName(f"ToolButton_{button_index + 1:02d}")
-                    
-                    # Устанавливаем политику размеров, чтобы кнопка могла растягиваться
-                    button.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-                    
-                    button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-                    button.setCheckable(False)
-                    button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
-                    
-                    # Добавляем кнопку в ячейку сетки
-                    grid_layout.addWidget(button, row, col)
-                    
-                    button_index += 1
-            
-            self.ui.Button_stackedWidget.addWidget(page_widget)
+        ui_settings = self.config.get(constants.KEY_UI_SETTINGS, {})
+        self.page_cache.capacity = max(1, int(ui_settings.get(
+            constants.KEY_MATERIALIZED_PAGES, constants.DEFAULT_MATERIALIZED_PAGES
+        )))
+        self.page_transition.configure(ui_settings)
+        self.touch_dispatcher.configure(ui_settings)
+        self.page_transition.clear()
+        self.page_cache.reset(page_keys)
+
+    def prepare_page(self, index):
+        """
+        Материализует страницу и перерисовывает ее кнопки, если конфиг изменился с прошлой отрисовки.
+        Работает и для скрытых страниц (подготовка соседних страниц к анимации).
+        :param index: Индекс страницы (0-индексированный).
+        :return: True, если страница уже была отрисована с актуальной версией конфига.
+        """
+        page_key = self.action_handler.page_manager.get_key_for_index(index)
+        page_widget = self.page_cache.ensure(index)
+        if page_widget is None:
+            return False
+        if self.page_cache.is_up_to_date(index, page_key):
+            return True
+        self.action_handler.load_page_config(index)
+        return False
+
+    def _build_page_content(self, page_widget):
+        """
+        Создает содержимое страницы кнопок: внутренний фрейм и сетку кнопок
+        размером, заданным в конфиге страницы (по умолчанию 3x4).
+        Вызывается PageCache при первом переходе на страницу.
+        :param page_widget: Внешний виджет-заглушка страницы.
+        :return: Созданный фрейм с кнопками.
+        """
+        rows, columns = get_page_grid(self.config.get(page_widget.objectName(), {}))
+
+        # Создаем ВНУТРЕННИЙ фрейм для фона и скругления
+        page_container = QFrame(page_widget)
+        page_container.setObjectName("page_container") # Имя для QSS
+
+        # Создаем сеточную компоновку уже для ВНУТРЕННЕГО фрейма
+        grid_layout = QGridLayout(page_container)
+        grid_layout.setSpacing(constants.MAIN_GRID_SPACING) # Расстояние между кнопками
+
+        # Кнопки берутся из пула: вытесненные страницы отдают свои кнопки новым
+        for button_index in range(rows * columns):
+            button = self.page_cache.button_pool.acquire(page_container)
+            # Имя объекта включает номер кнопки, начиная с 1
+            button.setObjectName(f"ToolButton_{button_index + 1:02d}")
+            # Добавляем кнопку в ячейку сетки
+            grid_layout.addWidget(button, button_index // columns, button_index % columns)
+
+        return page_container
+
+    def _create_page_button(self):
+        """Создает новую кнопку для пула кнопок страниц."""
+        button = QToolButton()
+        # Кнопка растягивается вместе с ячейкой, но не больше стандартного размера
+        button.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        button.setMinimumSize(constants.MAIN_BUTTON_MIN_SIZE, constants.MAIN_BUTTON_MIN_SIZE)
+        button.setMaximumSize(constants.MAIN_BUTTON_SIZE, constants.MAIN_BUTTON_SIZE)
+        button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        button.setCheckable(False)
+        button.setToolButtonStyle(Qt.ToolButtonStyle.ToolButtonTextUnderIcon)
+        self.icon_sizer.track(button)
+        return button
 
 
     def show_settings_window(self):
@@ -315,6 +390,7 @@ class MainWindow(QMainWindow):
 if __name__ == "__main__":
     # Импортируем утилиты здесь, после настройки пути
     from utils import compile_ui_files_recursively, get_window_title_from_ui, resource_path
+    from utils import set_shadow_mode, SHADOW_MODE_EFFECT
 
     # Определяем пути для компиляции
     # Используем PROJECT_ROOT из utils, чтобы не дублировать логику
@@ -323,16 +399,33 @@ if __name__ == "__main__":
     output_py_dir = os.path.join(PROJECT_ROOT, 'src')
 
     # Вызываем рекурсивную компиляцию для всего проекта ПЕРЕД импортами
-    compile_ui_files_recursively(ui_files_dir, output_py_dir)
+    with profiler.phase("Проверка .ui (compile_ui_files_recursively)"):
+        compile_ui_files_recursively(ui_files_dir, output_py_dir)
     
     # Теперь, когда все скомпилировано, можно безопасно импортировать модули,
     # которые зависят от сгенерированных файлов.
-    from ui_comrado3 import Ui_MainWindow
-    from comrado3 import ActionHandler
+    with profiler.phase("Импорт ui_comrado3"):
+        from ui_comrado3 import Ui_MainWindow
+    # Тяжелые системные библиотеки замеряются отдельно (clr/wmi - при импорте control_hwinfo в comrado3)
+    with profiler.phase("Импорт pycaw (control_audio)"):
+        import control_audio
+    with profiler.phase("Импорт comrado3"):
+        from comrado3 import ActionHandler
     from LoadSave import load_config
+    from session_snapshot import load_session
     from editor import EditorWindow
-
-    app = QApplication(sys.argv)
+    from config_watcher import ConfigWatcher, diff_config_pages
+    from page_cache import PageCache, ButtonIconSizer
+    from page_manager import sort_page_keys, get_page_grid
+    from page_transition import PageTransition
+    from touch_input import TouchDispatcher
+    from action_metrics import ActionMetrics, METRICS_SAVE_INTERVAL_MS
+    from keyboard_injector import injector as keyboard_injector
+    from icon_cache import prefetch_thumbnails
+    import constants
+
+    with profiler.phase("QApplication"):
+        app = QApplication(sys.argv)
     
     # --- ЗАГРУЗКА СТИЛЕЙ ИЗ ФАЙЛА ---
     try:
@@ -352,12 +445,15 @@ if __name__ == "__main__":
     window_title = get_window_title_from_ui(ui_path) or "El GUI COMRADO"
 
     # --- Запуск основного окна ---
-    window = MainWindow()
+    with profiler.phase("MainWindow"):
+        window = MainWindow()
     window.setWindowTitle(window_title) # Устанавливаем динамически загруженный заголовок
 
     # --- Убрана логика для автоматического позиционирования ---
     # Теперь окно всегда запускается в обычном режиме.
-    window.show()
+    profiler.watch_first_paint(window)
+    with profiler.phase("window.show"):
+        window.show()
     # --------------------------------------------------------------------------
     
     sys.exit(app.exec())
@@ -0,0 +1,236 @@
+from collections import OrderedDict
+
+from PySide6.QtCore import QEvent, QObject, QSize, QTimer
+from PySide6.QtGui import QFont, QIcon
+from PySide6.QtWidgets import QToolButton, QWidget, QVBoxLayout
+
+import constants
+
+
+class ButtonIconSizer(QObject):
+    """
+    Подгоняет размер иконки кнопки под ее фактический размер.
+    Реагирует на события Resize самих кнопок (то есть на реальное изменение
+    геометрии после пересчета компоновки) и обрабатывает их пачкой в следующем
+    проходе цикла событий, поэтому серия промежуточных изменений размера окна
+    дает один пересчет и только для изменившихся кнопок.
+    """
+    def __init__(self, padding, parent=None):
+        """
+        :param padding: Отступ между границей кнопки и иконкой (пиксели).
+        """
+        super().__init__(parent)
+        self.padding = padding
+        self._dirty = set()
+        self._scheduled = False
+
+    def track(self, button):
+        """Начинает следить за размером кнопки."""
+        button.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Resize:
+            self._dirty.add(watched)
+            if not self._scheduled:
+                self._scheduled = True
+                QTimer.singleShot(0, self._flush)
+        return False
+
+    def _flush(self):
+        """Применяет размеры иконок ко всем кнопкам, изменившим размер с прошлого прохода."""
+        self._scheduled = False
+        buttons, self._dirty = self._dirty, set()
+        for button in buttons:
+            try:
+                self.apply(button)
+            except RuntimeError:
+                pass # Кнопка уже удалена
+
+    def apply(self, button):
+        """Сразу выставляет размер иконки по текущему размеру кнопки."""
+        # Используем меньшую из сторон, чтобы иконка была квадратной и вписывалась
+        side = max(0, min(button.width(), button.height()) - self.padding)
+        if button.iconSize() != QSize(side, side):
+            button.setIconSize(QSize(side, side))
+
+    def apply_to(self, widget):
+        """Сразу обновляет иконки всех кнопок внутри виджета (например, скрытой страницы)."""
+        for button in widget.findChildren(QToolButton):
+            self.apply(button)
+
+
+class ButtonPool:
+    """
+    Пул отсоединенных кнопок для повторного использования.
+    Когда страница вытесняется из PageCache, ее кнопки не удаляются, а возвращаются
+    в пул и достаются следующей создаваемой странице. Так число кнопок в памяти
+    ограничено, а тени и прочая настройка кнопок не создаются заново.
+    """
+    def __init__(self, create_button, max_size=constants.BUTTON_POOL_SIZE):
+        """
+        :param create_button: Функция () -> QToolButton для создания новой кнопки, если пул пуст.
+        :param max_size: Сколько свободных кнопок хранить; лишние удаляются.
+        """
+        self._create_button = create_button
+        self.max_size = max_size
+        self._free = []
+
+    def acquire(self, parent):
+        """Возвращает кнопку (из пула или новую), уже помещенную в parent и видимую."""
+        button = self._free.pop() if self._free else self._create_button()
+        button.setParent(parent)
+        button.show()
+        return button
+
+    def release(self, button):
+        """Возвращает кнопку в пул, сбрасывая ее содержимое."""
+        if len(self._free) >= self.max_size:
+            button.setParent(None)
+            button.deleteLater()
+            return
+        button.setParent(None)
+        button.setText("")
+        button.setIcon(QIcon())
+        button.setFont(QFont())
+        button.setChecked(False)
+        # Индикатор выполняющегося действия не должен переехать на другую страницу
+        button.setProperty("actionJob", None)
+        button.setProperty("actionState", "")
+        button._dispatch = None
+        self._free.append(button)
+
+    def __len__(self):
+        return len(self._free)
+
+
+class PageCache:
+    """
+    Управляет страницами кнопок в QStackedWidget.
+    Для каждой страницы в стек добавляется легкий виджет-заглушка, поэтому индексация
+    QStackedWidget не меняется. Содержимое страницы (фрейм, сетка, кнопки) создается
+    только при первом переходе на нее, а в памяти хранятся лишь K последних
+    использованных страниц (LRU). Остальные освобождаются.
+
+    Кроме того, для каждой страницы хранится версия ее содержимого в конфиге, а на
+    материализованном виджете - версия, с которой он был отрисован. Если они совпадают,
+    повторный переход на страницу не требует перерисовки кнопок.
+    """
+    def __init__(self, stacked_widget, build_page_content, capacity=3, create_button=None):
+        """
+        :param stacked_widget: QStackedWidget, в котором живут страницы.
+        :param build_page_content: Функция (page_widget) -> QWidget, которая создает
+                                   содержимое страницы внутри виджета-заглушки.
+        :param capacity: Сколько материализованных страниц держать в памяти (минимум 1).
+        :param create_button: Функция () -> QToolButton. Если задана, кнопки вытесненных
+                              страниц возвращаются в пул self.button_pool.
+        """
+        self.stacked_widget = stacked_widget
+        self._build_page_content = build_page_content
+        self.capacity = max(1, int(capacity))
+        self.button_pool = ButtonPool(create_button) if create_button else None
+        # Индекс страницы -> виджет содержимого, в порядке от давно использованных к свежим
+        self._materialized = OrderedDict()
+        # Ключ страницы -> версия ее содержимого (растет при каждом изменении конфига страницы)
+        self._content_versions = {}
+
+    def reset(self, page_keys):
+        """Удаляет все страницы и создает заглушки для новых ключей страниц."""
+        for index in list(self._materialized):
+            self.discard(index)
+        self._content_versions.clear()
+        while self.stacked_widget.count() > 0:
+            widget = self.stacked_widget.widget(0)
+            self.stacked_widget.removeWidget(widget)
+            widget.deleteLater()
+
+        for page_key in page_keys:
+            self.add_page(page_key)
+
+    def add_page(self, page_key):
+        """
+        Добавляет в конец стека заглушку новой страницы.
+        :return: Индекс добавленной страницы.
+        """
+        # ВНЕШНИЙ виджет-контейнер для тени
+        page_widget = QWidget()
+        page_widget.setObjectName(page_key)
+        # Компоновка, чтобы внутренний фрейм заполнил внешний виджет
+        container_layout = QVBoxLayout(page_widget)
+        container_layout.setContentsMargins(10, 10, 10, 10) # Отступы для тени
+        return self.stacked_widget.addWidget(page_widget)
+
+    def discard(self, index):
+        """
+        Освобождает содержимое страницы (например, если изменился размер ее сетки).
+        При следующем ensure() оно будет создано заново.
+        """
+        content = self._materialized.pop(index, None)
+        if content is None:
+            return
+        if self.button_pool is not None:
+            for button in content.findChildren(QToolButton):
+                self.button_pool.release(button)
+        content.setParent(None)
+        content.deleteLater()
+
+    def is_materialized(self, index):
+        """Проверяет, создано ли содержимое страницы с указанным индексом."""
+        return index in self._materialized
+
+    def content_version(self, page_key):
+        """Возвращает текущую версию содержимого страницы."""
+        return self._content_versions.get(page_key, 0)
+
+    def bump_version(self, page_key):
+        """Отмечает, что конфигурация страницы изменилась и ее виджет нужно перерисовать."""
+        self._content_versions[page_key] = self.content_version(page_key) + 1
+
+    def is_up_to_date(self, index, page_key):
+        """
+        Проверяет, отрисовано ли содержимое страницы с актуальной версией конфига.
+        :param index: Индекс страницы (0-индексированный).
+        :param page_key: Ключ страницы в конфиге.
+        """
+        content = self._materialized.get(index)
+        if content is None:
+            return False
+        return getattr(content, "_rendered_version", None) == self.content_version(page_key)
+
+    def mark_rendered(self, index, page_key):
+        """Запоминает на виджете страницы версию, с которой он был отрисован."""
+        content = self._materialized.get(index)
+        if content is not None:
+            content._rendered_version = self.content_version(page_key)
+
+    def ensure(self, index):
+        """
+        Гарантирует, что содержимое страницы создано, и помечает ее как последнюю использованную.
+        :param index: Индекс страницы (0-индексированный).
+        :return: Виджет страницы (заглушка с содержимым) или None, если индекс некорректен.
+        """
+        page_widget = self.stacked_widget.widget(index)
+        if page_widget is None:
+            return None
+
+        if index in self._materialized:
+            self._materialized.move_to_end(index)
+            return page_widget
+
+        content = self._build_page_content(page_widget)
+        page_widget.layout().addWidget(content)
+        self._materialized[index] = content
+        self._evict(keep=index)
+        return page_widget
+
+    def _evict(self, keep=None):
+        """
+        Освобождает давно неиспользуемые страницы сверх лимита.
+        :param keep: Индекс страницы, которую нельзя вытеснять (только что созданная).
+        """
+        protected = {self.stacked_widget.currentIndex(), keep}
+        while len(self._materialized) > self.capacity:
+            # Видимую и только что запрошенную страницы не трогаем, даже если они самые "старые"
+            index = next((i for i in self._materialized if i not in protected), None)
+            if index is None:
+                break
+            self.discard(index)
@@ -1,5 +1,36 @@
 from PySide6.QtCore import QObject, Signal
 
+import constants
+
+
+def _page_sort_key(page_key):
+    """Sort key placing numbered pages in numeric order and anything else after them."""
+    suffix = page_key[len(constants.PAGE_PREFIX):] if page_key.startswith(constants.PAGE_PREFIX) else ""
+    return (0, int(suffix), "") if suffix.isdigit() else (1, 0, page_key)
+
+
+def sort_page_keys(page_keys):
+    """Sorts page keys by page number ('page_2' comes before 'page_10')."""
+    return sorted(page_keys, key=_page_sort_key)
+
+
+def get_page_grid(page_config):
+    """
+    Returns the (rows, columns) button grid of a page.
+    Missing or invalid values fall back to the default 3x4 grid.
+    """
+    def side(key, default):
+        value = page_config.get(key, default) if isinstance(page_config, dict) else default
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        return min(max(value, 1), constants.MAX_GRID_SIDE)
+
+    return (side(constants.KEY_GRID_ROWS, constants.DEFAULT_GRID_ROWS),
+            side(constants.KEY_GRID_COLUMNS, constants.DEFAULT_GRID_COLUMNS))
+
+
 class PageManager(QObject):
     """Manages page state and navigation logic."""
     page_changed = Signal(int) # Signal emitting the new page number (1-indexed)
@@ -11,7 +42,7 @@ class PageManager(QObject):
 
     def set_page_keys(self, page_keys):
         """Updates the list of page keys and resets the index if needed."""
-        self._page_keys = sorted(page_keys) if page_keys else []
+        self._page_keys = sort_page_keys(page_keys) if page_keys else []
         # Reset index if it's out of bounds after updating keys
         if self.current_page_index >= len(self._page_keys):
             # Go to the last page if it exists, otherwise 0
@@ -62,6 +93,13 @@ class PageManager(QObject):
                 self.current_page_index = page_index
             self.page_changed.emit(self.get_current_page_number())
 
+    def get_index_for_key(self, page_key):
+        """Returns the index of a page key, or -1 if there is no such page."""
+        try:
+            return self._page_keys.index(page_key)
+        except ValueError:
+            return -1
+
     def get_key_for_index(self, index):
         """Returns the page key for a given index."""
         if 0 <= index < len(self._page_keys):
@@ -0,0 +1,279 @@
+import time
+
+from PySide6.QtCore import QObject, QPoint, QRect, Qt, QTimer
+from PySide6.QtGui import QPainter, QPixmap, QRegion
+from PySide6.QtWidgets import QWidget
+
+import constants
+from action_executor import TRACE_LATENCY
+
+# Целевая частота кадров анимации и допустимое время кадра
+FRAME_INTERVAL_MS = 16
+FRAME_BUDGET_MS = 1000 / 60
+# Пауза без переключений, после которой начинается подготовка соседних страниц
+IDLE_PRERENDER_DELAY_MS = 400
+
+
+def _ease_out_cubic(t):
+    """Функция плавности: быстрое начало и мягкая остановка."""
+    return 1 - (1 - t) ** 3
+
+
+class TransitionOverlay(QWidget):
+    """
+    Непрозрачный виджет поверх QStackedWidget, который на время анимации рисует
+    фон и два готовых снимка страниц. Настоящие кнопки под ним не перерисовываются.
+    """
+    def __init__(self, stacked_widget):
+        super().__init__(stacked_widget)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.hide()
+        self.background = QPixmap()
+        self.outgoing = QPixmap()
+        self.incoming = QPixmap()
+        self.direction = 1  # 1 - вперед (новая страница въезжает справа), -1 - назад
+        self.progress = 0.0
+        self.paint_times_ms = []
+
+    def paintEvent(self, event):
+        started = time.perf_counter()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.background)
+        shift = int(round(self.width() * _ease_out_cubic(self.progress)))
+        painter.drawPixmap(-self.direction * shift, 0, self.outgoing)
+        painter.drawPixmap(self.direction * (self.width() - shift), 0, self.incoming)
+        painter.end()
+        self.paint_times_ms.append((time.perf_counter() - started) * 1000)
+
+
+class PageTransition(QObject):
+    """
+    Анимация перелистывания страниц кнопок на основе снимков.
+    Вместо живой анимации 12 кнопок с тенями страницы один раз рисуются в QPixmap,
+    а каждый кадр лишь сдвигает два готовых изображения. Настоящая страница
+    становится видимой по окончании анимации. В простое заранее готовятся снимки
+    соседних страниц, чтобы первое перелистывание тоже было плавным.
+    """
+    def __init__(self, stacked_widget, page_cache, prepare_page, page_key_for_index, parent=None,
+                 after_layout=None):
+        """
+        :param stacked_widget: QStackedWidget со страницами кнопок.
+        :param page_cache: PageCache (версии содержимого страниц).
+        :param prepare_page: Функция (index), которая материализует и отрисовывает страницу.
+        :param page_key_for_index: Функция (index) -> ключ страницы в конфиге.
+        :param after_layout: Необязательная функция (page_widget), вызываемая после ручной
+                             расстановки скрытой страницы перед снимком (например, размер иконок).
+        """
+        super().__init__(parent)
+        self.stacked_widget = stacked_widget
+        self.page_cache = page_cache
+        self._prepare_page = prepare_page
+        self._page_key_for_index = page_key_for_index
+        self._after_layout = after_layout
+        self.enabled = True
+        self.duration_ms = constants.DEFAULT_PAGE_TRANSITION_MS
+        self.last_stats = {}
+
+        self._snapshots = {}     # индекс -> (ключ страницы, версия, размер, QPixmap)
+        self._background = None  # (размер, QPixmap)
+        self._pending_prerender = []
+
+        self.overlay = TransitionOverlay(stacked_widget)
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self._on_frame)
+        self._started = 0.0
+        self._frame_times = []
+
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(IDLE_PRERENDER_DELAY_MS)
+        self.idle_timer.timeout.connect(self._start_prerender)
+
+    def configure(self, ui_settings):
+        """Читает настройки анимации из секции ui_settings конфига."""
+        self.enabled = ui_settings.get(
+            constants.KEY_PAGE_TRANSITION, constants.PAGE_TRANSITION_SLIDE
+        ) == constants.PAGE_TRANSITION_SLIDE
+        self.duration_ms = max(1, int(ui_settings.get(
+            constants.KEY_PAGE_TRANSITION_MS, constants.DEFAULT_PAGE_TRANSITION_MS
+        )))
+
+    def clear(self):
+        """Сбрасывает все снимки (после перестройки страниц)."""
+        self.finish()
+        self._snapshots.clear()
+        self._background = None
+        self._pending_prerender = []
+
+    def is_running(self):
+        return self.frame_timer.isActive()
+
+    # --- Снимки ---
+
+    def snapshot(self, index):
+        """
+        Возвращает снимок страницы, делая его заново только при изменении версии или размера.
+        Страница к этому моменту должна быть материализована и отрисована.
+        """
+        page_widget = self.stacked_widget.widget(index)
+        if page_widget is None:
+            return QPixmap()
+        page_key = self._page_key_for_index(index)
+        version = self.page_cache.content_version(page_key)
+        size = self.stacked_widget.size()
+
+        cached = self._snapshots.get(index)
+        if cached and cached[0] == page_key and cached[1] == version and cached[2] == size:
+            return cached[3]
+
+        # Скрытая страница еще не расставила свои виджеты - активируем компоновки вручную
+        if page_widget.geometry().size() != size:
+            page_widget.resize(size)
+        for widget in [page_widget] + page_widget.findChildren(QWidget):
+            if widget.layout() is not None:
+                widget.layout().activate()
+        # Скрытые виджеты получат события Resize только при показе - досчитываем сразу
+        if self._after_layout is not None:
+            self._after_layout(page_widget)
+        pixmap = page_widget.grab()
+        self._snapshots[index] = (page_key, version, size, pixmap)
+        return pixmap
+
+    def _background_pixmap(self):
+        """
+        Фон под страницами: собственная отрисовка QStackedWidget и всех его родителей
+        без дочерних виджетов. Нужен, так как у страниц есть прозрачные поля под тень.
+        """
+        size = self.stacked_widget.size()
+        if self._background and self._background[0] == size:
+            return self._background[1]
+
+        pixmap = QPixmap(size * self.stacked_widget.devicePixelRatioF())
+        pixmap.setDevicePixelRatio(self.stacked_widget.devicePixelRatioF())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        ancestors = []
+        widget = self.stacked_widget
+        while widget is not None:
+            ancestors.append(widget)
+            widget = widget.parentWidget()
+        for ancestor in reversed(ancestors):
+            offset = self.stacked_widget.mapTo(ancestor, QPoint(0, 0))
+            # Область с началом в offset рисуется в точку (0, 0) снимка
+            ancestor.render(
+                painter, QPoint(0, 0), QRegion(QRect(offset, size)),
+                QWidget.RenderFlag.DrawWindowBackground
+            )
+        painter.end()
+        self._background = (size, pixmap)
+        return pixmap
+
+    # --- Анимация ---
+
+    def can_animate(self, from_index, to_index):
+        """Проверяет, имеет ли смысл анимировать переход."""
+        return (self.enabled and from_index != to_index and from_index >= 0
+                and self.stacked_widget.isVisible()
+                and self.page_cache.is_materialized(from_index))
+
+    def start(self, from_index, to_index, direction):
+        """
+        Запускает анимацию перехода. Вызывается до setCurrentIndex(to_index):
+        оверлей закрывает стек сразу, поэтому смена страницы под ним не видна.
+        :param direction: 1 - вперед, -1 - назад.
+        """
+        self.finish()
+        self.idle_timer.stop()
+        overlay = self.overlay
+        overlay.background = self._background_pixmap()
+        overlay.outgoing = self.snapshot(from_index)
+        overlay.incoming = self.snapshot(to_index)
+        overlay.direction = direction
+        overlay.progress = 0.0
+        overlay.paint_times_ms = []
+        overlay.setGeometry(self.stacked_widget.rect())
+        overlay.raise_()
+        overlay.show()
+
+        self._frame_times = []
+        self._started = time.perf_counter()
+        self.frame_timer.start()
+
+    def finish(self):
+        """Мгновенно завершает текущую анимацию (например, при быстром повторном листании)."""
+        if not self.frame_timer.isActive():
+            return
+        self.frame_timer.stop()
+        self.overlay.hide()
+        self._report()
+
+    def _on_frame(self):
+        now = time.perf_counter()
+        self._frame_times.append(now)
+        progress = min(1.0, (now - self._started) * 1000 / self.duration_ms)
+        self.overlay.progress = progress
+        if progress >= 1.0:
+            self.finish()
+            self.schedule_prerender()
+            return
+        self.overlay.repaint()
+
+    def _report(self):
+        """Считает статистику кадров последней анимации (в консоль - только с --trace-latency)."""
+        times = self._frame_times
+        intervals = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+        paints = self.overlay.paint_times_ms
+        if not intervals:
+            return
+        total_ms = (times[-1] - self._started) * 1000
+        self.last_stats = {
+            'frames': len(times),
+            'duration_ms': total_ms,
+            'fps': len(times) / (total_ms / 1000) if total_ms > 0 else 0.0,
+            'max_frame_ms': max(intervals),
+            'dropped_frames': sum(1 for dt in intervals if dt > FRAME_BUDGET_MS * 1.5),
+            'avg_paint_ms': sum(paints) / len(paints) if paints else 0.0,
+        }
+        if not TRACE_LATENCY:
+            return
+        stats = self.last_stats
+        print(f"Анимация страницы: {stats['frames']} кадров, {stats['fps']:.1f} fps, "
+              f"макс. кадр {stats['max_frame_ms']:.1f} мс, пропущено {stats['dropped_frames']}, "
+              f"отрисовка {stats['avg_paint_ms']:.2f} мс/кадр")
+
+    # --- Подготовка соседних страниц в простое ---
+
+    def schedule_prerender(self):
+        """Перезапускает таймер простоя, после которого готовятся снимки соседних страниц."""
+        if self.enabled:
+            self.idle_timer.start()
+
+    def _start_prerender(self):
+        count = self.stacked_widget.count()
+        current = self.stacked_widget.currentIndex()
+        if count < 2 or current < 0:
+            return
+        neighbours = []
+        for index in ((current + 1) % count, (current - 1) % count):
+            if index != current and index not in neighbours:
+                neighbours.append(index)
+        # Не вытесняем из LRU текущую страницу ради соседей
+        self._pending_prerender = neighbours[:max(0, self.page_cache.capacity - 1)]
+        QTimer.singleShot(0, self._prerender_next)
+
+    def _prerender_next(self):
+        """Готовит по одной странице за проход цикла событий, чтобы не блокировать ввод."""
+        if self.is_running() or not self._pending_prerender:
+            self._pending_prerender = []
+            return
+        index = self._pending_prerender.pop(0)
+        if self._page_key_for_index(index):
+            self._prepare_page(index)
+            self.snapshot(index)
+        if self._pending_prerender:
+            QTimer.singleShot(0, self._prerender_next)
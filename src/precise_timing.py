@@ -0,0 +1,29 @@
+import time
+
+# Последние миллисекунды ожидания добираются активным ожиданием: обычный таймер
+# Windows срабатывает с точностью ~1-15 мс
+_SPIN_MARGIN_S = 0.002
+
+
+class WaitCancelled(Exception):
+    """Ожидание прервано событием отмены."""
+
+
+def precise_wait(seconds, cancel_event):
+    """
+    Ждет заданное время с точностью до миллисекунды, не занимая процессор большую часть ожидания.
+    :param cancel_event: threading.Event; при его установке ожидание прерывается.
+    :raises WaitCancelled: Если ожидание отменено.
+    """
+    deadline = time.perf_counter() + seconds
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        if remaining > _SPIN_MARGIN_S:
+            if cancel_event.wait(remaining - _SPIN_MARGIN_S):
+                raise WaitCancelled()
+        else:
+            if cancel_event.is_set():
+                raise WaitCancelled()
+            time.sleep(0)
@@ -0,0 +1,60 @@
+import json
+import os
+
+from utils import PROJECT_ROOT
+
+# Снимок состояния панели на момент выхода: по нему следующий запуск сразу рисует
+# последнее состояние, пока живые подсистемы (LHM, COM-аудио, Яндекс.Музыка) догружаются в фоне
+SESSION_FILE = os.path.join(PROJECT_ROOT, 'cache', 'session.json')
+# Обложка текущего трека (сохраняется рядом со снимком)
+SESSION_COVER_FILE = os.path.join(PROJECT_ROOT, 'cache', 'session_cover.png')
+_SESSION_FORMAT = 1
+
+# Ключи снимка
+KEY_PAGE = "page"                   # Ключ открытой страницы кнопок ("page_3")
+KEY_TAB = "tab"                     # Открытая вкладка (см. TAB_*)
+KEY_GPU_NAMES = "gpu_names"         # Список GPU из available_gpus_found
+KEY_SENSORS = "sensors"             # Последние данные датчиков: cpu, gpu, ram, storage
+KEY_AUDIO_DEVICES = "audio_devices" # Список активных аудиоустройств
+KEY_MUSIC = "music"                 # Позиция в очереди и метаданные текущего трека
+
+TAB_MAIN = "main"
+TAB_BUTTONS = "buttons"
+TAB_SETTINGS = "settings"
+TAB_MUSIC = "music"
+
+
+def load_session():
+    """
+    Читает снимок прошлой сессии.
+    :return: Словарь снимка (пустой, если снимка нет или он поврежден).
+    """
+    try:
+        with open(SESSION_FILE, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"Не удалось прочитать снимок сессии: {e}")
+        return {}
+    if not isinstance(session, dict) or session.get("format") != _SESSION_FORMAT:
+        return {}
+    return session
+
+
+def save_session(session):
+    """
+    Атомарно сохраняет снимок сессии.
+    :param session: Словарь снимка (значения должны сериализоваться в JSON).
+    """
+    data = dict(session, format=_SESSION_FORMAT)
+    tmp_path = SESSION_FILE + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            # default=str: данные датчиков могут содержать нестандартные типы (например, Decimal)
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, SESSION_FILE)
+        print(f"Снимок сессии сохранен в '{SESSION_FILE}'.")
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Не удалось сохранить снимок сессии: {e}")
@@ -0,0 +1,169 @@
+import math
+
+from PySide6.QtCore import QEvent, QObject, QRect, QRectF, Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPixmap
+from PySide6.QtWidgets import (
+    QGraphicsBlurEffect, QGraphicsPixmapItem, QGraphicsScene, QWidget
+)
+
+
+class ShadowRenderer:
+    """
+    Готовит и кэширует размытые тени в виде 9-slice изображений.
+    Размытие выполняется один раз на пару (радиус, цвет); дальше тень любого размера
+    собирается из 9 фрагментов готового изображения без повторного размытия.
+    """
+    def __init__(self):
+        self._cache = {} # (радиус, rgba) -> (QPixmap, extent)
+
+    def nine_slice(self, blur_radius, color):
+        """
+        Возвращает исходное изображение тени для 9-slice отрисовки.
+        :param blur_radius: Радиус размытия (как у QGraphicsDropShadowEffect).
+        :param color: Цвет тени в формате (R, G, B, A).
+        :return: Кортеж (QPixmap, extent), где extent - на сколько пикселей тень выходит за виджет.
+        """
+        key = (blur_radius, tuple(color))
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._render(blur_radius, color)
+            self._cache[key] = cached
+        return cached
+
+    @staticmethod
+    def _render(blur_radius, color):
+        """Рисует непрозрачный прямоугольник и размывает его один раз."""
+        extent = max(1, int(math.ceil(blur_radius)))
+        # Сердцевина 2*extent+1: угловые фрагменты (2*extent) содержат весь спад тени,
+        # а однопиксельная середина растягивается вдоль сторон.
+        core = 2 * extent + 1
+        side = core + 2 * extent
+
+        source = QImage(side, side, QImage.Format.Format_ARGB32_Premultiplied)
+        source.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(source)
+        painter.fillRect(QRect(extent, extent, core, core), QColor(*color))
+        painter.end()
+
+        # Размываем тем же алгоритмом, что использует Qt для эффектов виджетов
+        scene = QGraphicsScene()
+        item = QGraphicsPixmapItem(QPixmap.fromImage(source))
+        blur = QGraphicsBlurEffect()
+        blur.setBlurRadius(blur_radius)
+        blur.setBlurHints(QGraphicsBlurEffect.BlurHint.QualityHint)
+        item.setGraphicsEffect(blur)
+        scene.addItem(item)
+        scene.setSceneRect(QRectF(0, 0, side, side))
+
+        blurred = QImage(side, side, QImage.Format.Format_ARGB32_Premultiplied)
+        blurred.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(blurred)
+        scene.render(painter, QRectF(0, 0, side, side), QRectF(0, 0, side, side))
+        painter.end()
+        return QPixmap.fromImage(blurred), extent
+
+    @staticmethod
+    def paint(painter, target_rect, pixmap, extent, fill_centre=True):
+        """
+        Рисует тень в target_rect, собирая ее из 9 фрагментов исходного изображения.
+        :param target_rect: Прямоугольник тени (виджет, расширенный на extent с каждой стороны).
+        :param fill_centre: Рисовать ли сплошную середину. Она целиком лежит под виджетом
+                            и видна только сквозь его прозрачные области.
+        """
+        corner = 2 * extent
+        src_side = pixmap.width() / pixmap.devicePixelRatio()
+        # Если виджет меньше исходной тени, углы уменьшаются пропорционально
+        corner_w = min(corner, target_rect.width() // 2)
+        corner_h = min(corner, target_rect.height() // 2)
+
+        src_x = (0, corner, src_side - corner, src_side)
+        src_y = src_x
+        dst_x = (target_rect.left(), target_rect.left() + corner_w,
+                 target_rect.left() + target_rect.width() - corner_w, target_rect.left() + target_rect.width())
+        dst_y = (target_rect.top(), target_rect.top() + corner_h,
+                 target_rect.top() + target_rect.height() - corner_h, target_rect.top() + target_rect.height())
+
+        for row in range(3):
+            for col in range(3):
+                if row == 1 and col == 1 and not fill_centre:
+                    continue
+                dst = QRectF(dst_x[col], dst_y[row], dst_x[col + 1] - dst_x[col], dst_y[row + 1] - dst_y[row])
+                if dst.width() <= 0 or dst.height() <= 0:
+                    continue
+                src = QRectF(src_x[col], src_y[row], src_x[col + 1] - src_x[col], src_y[row + 1] - src_y[row])
+                painter.drawPixmap(dst, pixmap, src)
+
+
+# Единственный экземпляр на процесс: тени одинаковых параметров размываются один раз
+shadow_renderer = ShadowRenderer()
+
+
+class ShadowOverlay(QWidget):
+    """
+    Легкий виджет, рисующий готовую тень под целевым виджетом.
+    Живет рядом с целевым виджетом (у того же родителя), находится под ним по Z-порядку
+    и повторяет его геометрию и видимость. В отличие от QGraphicsDropShadowEffect,
+    не требует offscreen-отрисовки целевого виджета на каждой перерисовке.
+    Тень строится по прямоугольнику виджета, поэтому цель должна быть непрозрачной.
+    """
+    def __init__(self, target, blur_radius, x_offset, y_offset, color):
+        super().__init__(target.parentWidget())
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self._target = target
+        self._offset = (x_offset, y_offset)
+        self._pixmap, self._extent = shadow_renderer.nine_slice(blur_radius, color)
+
+        self._tracker = _ShadowTracker(self)
+        target.installEventFilter(self._tracker)
+        target.destroyed.connect(self.deleteLater)
+        self.sync_with_target()
+
+    def sync_with_target(self):
+        """Повторяет геометрию, видимость и Z-порядок целевого виджета."""
+        target = self._target
+        extent = self._extent
+        x_offset, y_offset = self._offset
+        self.setGeometry(target.geometry().adjusted(-extent, -extent, extent, extent).translated(x_offset, y_offset))
+        self.setVisible(not target.isHidden())
+        self.stackUnder(target)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        # Середина закрыта непрозрачным виджетом - не рисуем ее
+        shadow_renderer.paint(painter, self.rect(), self._pixmap, self._extent, fill_centre=False)
+        painter.end()
+
+
+class _ShadowTracker(QObject):
+    """Фильтр событий целевого виджета, обновляющий его тень."""
+    _TRACKED_EVENTS = (QEvent.Type.Move, QEvent.Type.Resize, QEvent.Type.Show,
+                       QEvent.Type.Hide, QEvent.Type.ZOrderChange, QEvent.Type.ParentChange)
+
+    def __init__(self, overlay):
+        super().__init__(overlay)
+        self._overlay = overlay
+
+    def eventFilter(self, watched, event):
+        if event.type() in self._TRACKED_EVENTS:
+            if event.type() == QEvent.Type.ParentChange and watched.parentWidget() is not self._overlay.parentWidget():
+                self._overlay.setParent(watched.parentWidget())
+            self._overlay.sync_with_target()
+        return False
+
+
+def attach_pixmap_shadow(widget, blur_radius=25, x_offset=0, y_offset=0, color=(0, 0, 0, 160)):
+    """
+    Добавляет виджету тень, нарисованную из готового 9-slice изображения.
+    Повторный вызов для того же виджета ничего не делает.
+    :return: Созданный ShadowOverlay или None.
+    """
+    if widget is None or getattr(widget, "_shadow_overlay", None) is not None:
+        return None
+    if widget.parentWidget() is None:
+        # Тень рисуется на родителе, у окон верхнего уровня ее некуда положить
+        return None
+    overlay = ShadowOverlay(widget, blur_radius, x_offset, y_offset, color)
+    widget._shadow_overlay = overlay
+    return overlay
@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Модуль импортируется первым в main.py, поэтому PySide6 здесь подключается только лениво:
+# иначе время импорта самого PySide6 не попало бы в отчет.
+
+# Флаг командной строки, включающий профилирование запуска
+PROFILE_FLAG = "--profile-startup"
+# Файл с историей запусков (одна JSON-строка на запуск)
+HISTORY_FILE = os.path.join(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)), 'cache', 'startup_history.jsonl'
+)
+# Ширина диаграммы в символах
+WATERFALL_WIDTH = 40
+
+
+class StartupProfiler:
+    """
+    Замеряет фазы запуска приложения через time.perf_counter и строит отчет-водопад.
+    В выключенном состоянии phase() и mark() ничего не делают, поэтому разметку
+    фаз можно оставлять в коде постоянно.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self._phases = []  # Записи {'name', 'start', 'end', 'depth'} в порядке начала
+        self._depth = 0
+        self._finished = False
+        self._paint_filter = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Контекстный менеджер, замеряющий одну фазу запуска. Фазы могут быть вложенными.
+        :param name: Название фазы в отчете.
+        """
+        if not self.enabled or self._finished:
+            yield
+            return
+        entry = {'name': name, 'start': time.perf_counter(), 'end': None, 'depth': self._depth}
+        self._phases.append(entry)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            entry['end'] = time.perf_counter()
+
+    def mark(self, name):
+        """Отмечает мгновенное событие (например, первую отрисовку окна)."""
+        if not self.enabled or self._finished:
+            return
+        now = time.perf_counter()
+        self._phases.append({'name': name, 'start': now, 'end': now, 'depth': self._depth})
+
+    def watch_first_paint(self, widget):
+        """
+        Отмечает первую отрисовку окна и после нее завершает профилирование.
+        :param widget: Главное окно приложения.
+        """
+        if not self.enabled or self._finished:
+            return
+        from PySide6.QtCore import QEvent, QObject, QTimer
+
+        profiler = self
+
+        class _FirstPaintFilter(QObject):
+            def eventFilter(self, watched, event):
+                if event.type() == QEvent.Type.Paint:
+                    watched.removeEventFilter(self)
+                    profiler.mark("Первая отрисовка окна")
+                    # Отчет строим после завершения текущей отрисовки
+                    QTimer.singleShot(0, profiler.finish)
+                return False
+
+        self._paint_filter = _FirstPaintFilter(widget)
+        widget.installEventFilter(self._paint_filter)
+
+    def finish(self):
+        """Завершает профилирование, печатает отчет и дописывает его в историю."""
+        if not self.enabled or self._finished:
+            return
+        self._finished = True
+        total_ms = (time.perf_counter() - self.origin) * 1000
+        phases = [
+            {
+                'name': entry['name'],
+                'start_ms': round((entry['start'] - self.origin) * 1000, 2),
+                'duration_ms': round(((entry['end'] or entry['start']) - entry['start']) * 1000, 2),
+                'depth': entry['depth'],
+            }
+            for entry in self._phases
+        ]
+        previous = self._load_previous_run()
+        print(self.format_report(phases, total_ms, previous))
+        self._append_history(phases, total_ms)
+
+    @staticmethod
+    def format_report(phases, total_ms, previous=None):
+        """
+        Формирует текстовый отчет-водопад.
+        :param phases: Список фаз (словари с start_ms, duration_ms, depth, name).
+        :param total_ms: Общее время запуска.
+        :param previous: Предыдущий запуск из истории для сравнения (или None).
+        :return: Строка отчета.
+        """
+        # Одинаковые фазы (например, двойной опрос аудиоустройств) сопоставляем по порядку появления
+        previous_durations = {}
+        if previous:
+            seen = {}
+            for phase in previous.get('phases', []):
+                occurrence = seen.get(phase['name'], 0)
+                seen[phase['name']] = occurrence + 1
+                previous_durations[(phase['name'], occurrence)] = phase['duration_ms']
+
+        scale = WATERFALL_WIDTH / total_ms if total_ms > 0 else 0
+        lines = ["", "=" * 100, f"Профиль запуска: {total_ms:.1f} мс", "=" * 100,
+                 f"{'Старт, мс':>10} {'Длит., мс':>10} {'Δ, мс':>8}  {'Фаза':<38} Водопад"]
+        seen = {}
+        for phase in phases:
+            occurrence = seen.get(phase['name'], 0)
+            seen[phase['name']] = occurrence + 1
+            before = previous_durations.get((phase['name'], occurrence))
+            delta = f"{phase['duration_ms'] - before:+8.1f}" if before is not None else f"{'':>8}"
+
+            offset = min(int(phase['start_ms'] * scale), WATERFALL_WIDTH - 1)
+            length = int(round(phase['duration_ms'] * scale))
+            bar = "." * offset + "#" * max(1, min(length, WATERFALL_WIDTH - offset))
+            name = ("  " * phase['depth'] + phase['name'])[:38]
+            lines.append(f"{phase['start_ms']:>10.1f} {phase['duration_ms']:>10.1f} {delta}  {name:<38} {bar}")
+
+        if previous:
+            lines.append(f"Предыдущий запуск ({previous.get('timestamp', '?')}): "
+                         f"{previous.get('total_ms', 0):.1f} мс, разница {total_ms - previous.get('total_ms', 0):+.1f} мс")
+        lines.append("=" * 100)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _load_previous_run():
+        """Возвращает последний запуск из файла истории (или None)."""
+        try:
+            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+                lines = [line for line in f if line.strip()]
+            return json.loads(lines[-1]) if lines else None
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _append_history(phases, total_ms):
+        """Дописывает запуск в файл истории."""
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'total_ms': round(total_ms, 2),
+            'python': sys.version.split()[0],
+            'phases': phases,
+        }
+        try:
+            os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+            with open(HISTORY_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"Профиль запуска сохранен в '{HISTORY_FILE}'.")
+        except OSError as e:
+            print(f"Не удалось сохранить профиль запуска: {e}")
+
+
+# Единственный экземпляр на процесс; включается флагом --profile-startup
+profiler = StartupProfiler(enabled=PROFILE_FLAG in sys.argv)
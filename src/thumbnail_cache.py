@@ -0,0 +1,182 @@
+import hashlib
+import os
+import threading
+
+from PySide6.QtCore import QRunnable, QSize, QThreadPool, Qt
+from PySide6.QtGui import QImage, QImageReader
+
+from utils import PROJECT_ROOT
+
+# Папка дискового кэша миниатюр
+THUMBNAIL_DIR = os.path.join(PROJECT_ROOT, 'cache', 'thumbnails')
+# Стандартные размеры миниатюр (логические пиксели): главная сетка, крупные и мелкие кнопки редактора
+THUMBNAIL_SIZES = (150, 96, 64)
+
+
+def _pixel_size(size, device_pixel_ratio):
+    """Переводит логический размер в физические пиксели с учетом DPR."""
+    return max(1, int(round(size * device_pixel_ratio)))
+
+
+def decode_scaled(path, pixel_size):
+    """
+    Декодирует изображение сразу в уменьшенном виде через QImageReader.setScaledSize,
+    не распаковывая исходник в полном разрешении.
+    :param path: Путь к исходному изображению.
+    :param pixel_size: Сторона квадрата (физические пиксели), в который вписывается результат.
+    :return: QImage (пустой в случае ошибки).
+    """
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid() and not original.isEmpty():
+        target = original.scaled(QSize(pixel_size, pixel_size), Qt.AspectRatioMode.KeepAspectRatio)
+        # Растровые иконки не увеличиваем - это только добавило бы памяти без пользы
+        is_vector = bytes(reader.format()).lower() in (b"svg", b"svgz")
+        if not is_vector and target.width() > original.width():
+            target = original
+        reader.setScaledSize(target)
+    image = reader.read()
+    if image.isNull():
+        print(f"Не удалось декодировать изображение '{path}': {reader.errorString()}")
+    return image
+
+
+class ThumbnailWorker(QRunnable):
+    """
+    Рабочий поток, создающий все стандартные варианты миниатюр для одного изображения.
+    """
+    def __init__(self, cache, path, device_pixel_ratio):
+        super().__init__()
+        self.cache = cache
+        self.path = path
+        self.device_pixel_ratio = device_pixel_ratio
+
+    def run(self):
+        try:
+            for size in THUMBNAIL_SIZES:
+                self.cache.generate(self.path, size, self.device_pixel_ratio)
+        finally:
+            self.cache._on_worker_done(self.path, self.device_pixel_ratio)
+
+
+class ThumbnailCache:
+    """
+    Дисковый кэш уменьшенных копий иконок.
+    Миниатюры хранятся по хешу содержимого исходного файла, поэтому одинаковые
+    картинки по разным путям используют одни и те же файлы, а измененная картинка
+    автоматически получает новые миниатюры.
+    """
+    def __init__(self, cache_dir=THUMBNAIL_DIR, max_workers=2):
+        self.cache_dir = cache_dir
+        self.threadpool = QThreadPool()
+        self.threadpool.setMaxThreadCount(max_workers)
+        self._lock = threading.Lock()
+        self._digests = {}      # путь -> (размер, mtime, хеш содержимого)
+        self._in_flight = set() # (путь, dpr), для которых уже запущена генерация
+
+    def content_digest(self, path):
+        """
+        Возвращает хеш содержимого файла (с кэшированием по размеру и mtime).
+        :return: Строка хеша или None, если файл недоступен.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        try:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+        except OSError:
+            return None
+        with self._lock:
+            self._digests[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def thumbnail_path(self, digest, size, device_pixel_ratio):
+        """Путь к файлу миниатюры заданного размера и DPR."""
+        return os.path.join(self.cache_dir, f"{digest}_{size}@{device_pixel_ratio:g}x.png")
+
+    def generate(self, path, size, device_pixel_ratio):
+        """
+        Создает миниатюру на диске, если ее еще нет. Безопасно вызывать из рабочих потоков.
+        :return: Путь к миниатюре или None.
+        """
+        digest = self.content_digest(path)
+        if not digest:
+            return None
+        thumb_path = self.thumbnail_path(digest, size, device_pixel_ratio)
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        image = decode_scaled(path, _pixel_size(size, device_pixel_ratio))
+        if image.isNull():
+            return None
+        # Пишем во временный файл и атомарно переименовываем, чтобы не отдать недописанный PNG
+        tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            if image.save(tmp_path, "PNG"):
+                os.replace(tmp_path, thumb_path)
+                return thumb_path
+            print(f"Не удалось сохранить миниатюру для '{path}'.")
+        except OSError as e:
+            print(f"Не удалось сохранить миниатюру для '{path}': {e}")
+        # Недописанный временный файл не должен оставаться в кэше
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return None
+
+    def request(self, paths, device_pixel_ratio=1.0):
+        """
+        Ставит в фоновую очередь генерацию всех стандартных миниатюр для списка изображений.
+        :param paths: Абсолютные пути к исходным изображениям.
+        """
+        for path in paths:
+            key = (path, device_pixel_ratio)
+            with self._lock:
+                if not path or key in self._in_flight:
+                    continue
+                self._in_flight.add(key)
+            self.threadpool.start(ThumbnailWorker(self, path, device_pixel_ratio))
+
+    def load_image(self, path, size, device_pixel_ratio=1.0):
+        """
+        Возвращает изображение для иконки размером size (логические пиксели).
+        Если подходящая миниатюра уже есть на диске, читается она; иначе исходник
+        декодируется сразу в уменьшенном виде, а миниатюры создаются в фоне.
+        :return: QImage (пустой, если изображение не удалось прочитать).
+        """
+        pixel_size = _pixel_size(size, device_pixel_ratio)
+        # Ищем наименьший стандартный размер, не меньший запрошенного
+        variant = next((s for s in sorted(THUMBNAIL_SIZES) if s >= size), None)
+        if variant is not None:
+            digest = self.content_digest(path)
+            thumb_path = self.thumbnail_path(digest, variant, device_pixel_ratio) if digest else None
+            if thumb_path and os.path.exists(thumb_path):
+                image = QImage(thumb_path)
+                if not image.isNull():
+                    if max(image.width(), image.height()) > pixel_size:
+                        image = image.scaled(
+                            pixel_size, pixel_size,
+                            Qt.AspectRatioMode.KeepAspectRatio,
+                            Qt.TransformationMode.SmoothTransformation
+                        )
+                    return image
+            self.request([path], device_pixel_ratio)
+        return decode_scaled(path, pixel_size)
+
+    def _on_worker_done(self, path, device_pixel_ratio):
+        """Снимает отметку о выполняющейся генерации."""
+        with self._lock:
+            self._in_flight.discard((path, device_pixel_ratio))
+
+
+# Единственный экземпляр на процесс
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,250 @@
+import time
+from collections import deque
+
+from PySide6.QtCore import QEvent, QObject, QTimer, Signal
+from PySide6.QtWidgets import QToolButton
+
+import constants
+from action_executor import LatencyStats, TRACE_LATENCY
+
+# Смещение пальца (px), после которого касание уже не считается нажатием на месте
+TOUCH_SLOP_PX = 24
+# Свайп должен уложиться в это время
+SWIPE_MAX_MS = 600
+# Клик мыши по кнопке в течение этого времени после касания считается синтезированным из касания
+DUPLICATE_CLICK_WINDOW_MS = 700
+# Сколько последних трасс нажатий хранить
+TRACE_HISTORY = 200
+
+
+class TouchDispatcher(QObject):
+    """
+    Конвейер сенсорного ввода для страниц кнопок.
+    Одно касание запускает действие ровно один раз: в момент отпускания ("release",
+    по умолчанию) или касания ("press"), а клик мыши, синтезированный системой из того же
+    касания, отбрасывается (см. is_duplicate_click). Также распознаются долгое
+    нажатие и горизонтальный свайп. В режиме "press" действие запускается раньше, чем
+    жест можно распознать: свайп начинается только с промежутков между кнопками,
+    а долгое нажатие не срабатывает никогда. Для каждого нажатия записывается трасса:
+    задержка от получения касания до передачи действия и до фактического начала
+    его выполнения.
+    """
+    long_pressed = Signal(object) # QToolButton
+    swiped = Signal(int)          # 1 - свайп влево (следующая страница), -1 - вправо
+    tap_traced = Signal(dict)     # Трасса нажатия (см. _finish_trace)
+
+    def __init__(self, window, area_widget, dispatch, parent=None):
+        """
+        :param window: Виджет, получающий события касания (главное окно).
+        :param area_widget: Область страниц кнопок; касания вне нее не обрабатываются.
+        :param dispatch: Функция (кнопка) -> ключ запущенного действия (или None).
+        """
+        super().__init__(parent)
+        self.window = window
+        self.area_widget = area_widget
+        self._dispatch = dispatch
+        self.mode = constants.DEFAULT_TOUCH_DISPATCH
+        self.long_press_ms = constants.DEFAULT_LONG_PRESS_MS
+        self.swipe_min_px = constants.DEFAULT_SWIPE_MIN_PX
+
+        # Задержка от касания до начала выполнения действия
+        self.latency = LatencyStats()
+        self.traces = deque(maxlen=TRACE_HISTORY)
+        self._pending_traces = {} # ключ действия -> трасса, ждущая начала выполнения
+        self._dispatching = None  # трасса действия, передаваемого прямо сейчас
+
+        self._touch = None        # Текущее касание
+        self._last_touch = None   # (кнопка, время окончания касания)
+
+        self._long_press_timer = QTimer(self)
+        self._long_press_timer.setSingleShot(True)
+        self._long_press_timer.timeout.connect(self._on_long_press)
+
+    def configure(self, ui_settings):
+        """Читает настройки касаний из секции ui_settings конфига."""
+        mode = ui_settings.get(constants.KEY_TOUCH_DISPATCH, constants.DEFAULT_TOUCH_DISPATCH)
+        self.mode = mode if mode in (constants.TOUCH_DISPATCH_PRESS, constants.TOUCH_DISPATCH_RELEASE) \
+            else constants.DEFAULT_TOUCH_DISPATCH
+        self.long_press_ms = max(100, int(ui_settings.get(constants.KEY_LONG_PRESS_MS, constants.DEFAULT_LONG_PRESS_MS)))
+        self.swipe_min_px = max(TOUCH_SLOP_PX, int(ui_settings.get(constants.KEY_SWIPE_MIN_PX, constants.DEFAULT_SWIPE_MIN_PX)))
+
+    # --- События касания ---
+
+    def handle_event(self, event):
+        """
+        Обрабатывает событие главного окна.
+        :return: True, если событие поглощено конвейером.
+        """
+        event_type = event.type()
+        if event_type == QEvent.Type.TouchBegin:
+            return self._on_begin(event)
+        if self._touch is None:
+            return False
+        if event_type == QEvent.Type.TouchUpdate:
+            self._on_update(event)
+        elif event_type == QEvent.Type.TouchEnd:
+            self._on_end(event)
+        elif event_type == QEvent.Type.TouchCancel:
+            self._reset()
+        else:
+            return False
+        return True
+
+    def _point(self, event):
+        """Точка текущего касания (первый палец) или None."""
+        for point in event.points():
+            if point.id() == self._touch['id']:
+                return point
+        return None
+
+    def _on_begin(self, event):
+        if not event.points():
+            return False
+        point = event.points()[0]
+        pos = point.position().toPoint()
+        # Касания вне страниц кнопок (вкладки, ползунки) оставляем Qt - он синтезирует для них мышь
+        if not self.area_widget.rect().contains(self.area_widget.mapFrom(self.window, pos)):
+            return False
+
+        widget = self.window.childAt(pos)
+        button = widget if isinstance(widget, QToolButton) and "ToolButton" in widget.objectName() else None
+        self._touch = {
+            'id': point.id(),
+            'start': pos,
+            'received': time.perf_counter(),
+            'button': button,
+            'moved': False,
+            'long': False,
+            'dispatched': False,
+        }
+        if button is not None:
+            if self.mode == constants.TOUCH_DISPATCH_PRESS:
+                self._dispatch_tap(button, constants.TOUCH_DISPATCH_PRESS)
+            else:
+                # Долгое нажатие различимо только в режиме "release": в режиме "press" действие уже запущено
+                self._long_press_timer.start(self.long_press_ms)
+        return True
+
+    def _on_update(self, event):
+        point = self._point(event)
+        if point is None or self._touch['moved']:
+            return
+        delta = point.position().toPoint() - self._touch['start']
+        if delta.manhattanLength() > TOUCH_SLOP_PX:
+            self._touch['moved'] = True
+            self._long_press_timer.stop()
+
+    def _on_end(self, event):
+        touch = self._touch
+        self._long_press_timer.stop()
+        point = self._point(event)
+        pos = point.position().toPoint() if point is not None else touch['start']
+        dx = pos.x() - touch['start'].x()
+        dy = pos.y() - touch['start'].y()
+        elapsed_ms = (time.perf_counter() - touch['received']) * 1000
+        button = touch['button']
+
+        if (not touch['dispatched'] and abs(dx) >= self.swipe_min_px and abs(dx) > 2 * abs(dy)
+                and elapsed_ms <= SWIPE_MAX_MS):
+            self.swiped.emit(1 if dx < 0 else -1)
+        elif (self.mode == constants.TOUCH_DISPATCH_RELEASE and button is not None
+              and not touch['dispatched'] and not touch['long'] and not touch['moved']
+              and self.window.childAt(pos) is button):
+            self._dispatch_tap(button, constants.TOUCH_DISPATCH_RELEASE)
+        self._reset()
+
+    def _on_long_press(self):
+        touch = self._touch
+        if touch is None or touch['moved'] or touch['dispatched'] or touch['button'] is None:
+            return
+        touch['long'] = True
+        self.long_pressed.emit(touch['button'])
+
+    def _reset(self):
+        self._long_press_timer.stop()
+        if self._touch is not None and self._touch['button'] is not None:
+            self._last_touch = (self._touch['button'], time.perf_counter())
+        self._touch = None
+
+    # --- Защита от двойного срабатывания ---
+
+    def is_duplicate_click(self, button):
+        """
+        Проверяет, не синтезирован ли клик мыши по кнопке из касания,
+        которое конвейер уже обработал (или намеренно не стал запускать).
+        """
+        if getattr(button, "_tap_synthesized", False):
+            button._tap_synthesized = False
+            return True
+        if self._touch is not None and self._touch['button'] is button:
+            return True
+        if self._last_touch is not None and self._last_touch[0] is button:
+            return (time.perf_counter() - self._last_touch[1]) * 1000 < DUPLICATE_CLICK_WINDOW_MS
+        return False
+
+    # --- Запуск действия и трассировка ---
+
+    def _dispatch_tap(self, button, phase):
+        touch = self._touch
+        touch['dispatched'] = True
+        received = touch['received']
+        button._tap_time = received # Для общей статистики задержки ActionHandler
+
+        trace = {
+            'button': button.objectName(),
+            'phase': phase,
+            'received': received,
+            'dispatch_ms': None,
+            'action_start_ms': None,
+        }
+        # Действия, выполняемые в GUI-потоке, сообщают о начале прямо во время вызова
+        self._dispatching = trace
+        try:
+            key = self._dispatch(button)
+        finally:
+            self._dispatching = None
+        trace['dispatch_ms'] = (time.perf_counter() - received) * 1000
+
+        if trace['action_start_ms'] is not None or key is None:
+            self._finish_trace(trace)
+        else:
+            self._pending_traces[key] = trace
+
+    def on_action_running(self, key, started_at):
+        """
+        Слот: действие начало выполняться.
+        :param key: Номер задачи ActionExecutor или ключ запуска макроса.
+        :param started_at: Момент начала (time.perf_counter).
+        """
+        trace = self._dispatching or self._pending_traces.pop(key, None)
+        if trace is None:
+            return
+        trace['action_start_ms'] = (started_at - trace['received']) * 1000
+        if trace is not self._dispatching:
+            self._finish_trace(trace)
+
+    def on_action_dropped(self, key):
+        """Слот: действие отменено или завершилось ошибкой до начала выполнения."""
+        trace = self._pending_traces.pop(key, None)
+        if trace is not None:
+            self._finish_trace(trace)
+
+    def drop_pending_traces(self):
+        """Завершает трассы, ждущие начала действий (исполнители действий остановлены)."""
+        traces = list(self._pending_traces.values())
+        self._pending_traces.clear()
+        for trace in traces:
+            self._finish_trace(trace)
+
+    def _finish_trace(self, trace):
+        trace = dict(trace)
+        del trace['received']
+        self.traces.append(trace)
+        measured = trace['action_start_ms'] if trace['action_start_ms'] is not None else trace['dispatch_ms']
+        self.latency.record(measured)
+        self.tap_traced.emit(trace)
+        if not TRACE_LATENCY:
+            return
+        start_text = f"{trace['action_start_ms']:.2f} мс" if trace['action_start_ms'] is not None else "-"
+        print(f"Касание {trace['button']} ({trace['phase']}): передано за {trace['dispatch_ms']:.2f} мс, "
+              f"начало действия через {start_text}")
@@ -0,0 +1,92 @@
+import os
+import sys
+import types
+import xml.etree.ElementTree as ET
+
+
+class RuntimeUiForm:
+    """
+    Замена сгенерированного pyside6-uic класса Ui_*, загружающая форму из .ui
+    во время выполнения через QUiLoader. Используется, только если модуль ui_*.py
+    устарел, а скомпилировать его не удалось.
+    Как и сгенерированный класс, после setupUi() хранит именованные виджеты в атрибутах.
+    """
+    ui_path = None
+
+    def setupUi(self, target):
+        from PySide6.QtCore import QFile, QIODevice, QMetaObject, QObject
+        from PySide6.QtUiTools import QUiLoader
+        from PySide6.QtWidgets import QMainWindow, QMenuBar, QStatusBar, QVBoxLayout
+
+        ui_file = QFile(self.ui_path)
+        if not ui_file.open(QIODevice.OpenModeFlag.ReadOnly):
+            raise RuntimeError(f"Не удалось открыть '{self.ui_path}': {ui_file.errorString()}")
+        loader = QUiLoader()
+        loaded = loader.load(ui_file)
+        ui_file.close()
+        if loaded is None:
+            raise RuntimeError(f"Не удалось загрузить '{self.ui_path}': {loader.errorString()}")
+
+        # Собираем именованные объекты до переноса виджетов в целевое окно
+        named_objects = [obj for obj in loaded.findChildren(QObject) if obj.objectName()]
+
+        if isinstance(target, QMainWindow) and isinstance(loaded, QMainWindow):
+            target.setCentralWidget(loaded.takeCentralWidget())
+            menu_bar = None
+            for child in loaded.children():
+                if isinstance(child, QMenuBar):
+                    menu_bar = child
+                elif isinstance(child, QStatusBar):
+                    target.setStatusBar(child)
+            if menu_bar is not None:
+                target.setMenuBar(menu_bar)
+            loaded.deleteLater()
+        else:
+            # Для QWidget/QDialog встраиваем загруженную форму целиком
+            layout = QVBoxLayout(target)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.addWidget(loaded)
+            self._runtime_root = loaded
+
+        if not target.objectName():
+            target.setObjectName(loaded.objectName())
+        target.setWindowTitle(loaded.windowTitle())
+        target.resize(loaded.size())
+        target.setMinimumSize(loaded.minimumSize())
+        target.setMaximumSize(loaded.maximumSize())
+
+        for obj in named_objects:
+            if not hasattr(self, obj.objectName()):
+                setattr(self, obj.objectName(), obj)
+
+        QMetaObject.connectSlotsByName(target)
+
+    def retranslateUi(self, target):
+        """Тексты уже загружены из .ui - ничего не делаем."""
+
+
+def install_runtime_ui_module(ui_path):
+    """
+    Регистрирует в sys.modules модуль ui_<имя>, класс Ui_<класс формы> которого
+    загружает .ui во время выполнения. Последующий 'from ui_<имя> import Ui_...'
+    получит его вместо устаревшего сгенерированного файла.
+    :param ui_path: Путь к .ui файлу.
+    :return: Имя зарегистрированного модуля или None при ошибке.
+    """
+    try:
+        form_class = ET.parse(ui_path).getroot().findtext('class')
+    except (ET.ParseError, OSError) as e:
+        print(f"Ошибка при разборе файла '{ui_path}': {e}")
+        return None
+    if not form_class:
+        print(f"В файле '{ui_path}' не найден элемент <class>.")
+        return None
+
+    module_name = f"ui_{os.path.splitext(os.path.basename(ui_path))[0]}"
+    class_name = f"Ui_{form_class}"
+    module = types.ModuleType(module_name)
+    module.__file__ = ui_path
+    setattr(module, class_name, type(class_name, (RuntimeUiForm,), {'ui_path': os.path.abspath(ui_path)}))
+    sys.modules[module_name] = module
+    print(f"Модуль '{module_name}' будет загружен из '{ui_path}' во время выполнения (QUiLoader).")
+    return module_name
@@ -1,4 +1,6 @@
 # utils.py
+import hashlib
+import json
 import os
 import subprocess
 import sys
@@ -6,10 +8,28 @@ import xml.etree.ElementTree as ET
 
 from PySide6.QtWidgets import QGraphicsDropShadowEffect
 from PySide6.QtGui import QColor
+from PySide6.QtCore import QResource
 
 # Глобальная переменная для хранения корневого пути проекта
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 
+# Исходник ресурсов Qt (системные иконки) и его бинарная сборка
+ICONS_QRC_FILE = os.path.join('resources', 'icons', 'icons.qrc')
+ICONS_RCC_FILE = os.path.join('cache', 'icons.rcc')
+
+# Манифест компиляции .ui -> ui_*.py (хеши содержимого .ui)
+UI_MANIFEST_FILE = os.path.join('cache', 'ui_manifest.json')
+UI_MANIFEST_FORMAT = 1
+# Флаг командной строки production-режима: .ui и ресурсы не проверяются при запуске
+PRODUCTION_FLAG = "--production"
+
+# Режимы отрисовки теней (ключ "shadow_mode" в секции "ui_settings" config.json)
+SHADOW_MODE_EFFECT = "effect"   # QGraphicsDropShadowEffect на каждом виджете
+SHADOW_MODE_PIXMAP = "pixmap"   # Готовая 9-slice тень, размытая один раз
+SHADOW_MODE_OFF = "off"         # Без теней
+SHADOW_MODES = (SHADOW_MODE_EFFECT, SHADOW_MODE_PIXMAP, SHADOW_MODE_OFF)
+_shadow_mode = SHADOW_MODE_EFFECT
+
 def resource_path(relative_path):
     """
     Возвращает абсолютный путь к ресурсу, работая как из исходников,
@@ -24,15 +44,38 @@ def resource_path(relative_path):
     
     return os.path.join(base_path, relative_path)
 
-def apply_shadow(widget, blur_radius=25, x_offset=0, y_offset=0, color=(0, 0, 0, 160)):
+def set_shadow_mode(mode):
+    """
+    Устанавливает способ отрисовки теней для всех последующих вызовов apply_shadow.
+    :param mode: Один из SHADOW_MODES. Неизвестное значение заменяется на SHADOW_MODE_EFFECT.
+    """
+    global _shadow_mode
+    if mode not in SHADOW_MODES:
+        print(f"Неизвестный режим теней '{mode}'. Используется '{SHADOW_MODE_EFFECT}'.")
+        mode = SHADOW_MODE_EFFECT
+    _shadow_mode = mode
+
+def apply_shadow(widget, blur_radius=25, x_offset=0, y_offset=0, color=(0, 0, 0, 160), opaque=True, anchor=None):
     """
     Применяет стандартизированный эффект тени к виджету.
+    Способ отрисовки зависит от текущего режима (см. set_shadow_mode).
     :param widget: Виджет, к которому применяется тень.
     :param blur_radius: Радиус размытия тени.
     :param x_offset: Смещение тени по оси X.
     :param y_offset: Смещение тени по оси Y.
     :param color: Цвет тени в формате (R, G, B, A).
+    :param opaque: Виджет целиком закрашен фоном. QGraphicsDropShadowEffect повторяет только
+                   нарисованные пиксели (текст, иконки), поэтому для прозрачных виджетов
+                   эффект используется и в режиме pixmap.
+    :param anchor: Непрозрачный дочерний виджет, под которым в режиме pixmap рисуется тень
+                   (например, внутренний фрейм страницы с прозрачными полями).
     """
+    if _shadow_mode == SHADOW_MODE_OFF:
+        return
+    if _shadow_mode == SHADOW_MODE_PIXMAP and (opaque or anchor is not None):
+        from shadow_renderer import attach_pixmap_shadow
+        attach_pixmap_shadow(anchor if anchor is not None else widget, blur_radius, x_offset, y_offset, color)
+        return
     if widget and not widget.graphicsEffect():
         shadow = QGraphicsDropShadowEffect(widget)
         shadow.setBlurRadius(blur_radius)
@@ -60,63 +103,223 @@ def get_window_title_from_ui(ui_path):
         print(f"Ошибка при парсинге файла '{ui_path}': {e}")
     return None
 
+def _file_sha1(path):
+    """Возвращает SHA-1 содержимого файла (или None, если файл недоступен)."""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def _load_ui_manifest(manifest_path):
+    """Читает манифест компиляции .ui; при ошибке или другом формате возвращает пустой."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') == UI_MANIFEST_FORMAT:
+            return manifest
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {'format': UI_MANIFEST_FORMAT, 'dirs': {}, 'files': {}}
+
+def _save_ui_manifest(manifest_path, manifest):
+    """Атомарно сохраняет манифест компиляции .ui."""
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        tmp_path = manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, manifest_path)
+    except OSError as e:
+        print(f"Не удалось сохранить манифест UI '{manifest_path}': {e}")
+
+def _scan_ui_dirs(ui_dir):
+    """
+    Обходит директорию с .ui файлами.
+    :return: Кортеж (mtime_ns каждой поддиректории, список относительных путей .ui).
+    """
+    dirs, ui_files = {}, []
+    for root, _, files in os.walk(ui_dir):
+        dirs[os.path.relpath(root, ui_dir)] = os.stat(root).st_mtime_ns
+        ui_files.extend(
+            os.path.relpath(os.path.join(root, name), ui_dir) for name in files if name.endswith(".ui")
+        )
+    return dirs, sorted(ui_files)
+
+def _dirs_unchanged(ui_dir, dirs):
+    """Проверяет, что ни в одной из известных директорий не добавлялись и не удалялись файлы."""
+    if not dirs:
+        return False
+    try:
+        return all(os.stat(os.path.join(ui_dir, rel)).st_mtime_ns == mtime for rel, mtime in dirs.items())
+    except OSError:
+        return False
+
+def _run_uic(ui_path, py_path):
+    """
+    Компилирует .ui в .py командой pyside6-uic.
+    :return: True, если компиляция прошла успешно.
+    """
+    print(f"Компиляция '{ui_path}' -> '{py_path}'...")
+    try:
+        subprocess.run(
+            ['pyside6-uic', ui_path, '-o', py_path],
+            check=True,
+            capture_output=True, # Hide verbose output unless there's an error
+            text=True
+        )
+        print("Компиляция прошла успешно.")
+        return True
+    except FileNotFoundError:
+        print("ОШИБКА: Команда 'pyside6-uic' не найдена (pip install pyside6-tools).")
+    except subprocess.CalledProcessError as e:
+        print(f"ОШИБКА: Не удалось скомпилировать '{ui_path}'.\nДетали:\n{e.stderr}")
+    return False
+
+def is_production_mode():
+    """Собранное приложение или запуск с флагом --production: .ui не проверяются."""
+    return getattr(sys, 'frozen', False) or PRODUCTION_FLAG in sys.argv
+
 def compile_ui_files_recursively(ui_dir, output_dir):
     """
-    Рекурсивно находит и компилирует все .ui файлы в .py,
-    из директории ui_dir в директорию output_dir.
-    Перекомпилирует, только если .py файл отсутствует или .ui файл новее.
+    Поддерживает модули ui_*.py в актуальном состоянии по манифесту cache/ui_manifest.json.
+    Манифест читается один раз и хранит для каждого .ui размер, mtime и хеш содержимого,
+    а также mtime директорий. Полный обход выполняется, только если в директориях
+    добавились или удалились файлы; у неизменившихся .ui проверяется только stat,
+    а хеш считается лишь при изменении stat (например, после git checkout).
+    В production-режиме проверка не выполняется вовсе.
+    Если модуль устарел и скомпилировать его не удалось, форма будет загружена
+    во время выполнения через QUiLoader (см. ui_runtime).
     """
+    if is_production_mode():
+        return
     if not os.path.isdir(ui_dir):
         print(f"ОШИБКА: Директория с UI-файлами не найдена: {ui_dir}")
         return
     if not os.path.isdir(output_dir):
         print(f"ОШИБКА: Директория для скомпилированных файлов не найдена: {output_dir}")
         return
-        
-    for root, _, files in os.walk(ui_dir):
-        for ui_file in files:
-            if not ui_file.endswith(".ui"):
-                continue
-
-            ui_path = os.path.join(root, ui_file)
-            
-            # Generate the name for the .py file (e.g., widget.ui -> ui_widget.py)
-            base_name = os.path.splitext(ui_file)[0]
-            py_file_name = f"ui_{base_name}.py"
-            # Сохраняем .py файл в корневой директории вывода
-            py_path = os.path.join(output_dir, py_file_name)
-
-            # Recompile if .py file is missing or .ui is newer
-            recompile = False
-            if not os.path.exists(py_path):
-                recompile = True
-                print(f"Файл '{py_path}' не найден. Требуется компиляция.")
-            elif os.path.getmtime(ui_path) > os.path.getmtime(py_path):
-                recompile = True
-                print(f"Изменения в '{ui_path}'. Требуется перекомпиляция.")
-
-            if recompile:
-                print(f"Компиляция '{ui_path}' -> '{py_path}'...")
-                try:
-                    # Using check=True to raise an exception on error
-                    subprocess.run(
-                        ['pyside6-uic', ui_path, '-o', py_path], 
-                        check=True,
-                        capture_output=True, # Hide verbose output unless there's an error
-                        text=True
-                    )
-                    print("Компиляция прошла успешно.")
-                except FileNotFoundError:
-                    print("\n" + "="*50)
-                    print("ОШИБКА: Команда 'pyside6-uic' не найдена.")
-                    print("Пожалуйста, убедитесь, что 'pyside6-tools' установлен.")
-                    print("Вы можете установить его командой: pip install pyside6-tools")
-                    print("="*50)
-                    sys.exit(1)
-                except subprocess.CalledProcessError as e:
-                    print(f"\n" + "="*50)
-                    print(f"ОШИБКА: Не удалось скомпилировать '{ui_path}'.")
-                    print(f"Детали:\n{e.stderr}")
-                    print("="*50)
-                    # We exit here because a failed UI compile is a critical error
-                    sys.exit(1)
+
+    manifest_path = os.path.join(PROJECT_ROOT, UI_MANIFEST_FILE)
+    manifest = _load_ui_manifest(manifest_path)
+    files = manifest['files']
+    changed = False
+
+    if _dirs_unchanged(ui_dir, manifest['dirs']):
+        ui_files = list(files)
+    else:
+        manifest['dirs'], ui_files = _scan_ui_dirs(ui_dir)
+        for stale in set(files) - set(ui_files):
+            del files[stale]
+        changed = True
+
+    for rel_path in ui_files:
+        ui_path = os.path.join(ui_dir, rel_path)
+        # Generate the name for the .py file (e.g., widget.ui -> ui_widget.py)
+        base_name = os.path.splitext(os.path.basename(rel_path))[0]
+        py_path = os.path.join(output_dir, f"ui_{base_name}.py")
+        try:
+            stat = os.stat(ui_path)
+        except OSError:
+            files.pop(rel_path, None)
+            manifest['dirs'] = {}
+            changed = True
+            continue
+
+        entry = files.get(rel_path)
+        py_exists = os.path.exists(py_path)
+        if (entry and entry['sha1'] and py_exists
+                and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns):
+            continue
+
+        digest = _file_sha1(ui_path)
+        up_to_date = py_exists and (
+            # Содержимое не менялось, изменился только stat
+            (entry and entry['sha1'] and entry['sha1'] == digest)
+            # Первый запуск без манифеста: доверяем .py, который новее .ui
+            or (not entry and os.path.getmtime(py_path) >= stat.st_mtime)
+        )
+        if not up_to_date:
+            print(f"Изменения в '{ui_path}'. Требуется перекомпиляция.")
+            if not _run_uic(ui_path, py_path):
+                from ui_runtime import install_runtime_ui_module
+                install_runtime_ui_module(ui_path)
+                # Запись без хеша: при следующем запуске компиляция будет повторена
+                digest = None
+
+        files[rel_path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest,
+                           'py': os.path.relpath(py_path, PROJECT_ROOT)}
+        changed = True
+
+    if changed:
+        _save_ui_manifest(manifest_path, manifest)
+
+
+def _qrc_is_newer(qrc_path, rcc_path):
+    """
+    Проверяет, нужно ли пересобрать .rcc: он отсутствует или старше .qrc
+    либо любого из перечисленных в нем файлов.
+    """
+    if not os.path.exists(rcc_path):
+        return True
+    rcc_mtime = os.path.getmtime(rcc_path)
+    if os.path.getmtime(qrc_path) > rcc_mtime:
+        return True
+    qrc_dir = os.path.dirname(qrc_path)
+    try:
+        tree = ET.parse(qrc_path)
+    except ET.ParseError:
+        return True
+    for file_element in tree.getroot().iter('file'):
+        file_path = os.path.join(qrc_dir, file_element.text or "")
+        if os.path.exists(file_path) and os.path.getmtime(file_path) > rcc_mtime:
+            return True
+    return False
+
+def _build_icons_rcc(qrc_path, rcc_path):
+    """
+    Собирает бинарный файл ресурсов командой 'pyside6-rcc --binary'.
+    :return: True, если сборка прошла успешно.
+    """
+    os.makedirs(os.path.dirname(rcc_path), exist_ok=True)
+    tmp_path = rcc_path + ".tmp"
+    print(f"Сборка ресурсов '{qrc_path}' -> '{rcc_path}'...")
+    try:
+        subprocess.run(
+            ['pyside6-rcc', '--binary', qrc_path, '-o', tmp_path],
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        os.replace(tmp_path, rcc_path)
+        return True
+    except FileNotFoundError:
+        print("Команда 'pyside6-rcc' не найдена. Используется icons_rc.py.")
+    except subprocess.CalledProcessError as e:
+        print(f"ОШИБКА: Не удалось собрать ресурсы.\nДетали:\n{e.stderr}")
+    except OSError as e:
+        print(f"ОШИБКА: Не удалось сохранить '{rcc_path}': {e}")
+    return False
+
+def register_icon_resources():
+    """
+    Регистрирует системные иконки (префикс ':/icons') из бинарного файла .rcc.
+    Qt отображает .rcc в память напрямую, поэтому не нужно импортировать огромный
+    модуль icons_rc.py и держать его данные как объект bytes. При запуске из исходников
+    .rcc пересобирается, если icons.qrc или иконки изменились. Если .rcc недоступен,
+    используется прежний модуль icons_rc.
+    :return: True, если ресурсы зарегистрированы из .rcc.
+    """
+    qrc_path = os.path.join(PROJECT_ROOT, ICONS_QRC_FILE)
+    rcc_path = resource_path(ICONS_RCC_FILE)
+
+    # В собранном приложении и production-режиме ничего не компилируем - используем то, что было упаковано
+    if not is_production_mode() and os.path.exists(qrc_path) and _qrc_is_newer(qrc_path, rcc_path):
+        _build_icons_rcc(qrc_path, rcc_path)
+
+    if os.path.exists(rcc_path) and QResource.registerResource(rcc_path):
+        return True
+
+    print("Не удалось загрузить icons.rcc. Используется модуль icons_rc.")
+    import icons_rc  # noqa: F401 - регистрирует ресурсы при импорте
+    return False
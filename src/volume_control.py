@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+
+from action_executor import com_apartment
+
+# Шаг плавного изменения громкости
+RAMP_STEP_MS = 10
+# Скорость изменения: доля полной громкости в секунду (10% проходятся за 50 мс)
+RAMP_SPEED_PER_S = 2.0
+
+
+def _clamp(level):
+    return min(1.0, max(0.0, level))
+
+
+class VolumeRamper:
+    """
+    Управляет общей громкостью устройства вывода по умолчанию из собственного потока.
+    Интерфейс громкости устройства получается один раз и переиспользуется, пока не сменится
+    устройство по умолчанию (по данным AudioDeviceRegistry). Нажатия не ждут COM: они лишь
+    сдвигают целевое значение, а поток плавно ведет громкость к нему. Серия быстрых нажатий
+    сливается в одно целевое значение и никогда не копится в очереди.
+    """
+    def __init__(self, registry):
+        """
+        :param registry: AudioDeviceRegistry - источник устройства по умолчанию и бэкенда.
+        """
+        self.registry = registry
+        self._cond = threading.Condition()
+        self._target = None        # Целевой уровень текущей серии (0.0-1.0) или None
+        self._pending_delta = 0.0  # Сдвиги, еще не примененные к цели
+        self._level = None         # Последний известный уровень
+        self._stopping = False
+        self._thread = None
+        # Используются только потоком громкости
+        self._volume = None
+        self._volume_device_id = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="volume-ramper", daemon=True)
+            self._thread.start()
+
+    def nudge(self, delta_percent):
+        """
+        Сдвигает громкость на delta_percent процентов, не дожидаясь применения.
+        :return: Ожидаемый итоговый уровень в процентах или None, если текущий уровень еще неизвестен.
+        """
+        with self._cond:
+            self._pending_delta += delta_percent / 100
+            base = self._target if self._target is not None else self._level
+            self._ensure_thread()
+            self._cond.notify()
+            if base is None:
+                return None
+            return int(round(_clamp(base + self._pending_delta) * 100))
+
+    def set_percent(self, percent):
+        """Плавно устанавливает громкость в percent процентов."""
+        with self._cond:
+            self._target = _clamp(percent / 100)
+            self._pending_delta = 0.0
+            self._ensure_thread()
+            self._cond.notify()
+
+    def shutdown(self, wait_s=1.0):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(wait_s)
+
+    # --- Поток громкости ---
+
+    def _run(self):
+        # COM инициализируется на все время жизни потока: закэшированный интерфейс живет в нем
+        with com_apartment():
+            while True:
+                with self._cond:
+                    while not self._stopping and self._target is None and not self._pending_delta:
+                        self._cond.wait()
+                    if self._stopping:
+                        break
+                try:
+                    self._ramp(self._endpoint())
+                except Exception as e:
+                    print(f"Ошибка при изменении громкости: {e}")
+                    with self._cond:
+                        self._target = None
+                        self._pending_delta = 0.0
+                    self._volume = None
+            self._volume = None
+
+    def _endpoint(self):
+        """Интерфейс громкости устройства по умолчанию; получается заново только после смены устройства."""
+        device_id = self.registry.default_id()
+        if self._volume is None or device_id != self._volume_device_id:
+            self._volume = self.registry.backend.activate_volume(device_id)
+            self._volume_device_id = device_id
+        return self._volume
+
+    def _ramp(self, volume):
+        # Уровень читается в начале серии, поэтому изменения из микшера Windows учитываются
+        level = volume.get_level()
+        step = RAMP_SPEED_PER_S * RAMP_STEP_MS / 1000
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                if self._pending_delta:
+                    base = self._target if self._target is not None else level
+                    self._target = _clamp(base + self._pending_delta)
+                    self._pending_delta = 0.0
+                target = self._target
+                if target is None or abs(target - level) < 1e-4:
+                    self._target = None
+                    self._level = level
+                    return
+            level = target if abs(target - level) <= step else level + math.copysign(step, target - level)
+            volume.set_level(level)
+            if level != target:
+                time.sleep(RAMP_STEP_MS / 1000)